@@ -0,0 +1,416 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import getopt, random, sys
+
+
+# Line that closes the report sections
+SEPARATOR = "=" * 60
+
+# Templates of the operation lines, after the "ST_n : Operation m [k/n] (delay)   --->   " prefix. Fields are the
+# names of the values involved and the predicate of the operation
+CORE_M_AXI = "Core 9 'm_axi' <Latency = 6> <II = 1> <Delay = 1.00> <Adapter> <Opcode : 'read' 'write' 'readreq' 'writereq' 'writeresp'>"
+CORE_RAM = "Core 37 'RAM' <Latency = 1> <II = 1> <Delay = 1.23> <Storage> <Opcode : 'load' 'store'> <Ports = 2> <Width = 32> <Depth = 256> <RAM>"
+TEMPLATES = {
+	"readreq": ("7.30", "\"%{v}_rd_req = call i1 @_ssdm_op_ReadReq.m_axi.i32P(i32 addrspace(1)* %{a}, i32 {n})\" [{src}]   --->   Operation {id} 'readreq' '{v}_rd_req' <Predicate = {p}> <Delay = 7.30> <Core = \"m_axi\">   --->   " + CORE_M_AXI),
+	"read": ("7.30", "\"%{v} = call i32 @_ssdm_op_Read.m_axi.i32P(i32 addrspace(1)* %{a})\" [{src}]   --->   Operation {id} 'read' '{v}' <Predicate = {p}> <Delay = 7.30> <Core = \"m_axi\">   --->   " + CORE_M_AXI),
+	"writereq": ("7.30", "\"%{v}_wr_req = call i1 @_ssdm_op_WriteReq.m_axi.i32P(i32 addrspace(1)* %{a}, i32 {n})\" [{src}]   --->   Operation {id} 'writereq' '{v}_wr_req' <Predicate = {p}> <Delay = 7.30> <Core = \"m_axi\">   --->   " + CORE_M_AXI),
+	"write": ("7.30", "\"call void @_ssdm_op_Write.m_axi.i32P(i32 addrspace(1)* %{a}, i32 %{b}, i4 -1)\" [{src}]   --->   Operation {id} 'write' <Predicate = {p}> <Delay = 7.30> <Core = \"m_axi\">   --->   " + CORE_M_AXI),
+	"writeresp": ("7.30", "\"%{v}_wr_resp = call i1 @_ssdm_op_WriteResp.m_axi.i32P(i32 addrspace(1)* %{a})\" [{src}]   --->   Operation {id} 'writeresp' '{v}_wr_resp' <Predicate = {p}> <Delay = 7.30> <Core = \"m_axi\">   --->   " + CORE_M_AXI),
+	"load": ("1.23", "\"%{v} = load float* %{a}, align 4\" [{src}]   --->   Operation {id} 'load' '{v}' <Predicate = {p}> <Delay = 1.23> <Core = \"RAM\">   --->   " + CORE_RAM),
+	"store": ("1.23", "\"store float %{b}, float* %{a}, align 4\" [{src}]   --->   Operation {id} 'store' <Predicate = {p}> <Delay = 1.23> <Core = \"RAM\">   --->   " + CORE_RAM),
+	"fadd": ("6.43", "\"%{v} = fadd float %{a}, %{b}\" [{src}]   --->   Operation {id} 'fadd' '{v}' <Predicate = {p}> <Delay = 6.43> <Core = \"FAddSub\">   --->   Core 99 'FAddSub' <Latency = 3> <II = 1> <Delay = 6.43> <FuncUnit> <Opcode : 'fadd' 'fsub'> <InPorts = 2> <OutPorts = 1>"),
+	"fmul": ("7.01", "\"%{v} = fmul float %{a}, %{b}\" [{src}]   --->   Operation {id} 'fmul' '{v}' <Predicate = {p}> <Delay = 7.01> <Core = \"FMul\">   --->   Core 100 'FMul' <Latency = 2> <II = 1> <Delay = 7.01> <FuncUnit> <Opcode : 'fmul'> <InPorts = 2> <OutPorts = 1>"),
+	"zext": ("0.00", "\"%{v} = zext i32 %{a} to i64\" [{src}]   --->   Operation {id} 'zext' '{v}' <Predicate = {p}> <Delay = 0.00>"),
+	"add": ("1.08", "\"%{v} = add i63 %{a}, %{b}\" [{src}]   --->   Operation {id} 'add' '{v}' <Predicate = {p}> <Delay = 1.08> <Core = \"AddSub\">   --->   Core 14 'AddSub' <Latency = 0> <II = 1> <Delay = 1.08> <FuncUnit> <Opcode : 'add' 'sub'> <InPorts = 2> <OutPorts = 1>"),
+	"getelementptr": ("0.00", "\"%{v} = getelementptr inbounds i32 addrspace(1)* %gmem, i64 %{a}, !xcl.port !3\" [{src}]   --->   Operation {id} 'getelementptr' '{v}' <Predicate = {p}> <Delay = 0.00>"),
+	"phi": ("0.00", "\"%{v} = phi i11 [ 0, %{a} ], [ %{b}, %{a}_latch ]\" [{src}]   --->   Operation {id} 'phi' '{v}' <Predicate = {p}> <Delay = 0.00>"),
+	"icmp": ("0.94", "\"%{v} = icmp eq i11 %{a}, -{n}\" [{src}]   --->   Operation {id} 'icmp' '{v}' <Predicate = {p}> <Delay = 0.94> <Core = \"Cmp\">   --->   Core 25 'Cmp' <Latency = 0> <II = 1> <Delay = 0.94> <FuncUnit> <Opcode : 'icmp'> <InPorts = 2> <OutPorts = 1>"),
+	"tripcount": ("0.00", "\"%{v} = call i32 (...)* @_ssdm_op_SpecLoopTripCount(i64 {n}, i64 {n}, i64 {n})\"   --->   Operation {id} 'speclooptripcount' '{v}' <Predicate = {p}> <Delay = 0.00>"),
+	"br": ("0.00", "\"br label %{a}\" [{src}]   --->   Operation {id} 'br' <Predicate = {p}> <Delay = 0.00>"),
+	"ret": ("0.00", "\"ret void\" [{src}]   --->   Operation {id} 'ret' <Predicate = {p}> <Delay = 0.00>")
+}
+
+# Operations that only move data around, used to fill the states up to the requested number of operations
+FILLERS = ["zext", "add", "getelementptr", "br"]
+
+# Latency of the multi-cycle operations, in states
+LATENCIES = {"readreq": 8, "writeresp": 8, "fadd": 4, "fmul": 3, "load": 2}
+
+
+# Print this tool's usage
+def printUsage(printToError=False):
+	usageStr = (
+		"Usage: {} [OPTION]... RPTFILE\n"
+		"  Write a synthetic Vivado HLS verbose schedule report to RPTFILE, for benchmarking\n"
+		"  where:\n"
+		"    [OPTION]...: one or more of the following:\n"
+		"      -h       , --help           this message\n"
+		"      -s N     , --states=N       number of FSM states (default is 1000)\n"
+		"                 --ops=N          average number of operation lines per state (default is 8)\n"
+		"      -d N     , --depth=N        maximum loop nesting (default is 3)\n"
+		"      -l N     , --loops=N        maximum number of loops on each nesting level (default is 4)\n"
+		"      -p N     , --pipelines=N    number of innermost loops that are pipelined (default is 1)\n"
+		"                 --ddr=FRAC       fraction of the loops surrounded by DDR bursts (default is 0.5)\n"
+		"                 --float=FRAC     fraction of the loop body states with floating-point operations (default is 0.5)\n"
+		"                 --bram=FRAC      fraction of the loop body states with BRAM load/stores (default is 0.3)\n"
+		"                 --seed=SEED      seed of the random generator (default is 0)\n"
+		"                 --kernel=NAME    kernel name (default is \"synth\")\n".format(sys.argv[0])
+	)
+
+	if printToError:
+		sys.stderr.write("{}\n".format(usageStr))
+	else:
+		print(usageStr)
+
+
+# Random structure of a synthetic FSM: a list of items, each one either ("chain", number of states) or ("loop", trip
+# count, DDR burst, pipelined, body items). A loop takes one header state plus its body, plus one state before and one
+# after it if surrounded by a DDR burst
+class FsmGenerator():
+	def __init__(self, noOfStates, maxDepth, maxLoops, ddrFrac, seed):
+		self._rng = random.Random(seed)
+		self._noOfStates = noOfStates
+		self._maxDepth = maxDepth
+		self._maxLoops = maxLoops
+		self._ddrFrac = ddrFrac
+
+
+	def getRandom(self):
+		return self._rng
+
+
+	# Items of a region of budget states on a given depth
+	def generateRegion(self, budget, depth):
+		if depth >= self._maxDepth or budget < 8:
+			return [("chain", budget)]
+
+		noOfLoops = self._rng.randint(1, self._maxLoops)
+		# Chains between the loops take about a tenth of the region
+		chains = [max(budget // (10 * (noOfLoops + 1)), 1) for _ in range(noOfLoops + 1)]
+		loopBudget = budget - sum(chains)
+		if loopBudget < 3 * noOfLoops:
+			return [("chain", budget)]
+
+		cuts = sorted(self._rng.sample(range(1, loopBudget), noOfLoops - 1)) if noOfLoops > 1 else []
+		sizes = [end - start for start, end in zip([0] + cuts, cuts + [loopBudget])]
+
+		items = [("chain", chains[0])]
+		for size, chain in zip(sizes, chains[1:]):
+			ddr = size >= 5 and self._rng.random() < self._ddrFrac
+			bodySize = size - 1 - (2 if ddr else 0)
+			if bodySize < 1:
+				items.append(("chain", size))
+			else:
+				items.append(("loop", self._rng.choice([16, 64, 256, 1024]), ddr, False, self.generateRegion(bodySize, depth + 1)))
+			items.append(("chain", chain))
+
+		return items
+
+
+	# Structure of the whole FSM. The last state is always on a chain, since it holds the "ret void"
+	def generate(self):
+		return self.generateRegion(self._noOfStates - 1, 0) + [("chain", 1)]
+
+
+# Innermost loops of a list of items, i.e. loops whose body is a single chain
+def getInnermostLoops(items):
+	loops = []
+	for itemIdx, item in enumerate(items):
+		if "loop" == item[0]:
+			body = item[4]
+			if 1 == len(body) and "chain" == body[0][0]:
+				loops.append((items, itemIdx))
+			else:
+				loops += getInnermostLoops(body)
+
+	return loops
+
+
+# Writes the report of a synthetic FSM. States are numbered in execution order, starting from 1
+class RptWriter():
+	def __init__(self, outF, rng, opsPerState, floatFrac, bramFrac):
+		self._outF = outF
+		self._rng = rng
+		self._opsPerState = opsPerState
+		self._floatFrac = floatFrac
+		self._bramFrac = bramFrac
+
+		# Transitions of each state, as lists of (next state, condition)
+		self._edges = []
+		# Operations of each state, as lists of (kind, k, n, fields)
+		self._ops = []
+		self._pipelines = []
+		self._noOfLoops = 0
+		self._noOfValues = 0
+		self._kernelName = None
+
+
+	def newState(self):
+		self._edges.append([])
+		self._ops.append([])
+		return len(self._edges)
+
+
+	def newValue(self, prefix = "tmp"):
+		self._noOfValues += 1
+		return "{}_{}".format(prefix, self._noOfValues)
+
+
+	# Add an operation that lasts from state st on for up to lat states (but not beyond lastState)
+	def addOperation(self, st, lastState, kind, lat = 1, **fields):
+		fields["src"] = "{}.cl:{}".format(self._kernelName, st)
+		n = min(lat, lastState - st + 1)
+		for k in range(n):
+			self._ops[st + k - 1].append((kind, n - k, n, fields))
+
+
+	# Fill a state up to the average number of operations per state
+	def addFillers(self, st):
+		for _ in range(max(self._rng.randint(self._opsPerState // 2, self._opsPerState + self._opsPerState // 2) - len(self._ops[st - 1]), 0)):
+			self.addOperation(st, st, self._rng.choice(FILLERS), a=self.newValue(), b=self.newValue(), v=self.newValue())
+
+
+	# Lay out a list of items. pending is a list of (state, condition, first) whose transition goes to whatever comes next
+	# ("first" ones are added before the other transitions of the state). Returns the pending transitions of the last item
+	def layout(self, items, pending, inLoop = False):
+		for item in items:
+			if "chain" == item[0]:
+				first = len(self._edges) + 1
+				for _ in range(item[1]):
+					st = self.newState()
+					self.link(pending, st)
+					pending = [(st, "true", False)]
+				self.addChainOperations(first, len(self._edges), inLoop)
+			else:
+				_, tripCount, ddr, isPipelined, body = item
+				self._noOfLoops += 1
+				exitCond = "exitcond{}".format(self._noOfLoops)
+				addr = self.newValue("gmem_addr")
+
+				# DDR burst around the loop: the request is issued before it and the response awaited after it
+				if ddr:
+					st = self.newState()
+					self.link(pending, st)
+					pending = [(st, "true", False)]
+					self.addOperation(st, st, "readreq", a=addr, n=tripCount, v=self.newValue("gmem"), p="true")
+					self.addOperation(st, st, "writereq", a=addr, n=tripCount, v=self.newValue("gmem"), p="true")
+					self.addFillers(st)
+
+				header = self.newState()
+				self.link(pending, header)
+				self.addOperation(header, header, "phi", a=self.newValue("loop"), b=self.newValue("i"), v=self.newValue("i"), p="true")
+				self.addOperation(header, header, "icmp", a=self.newValue("i"), n=tripCount, v=exitCond, p="true")
+				self.addOperation(header, header, "tripcount", n=tripCount, v=self.newValue("empty"), p="true")
+				self.addOperation(header, header, "br", a=self.newValue("loop"), p="true")
+
+				bodyFirst = len(self._edges) + 1
+				bodyPending = self.layout(body, [(header, "(!{})".format(exitCond), False)], True)
+				bodyLast = len(self._edges)
+				self.link(bodyPending, header)
+
+				if ddr:
+					self.addOperation(bodyFirst, bodyFirst, "read", a=addr, v=self.newValue("gmem"), p="(!{})".format(exitCond))
+					self.addOperation(bodyLast, bodyLast, "write", a=addr, b=self.newValue(), p="(!{})".format(exitCond))
+
+				# Pipelines start by reading their data
+				if isPipelined:
+					self.addOperation(bodyFirst, bodyLast, "load", LATENCIES["load"], a=self.newValue("arr_addr"), v=self.newValue("arr_load"), p="(!{})".format(exitCond))
+					self._pipelines.append((self._rng.randint(1, bodyLast - header + 1), header, bodyLast))
+
+				pending = [(header, "({})".format(exitCond), True)]
+
+				if ddr:
+					st = self.newState()
+					self.link(pending, st)
+					pending = [(st, "true", False)]
+					self.addOperation(st, st, "writeresp", a=addr, v=self.newValue("gmem"), p="true")
+					self.addFillers(st)
+
+		return pending
+
+
+	def link(self, pending, st):
+		for src, condition, first in pending:
+			if first:
+				self._edges[src - 1].insert(0, (st, condition))
+			else:
+				self._edges[src - 1].append((st, condition))
+
+
+	# Operations of the states of a chain. Loop bodies get floating-point and BRAM operations, which may last several states
+	def addChainOperations(self, first, last, inLoop):
+		for st in range(first, last + 1):
+			if inLoop:
+				if self._rng.random() < self._floatFrac:
+					kind = self._rng.choice(["fadd", "fmul"])
+					self.addOperation(st, last, kind, LATENCIES[kind], a=self.newValue(), b=self.newValue(), v=self.newValue(), p="true")
+				if self._rng.random() < self._bramFrac:
+					if self._rng.random() < 0.5:
+						self.addOperation(st, last, "load", LATENCIES["load"], a=self.newValue("arr_addr"), v=self.newValue("arr_load"), p="true")
+					else:
+						self.addOperation(st, st, "store", a=self.newValue("arr_addr"), b=self.newValue(), p="true")
+			self.addFillers(st)
+
+
+	# Write the whole report. Returns the number of states, of operation lines and of pipelines
+	def write(self, kernelName, items):
+		self._kernelName = kernelName
+		self.layout(items, [])
+		lastState = len(self._edges)
+		self.addOperation(lastState, lastState, "ret", p="true")
+
+		w = self._outF.write
+		w(
+			"\n\n================================================================\n"
+			"== Vivado HLS Report for '{0}'\n"
+			"================================================================\n"
+			"* Date:           Thu Jan  1 00:00:00 2020\n\n"
+			"* Version:        2018.2 (Build 2258646 on Thu Jun 14 20:25:20 MDT 2018)\n"
+			"* Project:        {0}\n"
+			"* Solution:       solution\n"
+			"* Product family: zynquplus\n"
+			"* Target device:  xczu7ev-ffvc1156-2-e\n\n\n"
+			"================================================================\n"
+			"== Performance Estimates\n"
+			"================================================================\n"
+			"+ Timing (ns): \n"
+			"    * Summary: \n"
+			"    +--------+-------+----------+------------+\n"
+			"    |  Clock | Target| Estimated| Uncertainty|\n"
+			"    +--------+-------+----------+------------+\n"
+			"    |ap_clk  |  10.00|     7.300|        2.70|\n"
+			"    +--------+-------+----------+------------+\n\n".format(kernelName)
+		)
+
+		w("{0}\n+ Verbose Summary: Schedule\n{0}\n".format(SEPARATOR))
+		w("* Number of FSM states : {}\n".format(lastState))
+		w("* Pipeline : {}\n".format(len(self._pipelines)))
+		for pipeIdx, (ii, first, last) in enumerate(self._pipelines):
+			w("  Pipeline-{} : II = {}, D = {}, States = {{ {} }}\n".format(pipeIdx, ii, last - first + 1, " ".join(str(st) for st in range(first, last + 1))))
+		w("* Dataflow Pipeline: 0\n\n")
+
+		w("* FSM state transitions: \n")
+		for st, edges in enumerate(self._edges, 1):
+			w("{} --> \n".format(st))
+			for nextState, condition in edges:
+				w("\t{}  / {}\n".format(nextState, condition))
+
+		w("\n* FSM state operations: \n")
+		opID = lastState + 1
+		for st, ops in enumerate(self._ops, 1):
+			w("\nState {} <SV = {}> <Delay = 7.30>\n".format(st, st - 1))
+			for kind, k, n, fields in ops:
+				delay, template = TEMPLATES[kind]
+				fields.setdefault("p", "true")
+				w("ST_{} : Operation {} [{}/{}] ({}ns)   --->   {}\n".format(
+					st, opID, k, n, delay, template.format(id=opID, **fields)
+				))
+				opID += 1
+
+		w("\n\n{0}\n+ Verbose Summary: Timing violations\n{0}\nTarget clock period: 10ns, clock uncertainty: 2.7ns.\n\n".format(SEPARATOR))
+		w("{0}\n+ Verbose Summary: Binding\n{0}\nN/A\n* FSMD analyzer results:\n  - Output states:\n - Input state : \n  - Chain level:\n".format(SEPARATOR))
+		for st in range(1, lastState + 1):
+			w("\tState {}\n".format(st))
+		w("\n{0}\n+ Verbose Summary: Datapath Resource usage \n{0}\nN/A\n".format(SEPARATOR))
+
+		return lastState, opID - lastState - 1, len(self._pipelines)
+
+
+# Write a synthetic report. See printUsage() for the arguments.
+# Returns the number of states, of operation lines and of pipelines
+def generateReport(rptFile, noOfStates, opsPerState = 8, maxDepth = 3, maxLoops = 4, noOfPipelines = 1, ddrFrac = 0.5, floatFrac = 0.5, bramFrac = 0.3, seed = 0, kernelName = "synth"):
+	generator = FsmGenerator(noOfStates, maxDepth, maxLoops, ddrFrac, seed)
+	items = generator.generate()
+
+	# Pipeline some of the innermost loops
+	innermostLoops = getInnermostLoops(items)
+	for parent, itemIdx in generator.getRandom().sample(innermostLoops, min(noOfPipelines, len(innermostLoops))):
+		parent[itemIdx] = parent[itemIdx][:3] + (True,) + parent[itemIdx][4:]
+
+	with open(rptFile, "w") as outF:
+		return RptWriter(outF, generator.getRandom(), opsPerState, floatFrac, bramFrac).write(kernelName, items)
+
+
+if "__main__" == __name__:
+	noOfStates = 1000
+	opsPerState = 8
+	maxDepth = 3
+	maxLoops = 4
+	noOfPipelines = 1
+	ddrFrac = 0.5
+	floatFrac = 0.5
+	bramFrac = 0.3
+	seed = 0
+	kernelName = "synth"
+
+	# Get command line options
+	opts, args = getopt.getopt(
+		sys.argv[1:], "s:d:l:p:h",
+		["states=", "ops=", "depth=", "loops=", "pipelines=", "ddr=", "float=", "bram=", "seed=", "kernel=", "help"]
+	)
+
+	# Parse command line options
+	for o, a in opts:
+		if o in ("-s", "--states"):
+			noOfStates = int(a)
+			if noOfStates < 2:
+				raise RuntimeError("Invalid value supplied for \"--states\": {}".format(noOfStates))
+		elif "--ops" == o:
+			opsPerState = int(a)
+		elif o in ("-d", "--depth"):
+			maxDepth = int(a)
+		elif o in ("-l", "--loops"):
+			maxLoops = int(a)
+			if maxLoops <= 0:
+				raise RuntimeError("Invalid value supplied for \"--loops\": {}".format(maxLoops))
+		elif o in ("-p", "--pipelines"):
+			noOfPipelines = int(a)
+		elif "--ddr" == o:
+			ddrFrac = float(a)
+		elif "--float" == o:
+			floatFrac = float(a)
+		elif "--bram" == o:
+			bramFrac = float(a)
+		elif "--seed" == o:
+			seed = int(a)
+		elif "--kernel" == o:
+			kernelName = a
+		else:
+			printUsage()
+			exit(1)
+
+	if len(args) != 1:
+		printUsage()
+		exit(1)
+
+	noOfStates, noOfOps, noOfPipelines = generateReport(args[0], noOfStates, opsPerState, maxDepth, maxLoops, noOfPipelines, ddrFrac, floatFrac, bramFrac, seed, kernelName)
+	print("{}: {} states, {} operation lines, {} pipelines".format(args[0], noOfStates, noOfOps, noOfPipelines))
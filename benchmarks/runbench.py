@@ -0,0 +1,272 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import datetime, getopt, glob, json, os, platform, subprocess, sys, tempfile
+
+# Benchmarks run from the repository, without installing it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from genrpt import generateReport
+from vivadofsm.artifacts import generateArtifacts
+from vivadofsm.opfilter import FILTERS
+from vivadofsm.pipeline import getNodeOperations, getTimeline, loadNodeOperations
+from vivadofsm.profiler import Profiler
+from vivadofsm.rptparser import parseReport
+from vivadofsm.rptreader import RptReader
+
+
+RPT_SUFFIX = ".verbose.sched.rpt"
+
+# Reports that are benchmarked by default
+EXAMPLES = ["examples/fsmgen/*" + RPT_SUFFIX, "examples/pipelook/*" + RPT_SUFFIX]
+
+# Phases faster than this (in seconds) are too noisy to be compared
+MIN_COMPARED_TIME = 0.01
+
+
+# Print this tool's usage
+def printUsage(printToError=False):
+	usageStr = (
+		"Usage: {} [OPTION]... [RPTFILE]...\n"
+		"  Time every phase of fsmgen.py and pipelook.py on the example reports, on synthetic reports (see genrpt.py)\n"
+		"  and on the reports RPTFILE...\n"
+		"  where:\n"
+		"    [OPTION]...: one or more of the following:\n"
+		"      -h       , --help           this message\n"
+		"      -o FILE  , --output=FILE    write the results to FILE as JSON (default is bench.json)\n"
+		"      -s LIST  , --sizes=LIST     comma-separated numbers of FSM states of the synthetic reports (default is\n"
+		"                                  1000,10000). An empty LIST disables them\n"
+		"      -r N     , --repeat=N       run each benchmark N times and keep the fastest run of each phase (default is 3)\n"
+		"      -w DIR   , --workdir=DIR    write synthetic reports and outputs to DIR (default is a temporary folder).\n"
+		"                                  Synthetic reports already on DIR are reused\n"
+		"      -c FILE  , --compare=FILE   compare the results with the ones of FILE. The exit code is 1 if any phase\n"
+		"                                  is slower than on FILE by more than the threshold\n"
+		"      -t PCT   , --threshold=PCT  threshold of \"--compare\", in percent (default is 20)\n"
+		"                 --no-examples    do not benchmark the example reports\n"
+		"                 --png            draw PNG images instead of SVG ones (requires Pillow)\n".format(sys.argv[0])
+	)
+
+	if printToError:
+		sys.stderr.write("{}\n".format(usageStr))
+	else:
+		print(usageStr)
+
+
+# Commit of the repository, or None if unknown
+def getCommit():
+	try:
+		return subprocess.check_output(
+			["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+		).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+# Run fsmgen.py and pipelook.py (on every pipeline) once over a report, in-process and without the parse cache.
+# Every output is written to outPrefix.*
+def runOnce(rptFile, outPrefix, imageFormat, profiler):
+	activeFilters = list(FILTERS)
+
+	with profiler.phase("fsmgen"):
+		with profiler.phase("parse"), RptReader(rptFile) as reader:
+			parsed = parseReport(reader, profiler=profiler)
+
+		generateArtifacts(
+			parsed, outPrefix + ".dot", activeFilters, outPrefix + ".csv", outPrefix + ".json", imageFile="{}.{}".format(outPrefix, imageFormat),
+			opsFile=outPrefix + ".ops", profiler=profiler
+		)
+
+	# The report is not parsed again, as pipelook.py would find it on the parse cache
+	with profiler.phase("pipelook"):
+		with profiler.phase("loadJson"):
+			loadNodeOperations(outPrefix + ".json")
+
+		with profiler.phase("operations"):
+			nodeOperations = getNodeOperations(parsed, activeFilters, profiler)
+
+		for pipeID in parsed.pipelines:
+			tlgen, operations = getTimeline(parsed, nodeOperations, pipeID, reportViolations=True, printViolations=False, profiler=profiler)
+			with profiler.phase("timeline"):
+				if "svg" == imageFormat:
+					tlgen.generateSvg(operations, "{}.{}.svg".format(outPrefix, pipeID))
+				else:
+					tlgen.generate(operations, "{}.{}.png".format(outPrefix, pipeID))
+
+	return parsed
+
+
+# Benchmark a report. Returns its entry on the results
+def runBenchmark(rptFile, outPrefix, imageFormat, repeat):
+	phases = {}
+	counters = None
+	parsed = None
+
+	for _ in range(repeat):
+		profiler = Profiler("runbench")
+		parsed = runOnce(rptFile, outPrefix, imageFormat, profiler)
+		results = profiler.getResults()
+
+		# The fastest run of each phase is the one least disturbed by the rest of the system
+		for path, phase in results["phases"].items():
+			if path not in phases:
+				phases[path] = dict(phase)
+			else:
+				phases[path]["wall"] = min(phases[path]["wall"], phase["wall"])
+				phases[path]["cpu"] = min(phases[path]["cpu"], phase["cpu"])
+				phases[path]["highWaterRss"] = phase["highWaterRss"]
+				phases[path]["rssGrowth"] = phase["rssGrowth"]
+		counters = results["counters"]
+
+	return {
+		"report": rptFile,
+		"size": os.path.getsize(rptFile),
+		"states": len(parsed.states),
+		"pipelines": len(parsed.pipelines),
+		"phases": phases,
+		"counters": counters
+	}
+
+
+# Compare results with a baseline. Returns the regressions found, as a list of (benchmark, phase, old wall, new wall)
+def compareResults(baseline, results, threshold):
+	regressions = []
+
+	for name in sorted(results["benchmarks"]):
+		if name not in baseline["benchmarks"]:
+			continue
+
+		oldPhases = baseline["benchmarks"][name]["phases"]
+		newPhases = results["benchmarks"][name]["phases"]
+		for path in newPhases:
+			if path not in oldPhases:
+				continue
+
+			oldWall = oldPhases[path]["wall"]
+			newWall = newPhases[path]["wall"]
+			if max(oldWall, newWall) < MIN_COMPARED_TIME:
+				continue
+
+			change = 100 * (newWall - oldWall) / max(oldWall, 1e-9)
+			print("{:<24} {:<48} {:>9.3f}s {:>9.3f}s {:>+8.1f}%".format(name, path, oldWall, newWall, change))
+			if change > threshold:
+				regressions.append((name, path, oldWall, newWall))
+
+	return regressions
+
+
+if "__main__" == __name__:
+	outFile = "bench.json"
+	sizes = [1000, 10000]
+	repeat = 3
+	workDir = None
+	compareFile = None
+	threshold = 20.0
+	useExamples = True
+	imageFormat = "svg"
+
+	# Get command line options
+	opts, args = getopt.getopt(
+		sys.argv[1:], "o:s:r:w:c:t:h",
+		["output=", "sizes=", "repeat=", "workdir=", "compare=", "threshold=", "no-examples", "png", "help"]
+	)
+
+	# Parse command line options
+	for o, a in opts:
+		if o in ("-o", "--output"):
+			outFile = a
+		elif o in ("-s", "--sizes"):
+			sizes = [int(size) for size in a.split(",") if "" != size]
+		elif o in ("-r", "--repeat"):
+			repeat = int(a)
+			if repeat <= 0:
+				raise RuntimeError("Invalid value supplied for \"--repeat\": {}".format(repeat))
+		elif o in ("-w", "--workdir"):
+			workDir = a
+		elif o in ("-c", "--compare"):
+			compareFile = a
+		elif o in ("-t", "--threshold"):
+			threshold = float(a)
+		elif "--no-examples" == o:
+			useExamples = False
+		elif "--png" == o:
+			imageFormat = "png"
+		else:
+			printUsage()
+			exit(1)
+
+	if workDir is None:
+		workDir = tempfile.mkdtemp(prefix="vivadofsm-bench-")
+	os.makedirs(workDir, exist_ok=True)
+
+	# Name and file of each benchmarked report
+	rptFiles = []
+	if useExamples:
+		repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+		for pattern in EXAMPLES:
+			rptFiles += sorted(glob.glob(os.path.join(repoDir, pattern)))
+	rptFiles += args
+	benchmarks = [(os.path.basename(rptFile)[:-len(RPT_SUFFIX)] if rptFile.endswith(RPT_SUFFIX) else os.path.basename(rptFile), rptFile) for rptFile in rptFiles]
+
+	# Synthetic reports are always generated with the same seed, so that results of different versions can be compared
+	for size in sizes:
+		name = "synth-{}".format(size)
+		rptFile = os.path.join(workDir, name + RPT_SUFFIX)
+		if not os.path.exists(rptFile):
+			noOfStates, noOfOps, noOfPipelines = generateReport(rptFile, size, noOfPipelines=max(size // 1000, 1))
+			print("{}: {} states, {} operation lines, {} pipelines".format(rptFile, noOfStates, noOfOps, noOfPipelines))
+		benchmarks.append((name, rptFile))
+
+	results = {
+		"date": datetime.datetime.now().isoformat(),
+		"commit": getCommit(),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"repeat": repeat,
+		"imageFormat": imageFormat,
+		"benchmarks": {}
+	}
+
+	for name, rptFile in benchmarks:
+		entry = runBenchmark(rptFile, os.path.join(workDir, name), imageFormat, repeat)
+		results["benchmarks"][name] = entry
+		print("{}: {} states, fsmgen {:.3f}s, pipelook {:.3f}s".format(name, entry["states"], entry["phases"]["fsmgen"]["wall"], entry["phases"]["pipelook"]["wall"]))
+
+	with open(outFile, "w") as resultsF:
+		resultsF.write(json.dumps(results, indent=2))
+
+	if compareFile is not None:
+		with open(compareFile, "r") as baselineF:
+			baseline = json.load(baselineF)
+
+		regressions = compareResults(baseline, results, threshold)
+		for name, path, oldWall, newWall in regressions:
+			sys.stderr.write("Regression on {} {}: {:.3f}s -> {:.3f}s\n".format(name, path, oldWall, newWall))
+		exit(1 if len(regressions) > 0 else 0)
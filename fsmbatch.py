@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import concurrent.futures, getopt, glob, json, os, sys, time
+from vivadofsm.artifacts import generateArtifacts
+from vivadofsm.fsmrender import FORMATS
+from vivadofsm.opfilter import FILTERS, loadFilterSpec
+from vivadofsm.parsecache import DEFAULT_MAX_SIZE, ParseCache, getDefaultCacheDir
+from vivadofsm.rptparser import parseReport
+from vivadofsm.rptreader import openReport
+
+
+RPT_SUFFIX = ".verbose.sched.rpt"
+
+
+# Print this tool's usage
+def printUsage(printToError=False):
+	usageStr = (
+		"Usage: {} [OPTION]... INPUT...\n"
+		"  where:\n"
+		"    INPUT...: one or more report files, folders (searched recursively for *{}) or glob patterns\n"
+		"    [OPTION]...: one or more of the following:\n"
+		"      -h       , --help           this message\n"
+		"      -o DIR   , --outdir=DIR     write outputs to folder DIR (default is the current folder)\n"
+		"      -f FILTER, --filter=FILTER  show together with the graph some operations of interest (see fsmgen.py)\n"
+		"                                  NOTE: you can repeat this argument\n"
+		"                 --filters=SPEC   replace the filters by the ones of the JSON filter spec SPEC (see fsmgen.py)\n"
+		"      -c       , --csv            also save filtered operations to a csv file per report\n"
+		"      -j       , --json           also generate a json file per report to be used by \"pipelook\"\n"
+		"                 --compact-json   write the json files without indentation\n"
+		"      -b       , --binary         also write the operations of each report on the columnar format (see\n"
+		"                                  \"--binary\" on fsmgen.py). These files are never compressed\n"
+		"      -r FMT   , --render=FMT     also draw each simplified FSM to an image of format FMT (svg or png, the latter requires Pillow)\n"
+		"      -z       , --gzip           gzip-compress all outputs\n"
+		"      -n N     , --workers=N      process up to N reports in parallel (default is the number of cores)\n"
+		"      -s FILE  , --summary=FILE   write the summary index to FILE (default is DIR/summary.json)\n"
+		"      -w       , --watch          keep running and process again every report whose contents change.\n"
+		"                                  Unchanged outputs are not rewritten\n"
+		"                 --interval=SECS  polling interval of --watch, in seconds (default is 1)\n"
+		"                 --no-cache       do not use the parse cache\n"
+		"                 --cache-dir=DIR  use DIR as the parse cache folder (default is {})\n"
+		"                 --cache-size=MB  size cap of the parse cache, in megabytes (default is {})\n".format(
+			sys.argv[0], RPT_SUFFIX, getDefaultCacheDir(), DEFAULT_MAX_SIZE // (1024 * 1024)
+		)
+	)
+
+	if printToError:
+		sys.stderr.write("{}\n".format(usageStr))
+	else:
+		print(usageStr)
+
+
+# Expand folders and glob patterns into a sorted list of report files
+def findReports(inputs):
+	rptFiles = set()
+
+	for inp in inputs:
+		if os.path.isdir(inp):
+			rptFiles.update(glob.glob(os.path.join(inp, "**", "*{}".format(RPT_SUFFIX)), recursive=True))
+		elif os.path.isfile(inp):
+			rptFiles.add(inp)
+		else:
+			rptFiles.update(f for f in glob.glob(inp, recursive=True) if os.path.isfile(f))
+
+	return sorted(os.path.abspath(f) for f in rptFiles)
+
+
+# Folder below which every report found on an input lies (see findReports()): the input itself for folders, otherwise
+# its parent folder up to the first glob pattern
+def getInputRoot(inp):
+	if os.path.isdir(inp):
+		return os.path.abspath(inp)
+
+	root = os.path.dirname(os.path.abspath(inp))
+	while glob.has_magic(root):
+		root = os.path.dirname(root)
+	return root
+
+
+# Output prefix (without extension) for each report. The folder structure below baseDir (by default, the common folder
+# of all reports) is mirrored on the output folder, so that reports with the same name on different solutions do not
+# collide
+def getOutputPrefixes(rptFiles, outDir, baseDir = None):
+	if baseDir is None:
+		baseDir = os.path.commonpath([os.path.dirname(f) for f in rptFiles]) if len(rptFiles) > 0 else ""
+	prefixes = []
+
+	for rptFile in rptFiles:
+		baseName = os.path.basename(rptFile)
+		if baseName.endswith(RPT_SUFFIX):
+			baseName = baseName[:-len(RPT_SUFFIX)]
+		prefixes.append(os.path.join(outDir, os.path.relpath(os.path.dirname(rptFile), baseDir), baseName))
+
+	return [os.path.normpath(p) for p in prefixes]
+
+
+# Process a single report. Runs on a worker process
+#        outFiles: dict with the output file names ("dot", and optionally "csv", "json", "ops" and "image")
+#   onlyIfChanged: do not rewrite outputs whose content would be the same
+#        previous: previous parse of the same report, whose unchanged sections are reused (may be None)
+#       keepParse: also return the parse, so that it can be supplied as "previous" later
+#         filters: filters used to classify the operations (see opfilter.py)
+# Returns the summary entry of this report and the parse (or None, if keepParse is False or processing failed)
+def processReport(rptFile, outFiles, activeFilters, compactJson, useCache, cacheDir, cacheSize, onlyIfChanged = False, previous = None, keepParse = False, filters = FILTERS):
+	startTime = time.perf_counter()
+	result = {"report": rptFile, "outputs": outFiles}
+	parsed = None
+
+	try:
+		os.makedirs(os.path.dirname(outFiles["dot"]) or ".", exist_ok=True)
+
+		with openReport(rptFile) as reader:
+			parsed = parseReport(reader, ParseCache(cacheDir, cacheSize) if useCache else None, filters, previous)
+
+		result.update(generateArtifacts(
+			parsed, outFiles["dot"], activeFilters, outFiles.get("csv"), outFiles.get("json"), compactJson,
+			imageFile=outFiles.get("image"), onlyIfChanged=onlyIfChanged, opsFile=outFiles.get("ops")
+		))
+		result["error"] = None
+	except Exception as e:
+		result["error"] = "{}: {}".format(type(e).__name__, e)
+		parsed = None
+
+	result["time"] = time.perf_counter() - startTime
+	return result, parsed if keepParse else None
+
+
+# Modification time and size of a file, or None if it does not exist anymore
+def getSignature(fileName):
+	try:
+		stat = os.stat(fileName)
+	except OSError:
+		return None
+
+	return (stat.st_mtime_ns, stat.st_size)
+
+
+# SHA-1 of the contents of a report, or None if it cannot be read
+def getDigest(rptFile):
+	try:
+		with openReport(rptFile) as reader:
+			return reader.getDigest()
+	except (OSError, RuntimeError):
+		return None
+
+
+# Write the summary index
+def writeSummary(summaryFile, activeFilters, noOfWorkers, elapsed, results):
+	os.makedirs(os.path.dirname(summaryFile) or ".", exist_ok=True)
+	with open(summaryFile, "w") as summaryF:
+		summaryF.write(json.dumps({
+			"filters": activeFilters,
+			"workers": noOfWorkers,
+			"time": elapsed,
+			"failures": sum(1 for r in results if r["error"] is not None),
+			"reports": results
+		}, indent=2))
+
+
+if "__main__" == __name__:
+	outDir = "."
+	activeFilters = []
+	filters = FILTERS
+	writeCsv = False
+	writeJson = False
+	writeOps = False
+	compactJson = False
+	imageFormat = None
+	compress = False
+	noOfWorkers = os.cpu_count()
+	summaryFile = None
+	watch = False
+	interval = 1.0
+	useCache = True
+	cacheDir = None
+	cacheSize = DEFAULT_MAX_SIZE
+
+	# Get command line options
+	opts, args = getopt.getopt(
+		sys.argv[1:], "o:f:cjbr:zn:s:wh",
+		["outdir=", "filter=", "filters=", "csv", "json", "compact-json", "binary", "render=", "gzip", "workers=", "summary=", "watch", "interval=", "no-cache", "cache-dir=", "cache-size=", "help"]
+	)
+
+	# Parse command line options
+	for o, a in opts:
+		if o in ("-o", "--outdir"):
+			outDir = a
+		elif o in ("-f", "--filter"):
+			activeFilters.append(a)
+		elif "--filters" == o:
+			filters, _, _ = loadFilterSpec(a)
+		elif o in ("-c", "--csv"):
+			writeCsv = True
+		elif o in ("-j", "--json"):
+			writeJson = True
+		elif "--compact-json" == o:
+			compactJson = True
+		elif o in ("-b", "--binary"):
+			writeOps = True
+		elif o in ("-r", "--render"):
+			imageFormat = a
+			if imageFormat not in FORMATS:
+				raise RuntimeError("Unsupported image format: {}".format(imageFormat))
+		elif o in ("-z", "--gzip"):
+			compress = True
+		elif o in ("-n", "--workers"):
+			noOfWorkers = int(a)
+			if noOfWorkers <= 0:
+				raise RuntimeError("Invalid value supplied for \"--workers\": {}".format(noOfWorkers))
+		elif o in ("-s", "--summary"):
+			summaryFile = a
+		elif o in ("-w", "--watch"):
+			watch = True
+		elif "--interval" == o:
+			interval = float(a)
+			if interval <= 0:
+				raise RuntimeError("Invalid value supplied for \"--interval\": {}".format(interval))
+		elif "--no-cache" == o:
+			useCache = False
+		elif "--cache-dir" == o:
+			cacheDir = a
+		elif "--cache-size" == o:
+			cacheSize = int(a) * 1024 * 1024
+		else:
+			printUsage()
+			exit(1)
+
+	if 0 == len(args):
+		printUsage()
+		exit(1)
+
+	rptFiles = findReports(args)
+	if 0 == len(rptFiles) and not watch:
+		raise RuntimeError("No report found on the supplied inputs")
+
+	if summaryFile is None:
+		summaryFile = os.path.join(outDir, "summary.json")
+
+	extension = ".gz" if compress else ""
+
+	# Output file names of a report
+	def getOutFiles(prefix):
+		outFiles = {"dot": "{}.dot{}".format(prefix, extension)}
+		if writeCsv:
+			outFiles["csv"] = "{}.csv{}".format(prefix, extension)
+		if writeJson:
+			outFiles["json"] = "{}.json{}".format(prefix, extension)
+		# Memory-mapped files and images are not compressed
+		if writeOps:
+			outFiles["ops"] = "{}.ops".format(prefix)
+		if imageFormat is not None:
+			outFiles["image"] = "{}.{}".format(prefix, imageFormat)
+		return outFiles
+
+	startTime = time.perf_counter()
+
+	# State kept between rounds when watching: summary entry, parse, signature and digest of the last processed
+	# version of each report, and its output prefix
+	results = {}
+	parses = {}
+	signatures = {}
+	digests = {}
+	prefixes = {}
+
+	# Folder mirrored on the output folder. When watching, reports may appear anywhere below the inputs, so it is fixed
+	# to include them: otherwise the outputs of every report would move when the common folder of the reports changes
+	baseDir = None
+	if watch:
+		baseDir = os.path.commonpath([getInputRoot(inp) for inp in args] + [os.path.dirname(f) for f in rptFiles])
+
+	# Process a list of reports in parallel and update the state above
+	def runRound(executor, toProcess):
+		newFiles = [f for f in toProcess if f not in prefixes]
+		prefixes.update(zip(newFiles, getOutputPrefixes(newFiles, outDir, baseDir)))
+
+		# Biggest reports are submitted first, so that they do not end up alone at the end of the run
+		toProcess = sorted(toProcess, key=lambda f: signatures[f][1], reverse=True)
+		futures = [
+			executor.submit(
+				processReport, rptFile, getOutFiles(prefixes[rptFile]), activeFilters, compactJson, useCache, cacheDir, cacheSize,
+				watch, parses.get(rptFile), watch, filters
+			)
+			for rptFile in toProcess
+		]
+
+		for future in concurrent.futures.as_completed(futures):
+			result, parsed = future.result()
+			results[result["report"]] = result
+			parses[result["report"]] = parsed
+
+			if result["error"] is None:
+				print("{} ({:.2f}s): {} states, {} nodes after simplification".format(result["report"], result["time"], result["states"], result["nodes"]))
+			else:
+				sys.stderr.write("{} ({:.2f}s): {}\n".format(result["report"], result["time"], result["error"]))
+
+		writeSummary(summaryFile, activeFilters, noOfWorkers, time.perf_counter() - startTime, [results[f] for f in sorted(results)])
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=noOfWorkers if watch else min(noOfWorkers, len(rptFiles))) as executor:
+		for rptFile in rptFiles:
+			signatures[rptFile] = getSignature(rptFile)
+			digests[rptFile] = getDigest(rptFile) if watch else None
+		rptFiles = [f for f in rptFiles if signatures[f] is not None]
+		if len(rptFiles) > 0:
+			runRound(executor, rptFiles)
+
+		# Watch mode: poll the inputs and process again only the reports whose contents changed. Vivado rewrites
+		# the report while synthesising, so a report is only processed once it stays the same for a whole interval
+		pending = {}
+		try:
+			while watch:
+				time.sleep(interval)
+
+				rptFiles = findReports(args)
+				toProcess = []
+
+				for rptFile in rptFiles:
+					signature = getSignature(rptFile)
+					if signature is None or signatures.get(rptFile) == signature:
+						pending.pop(rptFile, None)
+						continue
+
+					if pending.get(rptFile) != signature:
+						pending[rptFile] = signature
+						continue
+					del pending[rptFile]
+
+					# Touched, but the same content
+					digest = getDigest(rptFile)
+					signatures[rptFile] = signature
+					if digest is not None and digests.get(rptFile) == digest:
+						continue
+
+					digests[rptFile] = digest
+					toProcess.append(rptFile)
+
+				# Forget reports that were removed
+				for rptFile in set(results) - set(rptFiles):
+					for state in (results, parses, signatures, digests, prefixes):
+						state.pop(rptFile, None)
+
+				if len(toProcess) > 0:
+					runRound(executor, toProcess)
+		except KeyboardInterrupt:
+			pass
+
+	exit(1 if any(r["error"] is not None for r in results.values()) else 0)
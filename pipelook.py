@@ -32,22 +32,51 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
-import datetime, getopt, json, math, re, sys
-from PIL import Image, ImageDraw, ImageFont
+import atexit, concurrent.futures, getopt, json, os, sys, time
+from vivadofsm.opfilter import FILTERS, loadFilterSpec
+from vivadofsm.parsecache import DEFAULT_MAX_SIZE, ParseCache, getDefaultCacheDir
+from vivadofsm.profiler import NULL_PROFILER, Profiler
+from vivadofsm.pipeline import getNodeOperations, getPipelineOperations, getTimeline, loadNodeOperations, loadReport, loadSchedule
+from vivadofsm.timeline import TLGen
 
 
 # Print this tool's usage
 def printUsage(printToError=False):
 	usageStr = (
-		"Usage: {} [OPTION]... RPTFILE JSONFILE\n"
+		"Usage: {} [OPTION]... RPTFILE [JSONFILE]\n"
 		"  where:\n"
+		"    RPTFILE : the report, which may be compressed (gzip, xz, bzip2 or zstd) or \"-\" for the standard input\n"
+		"    JSONFILE: operations of the FSM, as written by fsmgen.py with \"--json\" (possibly compressed) or \"--binary\".\n"
+		"              If omitted, the operations are taken directly from RPTFILE (see \"-f\")\n"
 		"    [OPTION]...: one or more of the following:\n"
 		"      -h       , --help           this message\n"
-		"      -o PNG   , --output=PNG     output pipeline report to PNG\n"
+		"      -o FILE  , --output=FILE    output pipeline report to FILE, a PNG image or, if FILE ends with \".svg\",\n"
+		"                                  an SVG image\n"
+		"      -r FILE  , --report=FILE    write the resource usage and violation report of the pipeline to FILE (\"-\" for\n"
+		"                                  the standard output) as JSON. The exit code is 1 if there are violations.\n"
+		"                                  Without \"-o\", no timeline is drawn and Pillow is not needed\n"
+		"      -a       , --all            analyse every pipeline of RPTFILE. With \"-o\", one timeline is written per\n"
+		"                                  pipeline, named after FILE with the pipeline ID before the extension\n"
+		"      -n N     , --workers=N      parse big reports and, with \"-a\", process pipelines on up to N processes in\n"
+		"                                  parallel (default is the number of cores)\n"
+		"                 --summary=FILE   with \"-a\", write the combined summary of all pipelines to FILE\n"
+		"      -f FILTER, --filter=FILTER  without JSONFILE, use the operations of FILTER (may be used multiple times,\n"
+		"                                  default is all filters: {})\n"
+		"                 --filters=SPEC   replace the filters by the ones of the JSON filter spec SPEC (see fsmgen.py).\n"
+		"                                  Colours and limit groups of the spec are also used on the timeline\n"
 		"      -p PIPE  , --pipe=PIPE      set custom pipeline ID (default is \"Pipeline-0\")\n"
 		"      -i II    , --ii=II          set custom initiation interval\n"
 		"      -s STATE , --state=STATE    override RPT file info and create pipeline from header state\n"
-		"                                  STATE. Requires manual insertion of II with \"--ii\"\n".format(sys.argv[0])
+		"                                  STATE. Requires manual insertion of II with \"--ii\"\n"
+		"                 --no-cache       do not use the parse cache\n"
+		"                 --clear-cache    remove all entries of the parse cache before running\n"
+		"                 --cache-dir=DIR  use DIR as the parse cache folder (default is {})\n"
+		"                 --cache-size=MB  size cap of the parse cache, in megabytes (default is {})\n"
+		"                 --profile=FILE   write the wall time, CPU time and peak memory of each phase, plus some\n"
+		"                                  counters, to FILE (\"-\" for the standard error) as JSON. With \"-a\", the\n"
+		"                                  profile of each pipeline is included\n".format(
+			sys.argv[0], ", ".join(FILTERS), getDefaultCacheDir(), DEFAULT_MAX_SIZE // (1024 * 1024)
+		)
 	)
 
 	if printToError:
@@ -56,435 +85,74 @@ def printUsage(printToError=False):
 		print(usageStr)
 
 
-def drawRoundedRectangle(draw, start, size, bcolor, fcolor, borderSize = 5, roundedEdge = 20):
-	draw.pieslice(
-		[
-			(start[0], start[1]),
-			(start[0] + 2 * (borderSize + roundedEdge), start[1] + 2 * (borderSize + roundedEdge))
-		], 180, 270, fill=bcolor
-	)
-	draw.pieslice(
-		[
-			(start[0] + borderSize, start[1] + borderSize),
-			(start[0] + borderSize + 2 * roundedEdge, start[1] + borderSize + 2 * roundedEdge)
-		], 180, 270, fill=fcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0], start[1] + borderSize + roundedEdge),
-			(start[0] + borderSize, start[1] + size[1] - (borderSize + roundedEdge))
-		], fill=bcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0] + borderSize, start[1] + borderSize + roundedEdge),
-			(start[0] + borderSize + roundedEdge, start[1] + size[1] - (borderSize + roundedEdge))
-		], fill=fcolor
-	)
-
-	draw.pieslice(
-		[
-			(start[0], start[1] + size[1] - 2 * (borderSize + roundedEdge)),
-			(start[0] + 2 * (borderSize + roundedEdge), start[1] + size[1])
-		], 90, 180, fill=bcolor
-	)
-
-	draw.pieslice(
-		[
-			(start[0] + borderSize, start[1] + size[1] - (2 * roundedEdge + borderSize)),
-			(start[0] + borderSize + 2 * roundedEdge, start[1] + size[1] - borderSize)
-		], 90, 180, fill=fcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0] + borderSize + roundedEdge, start[1]),
-			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + borderSize)
-		], fill=bcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0] + borderSize + roundedEdge, start[1] + borderSize),
-			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + size[1] - borderSize)
-		], fill=fcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0] + borderSize + roundedEdge, start[1] + size[1] - borderSize),
-			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + size[1])
-		], fill=bcolor
-	)
-
-	draw.pieslice(
-		[
-			(start[0] + size[0] - 2 * (borderSize + roundedEdge), start[1]),
-			(start[0] + size[0], start[1] + 2 * (borderSize + roundedEdge))
-		], 270, 0, fill=bcolor
-	)
-
-	draw.pieslice(
-		[
-			(start[0] + size[0] - (2 * roundedEdge + borderSize), start[1] + borderSize),
-			(start[0] + size[0] - borderSize, start[1] + borderSize + 2 * roundedEdge)
-		], 270, 0, fill=fcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0] + size[0] - borderSize, start[1] + borderSize + roundedEdge),
-			(start[0] + size[0], start[1] + size[1] - (borderSize + roundedEdge))
-		], fill=bcolor
-	)
-
-	draw.rectangle(
-		[
-			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + borderSize + roundedEdge),
-			(start[0] + size[0] - borderSize, start[1] + size[1] - (borderSize + roundedEdge))
-		], fill=fcolor
-	)
-
-	draw.pieslice(
-		[
-			(start[0] + size[0] - 2 * (roundedEdge + borderSize), start[1] + size[1] - 2 * (roundedEdge + borderSize)),
-			(start[0] + size[0], start[1] + size[1])
-		], 0, 90, fill=bcolor
-	)
-
-	draw.pieslice(
-		[
-			(start[0] + size[0] - (2 * roundedEdge + borderSize), start[1] + size[1] - (2 * roundedEdge + borderSize)),
-			(start[0] + size[0] - borderSize, start[1] + size[1] - borderSize)
-		], 0, 90, fill=fcolor
-	)
-
-
-class TLGen():
-	#    reportViolations: if True, interface violations are reported to the user
-	#    abortWhenViolate: if True, violations will cause this tool to abort
-	# pipelineStartHeight: initial height allocated for the pipeline sub-image. Might be trimmed/extended during runtime
-	#          borderSize: size of borders/separators
-	#         roundedEdge: width/height of the rounded corner of rounded rectangles
-	#        sizePerCycle: width allocated for each clock cycle
-	#            laneStep: when two operations overlap, laneStep is the height difference between both operations (so that they are nicely placed)
-	#     operationHeight: height of a single operation
-	#     separatorHeight: height between two pipeline instances
-	#          clockEvery: show clock edge every X cycles
-	#            dashSize: size of the dashes used in clock edges
-	#              opInfo: operations info, composed by the following elements:
-	#                        key: operation name
-	#                        values:
-	#                          "colour": color used for this operation
-	#                          "limitgroup": define which group this operation makes part, used for violation analysis. See limitGroups for more info
-	#         limitGroups: groups used for violation analysis. Each group has a resource budget. If pipeline creates a hardware where more operations
-	#                      of a same group are allocated than the available budget, a violation occurs
-	#                        key: group name
-	#                        value: available budget
-	#      defaultOpColor: default color used for several default things
-	#      headerFontSize: ditto
-	#          headerFont: font used for header
-	#   operationFontSize: ditto
-	#       operationFont: font used for primary texts
-	# descriptionFontSize: ditto
-	#     descriptionFont: font used for secondary texts
-	def __init__(
-		self,
-		reportViolations = False, abortWhenViolate = False,
-		pipelineStartHeight = 500, borderSize = 5, roundedEdge = 10, sizePerCycle = 50, laneStep = 50, operationHeight = 100, separatorHeight = 10,
-		clockEvery = 5, dashSize = 10,
-		opInfo = {
-			"ReadReq": {"colour": (0, 0, 255, 255), "limitgroup": "ddrread"},
-			"Read": {"colour": (0, 0, 255, 255), "limitgroup": "ddrread"},
-			"WriteReq": {"colour": (0, 255, 0, 255), "limitgroup": "ddrwrite"},
-			"Write": {"colour": (0, 255, 0, 255), "limitgroup": "ddrwrite"},
-			"WriteResp": {"colour": (0, 255, 0, 255), "limitgroup": "ddrwrite"},
-			"load": {"colour": (0, 0, 127, 255), "limitgroup": "brmread"},
-			"store": {"colour": (0, 127, 0, 255), "limitgroup": "brmwrite"},
-			"fadd": {"colour": (255, 0, 0, 255), "limitgroup": None},
-			"fsub": {"colour": (255, 0, 0, 255), "limitgroup": None},
-			"fmul": {"colour": (255, 0, 0, 255), "limitgroup": None},
-			"fdiv": {"colour": (255, 0, 0, 255), "limitgroup": None}
-		},
-		limitGroups = {
-			"ddrread": 1,
-			"ddrwrite": 1,
-			"brmread": 2,
-			"brmwrite": 1
-		},
-		defaultOpColor = (200, 200, 200, 255),
-		headerFontSize = 48,
-		headerFont = "/usr/share/fonts/TTf/DejaVuSansMono.ttf",
-		operationFontSize = 40,
-		operationFont = "/usr/share/fonts/TTf/DejaVuSansMono.ttf",
-		descriptionFontSize = 28,
-		descriptionFont = "/usr/share/fonts/TTf/DejaVuSansMono.ttf"
-	):
-		self._reportViolations = reportViolations
-		self._abortWhenViolate = abortWhenViolate
-		self._pipelineStartHeight = pipelineStartHeight
-		self._borderSize = borderSize
-		self._roundedEdge = roundedEdge
-		self._sizePerCycle = sizePerCycle
-		self._laneStep = laneStep
-		self._operationHeight = operationHeight
-		self._separatorHeight = separatorHeight
-		self._clockEvery = clockEvery
-		self._dashSize = dashSize
-		self._opInfo = opInfo
-		self._limitGroups = limitGroups
-		self._defaultOpColor = defaultOpColor
-		self._headerFontSize = headerFontSize
-		self._headerFont = ImageFont.truetype(headerFont, self._headerFontSize)
-		self._operationFontSize = operationFontSize
-		self._operationFont = ImageFont.truetype(operationFont, self._operationFontSize)
-		self._descriptionFontSize = descriptionFontSize
-		self._descriptionFont = ImageFont.truetype(descriptionFont, self._descriptionFontSize)
-
-		self.reset()
-
-
-	def reset(self):
-		self._title = "Untitled"
-		self._ops = set()
-		self._maxOps = {}
-		self._opLanes = [[]]
-		self._noOfCycles = -1
-		self._II = -1
-		self._pipelineImg = None
-		self._pipelineStRg = [9999999999999, 0]
-		self._pipelineWidth = None
-		self._pipelineHeight = None
-		self._imageHeight = None
-		self._headerHeight = None
-		self._noOfPipeLanes = None
-		self._maxOps = {}
-
-
-	def setTitle(self, title):
-		self._title = title
-
-
-	def setII(self, II):
-		self._II = II
-
-
-	def getNoOfStates(self):
-		return self._pipelineStRg[1] - self._pipelineStRg[0] + 1
-
-
-	# Insert an operation on the pipeline instance
-	def insertOperation(self, img, draw, operation, start, end, *others):
-		# Find for an available lane to allocate this operation (or create a new lane if all are occupied)
-		drawLane = None
-		for lane in range(len(self._opLanes)):
-			overlaps = False
-			for occupied in self._opLanes[lane]:
-				if occupied[2] >= start and end >= occupied[1]:
-					overlaps = True
-					break
-			if not overlaps:
-				self._opLanes[lane].append((operation, start, end))
-				drawLane = lane
-				break
-		if drawLane is None:
-			drawLane = len(self._opLanes)
-			self._opLanes.append([(operation, start, end)])
-		drawStep = drawLane * self._laneStep
-
-		r, g, b, a = self._opInfo[operation]["colour"] if operation in self._opInfo else self._defaultOpColor
-		ncyc = (end - start) + 1
-
-		if drawStep + self._operationHeight > img.size[1]:
-			tmpImg = Image.new("RGBA", (self.getNoOfStates() * self._sizePerCycle, drawStep + self._operationHeight), (0, 0, 0, 255))
-			tmpImg.paste(self._pipelineImg)
-
-			self._pipelineImg = tmpImg		
-
-		drawRoundedRectangle(draw,
-			[start * self._sizePerCycle, drawStep],
-			[ncyc * self._sizePerCycle, self._operationHeight], (r, g, b, a), (int(0.8 * r), int(0.8 * g), int(0.8 * b), a),
-			borderSize = self._borderSize, roundedEdge = self._roundedEdge
-		)
-
-		draw.text(
-			(start * self._sizePerCycle + self._borderSize + self._roundedEdge, drawStep + self._borderSize), 
-			#"{} ({} cycle{})".format(operation, ncyc, "" if 1 == ncyc else "s"),
-			operation,
-			font=self._operationFont
-		)
-
-		draw.text(
-			(start * self._sizePerCycle + self._borderSize + self._roundedEdge, drawStep + 2 * self._borderSize + self._operationFontSize), 
-			", ".join(others),
-			font=self._descriptionFont
-		)
+# Output file of a pipeline when all pipelines are processed, i.e. outFile with the pipeline ID before the extension
+def getPipelineOutFile(outFile, pipeID):
+	if outFile is None:
+		return None
 
+	root, ext = os.path.splitext(outFile)
+	return "{}.{}{}".format(root, pipeID, ext)
 
-	# Generate a pipeline instance
-	def generatePipeline(self, operations):
-		# Find the state range of the operations
-		for st in operations:
-			if int(st) < self._pipelineStRg[0]:
-				self._pipelineStRg[0] = int(st)
-			for st2 in operations[st]:
-				if int(st2[0]) > self._pipelineStRg[1]:
-					self._pipelineStRg[1] = int(st2[0])
-
-		self._pipelineWidth = self.getNoOfStates() * self._sizePerCycle
-		self._pipelineImg = Image.new("RGBA", (self._pipelineWidth, self._pipelineStartHeight), (0, 0, 0, 255))
-		pipelineImgDraw = ImageDraw.Draw(self._pipelineImg)
-		offset = self._pipelineStRg[0]
-
-		# Special logic for header
-		for op in operations[str(self._pipelineStRg[0])]:
-			for op2 in operations[str(self._pipelineStRg[0] + 1)]:
-				# Merge operations if they're mergeable
-				if op[1] == op2[1]:
-					op[0] = op2[0]
-					operations[str(self._pipelineStRg[0] + 1)].remove(op2)
-
-		# Insert all operations
-		for st in range(self._pipelineStRg[0], self._pipelineStRg[1] + 1):
-			if str(st) in operations:
-				for op in operations[str(st)]:
-					self._ops.add(op[1][1])
-					#self.insertOperation(self._pipelineImg, pipelineImgDraw, op[1][1], int(st), op[0], *op[1])
-					self.insertOperation(self._pipelineImg, pipelineImgDraw, op[1][1], int(st) - offset, op[0] - offset, "{} cycles".format(op[0] - int(st) + 1))
-
-		# Trim pipeline sub-image
-		self._pipelineHeight = self._operationHeight + (len(self._opLanes) - 1) * self._laneStep
-		self._pipelineImg = self._pipelineImg.crop((0, 0, self._pipelineWidth, self._pipelineHeight))
-
-
-	# Draw a pipeline instance on a given offset position
-	def drawPipeline(self, img, offset, lane):
-		img.paste(self._pipelineImg, (self._sizePerCycle * offset, (self._pipelineHeight + self._separatorHeight) * lane + self._headerHeight))
-
-
-	# Draw clock edges
-	def drawClockBorder(self, draw, offset, clock):
-		if 0 == offset % self._clockEvery:
-			draw.text(
-				(self._sizePerCycle * offset, self._headerHeight - self._descriptionFontSize - self._separatorHeight),
-				"{}".format(clock),
-				font=self._descriptionFont,
-				fill=self._defaultOpColor
-			)
-
-			for base in range(self._headerHeight, self._imageHeight, self._dashSize * 2):
-				draw.rectangle([
-						(self._sizePerCycle * offset, base),
-						(self._sizePerCycle * offset + self._borderSize, base + self._dashSize),
-					],
-					fill = self._defaultOpColor
-				)
-
-
-	# Generate header with violation information
-	def generateHeader(self, img, operations):
-		draw = ImageDraw.Draw(img)
-
-		draw.text((0, 0), self._title, font = self._headerFont, fill = self._defaultOpColor)
-		draw.text(
-			(0, self._headerFontSize + self._borderSize), "Generated at {}".format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-			font = self._descriptionFont,
-			fill = self._defaultOpColor
-		)
 
-		maxAmtPerGroup = {}
-
-		# O(n^5) it is!
-		for st in range(self.getNoOfStates()):
-			amtPerGroup = {}
-			for op in self._ops:
-				amt = 0
-				for st1 in range(st, -1, -(self._II)):
-					for st2 in operations:
-						if int(st2) == (st1 + self._pipelineStRg[0]):
-							for op1 in operations[st2]:
-								if op1[1][1] == op:
-									amt += 1
-				if op not in self._maxOps or amt > self._maxOps[op][0]:
-					self._maxOps[op] = (amt, "max # par. {}: {} at cycle {}".format(op, amt, st + self._pipelineStRg[0]))
-
-					if self._reportViolations:
-						limitGroup = self._opInfo[op]["limitgroup"]
-						if limitGroup is not None:
-							if limitGroup not in amtPerGroup:
-								amtPerGroup[limitGroup] = 0
-							amtPerGroup[limitGroup] += amt
-
-			for group in amtPerGroup:
-				if group not in maxAmtPerGroup:
-					maxAmtPerGroup[group] = (-1, -1)
-				if amtPerGroup[group] > maxAmtPerGroup[group][1]:
-					maxAmtPerGroup[group] = (st + self._pipelineStRg[0], amtPerGroup[group])
-
-		for group in maxAmtPerGroup:
-			if maxAmtPerGroup[group][1] > self._limitGroups[group]:
-				violation = "Violation at cycle {}: {} simultaneously allocated for class \"{}\"".format(maxAmtPerGroup[group][0], maxAmtPerGroup[group][1], group)
-				if self._abortWhenViolate:
-					raise RuntimeError(violation)
-				else:
-					print(violation)
+# Analyse a single pipeline and, if outFile is not None, draw its timeline. Runs on a worker process
+# tlgenArgs: additional arguments of TLGen (see timeline.py)
+#   profile: if True, the phases of this pipeline are profiled and the results are returned on "profile"
+# Returns the summary entry of this pipeline
+def processPipeline(pipeID, title, ii, startState, operations, outFile, tlgenArgs = {}, profile = False):
+	startTime = time.perf_counter()
+	result = {"pipeline": pipeID, "ii": ii, "startState": startState, "output": outFile}
+	profiler = Profiler("pipelook") if profile else NULL_PROFILER
 
-		i = 0
-		for op in self._maxOps:
-			draw.text(
-				(0, self._headerFontSize + self._borderSize + (self._descriptionFontSize + self._borderSize) * (i + 1)),
-				self._maxOps[op][1],
-				font = self._descriptionFont,
-				fill = self._defaultOpColor
-			)
-			i += 1
+	try:
+		tlgen = TLGen(reportViolations=True, printViolations=False, profiler=profiler, **tlgenArgs)
 
+		tlgen.setTitle(title)
+		tlgen.setII(ii)
+		if outFile is None:
+			tlgen.analyse(operations)
+		elif outFile.lower().endswith(".svg"):
+			tlgen.generateSvg(operations, outFile)
+		else:
+			tlgen.generate(operations, outFile)
 
-	# Generate timeline with several pipeline instances according to II
-	def generate(self, operations, pngFile = None):
-		if self._pipelineImg is None:
-			self.generatePipeline(operations)
-
-		self._headerHeight = self._headerFontSize + (len(self._ops) + 1) * (self._operationFontSize + self._borderSize) + self._descriptionFontSize
-		# _=.=_
-		self._noOfPipeLanes = int((math.ceil((self.getNoOfStates() + 1) / self._II)))
-		self._imageHeight = self._noOfPipeLanes * (self._pipelineHeight + self._separatorHeight) + self._headerHeight
-		img = Image.new("RGBA", (
-			self._pipelineWidth,
-			self._imageHeight,
-		), (0, 0, 0, 255))
-
-		self.generateHeader(img, operations)
-
-		if pngFile is not None:
-			for i in range(self._noOfPipeLanes):
-				self.drawPipeline(img, i * self._II, i)
-
-			draw = ImageDraw.Draw(img)
-
-			for i in range(self.getNoOfStates()):
-				self.drawClockBorder(draw, i, i + self._pipelineStRg[0])
+		result.update(tlgen.getAnalysis())
+		result["error"] = None
+	except Exception as e:
+		result["error"] = "{}: {}".format(type(e).__name__, e)
 
-			img.save(pngFile)
+	result["time"] = time.perf_counter() - startTime
+	if profile:
+		result["profile"] = profiler.getResults()
+	return result
 
 
 if "__main__" == __name__:
 	rptFile = None
 	jsonFile = None
-	pngFile = None
+	outFile = None
 	pipeID = "Pipeline-0"
 	ii = None
 	startState = None
 	kernelName = ""
-
-	if len(sys.argv) < 3:
+	useCache = True
+	clearCache = False
+	cacheDir = None
+	cacheSize = DEFAULT_MAX_SIZE
+	allPipelines = False
+	noOfWorkers = os.cpu_count()
+	summaryFile = None
+	reportFile = None
+	activeFilters = []
+	filters = FILTERS
+	tlgenArgs = {}
+	profiler = NULL_PROFILER
+
+	if len(sys.argv) < 2:
 		printUsage()
 		exit(1)
 
 	# Get command line options
-	opts, args = getopt.getopt(sys.argv[1:-2], "s:i:p:o:h", ["state=", "ii=", "pipe=", "output=", "help"])
+	opts, args = getopt.getopt(sys.argv[1:], "s:i:p:o:r:an:f:h", ["state=", "ii=", "pipe=", "output=", "report=", "all", "filter=", "filters=", "workers=", "summary=", "no-cache", "clear-cache", "cache-dir=", "cache-size=", "profile=", "help"])
 
 	# Parse command line options
 	for o, a in opts:
@@ -497,49 +165,160 @@ if "__main__" == __name__:
 		elif o in ("-p", "--pipe"):
 			pipeID = a
 		elif o in ("-o", "--output"):
-			pngFile = a
+			outFile = a
+		elif o in ("-r", "--report"):
+			reportFile = a
+		elif o in ("-a", "--all"):
+			allPipelines = True
+		elif o in ("-n", "--workers"):
+			noOfWorkers = int(a)
+			if noOfWorkers <= 0:
+				raise RuntimeError("Invalid value supplied for \"--workers\": {}".format(noOfWorkers))
+		elif o in ("-f", "--filter"):
+			activeFilters.append(a)
+		elif "--filters" == o:
+			filters, opInfo, limitGroups = loadFilterSpec(a)
+			tlgenArgs = {}
+			if opInfo is not None:
+				tlgenArgs["opInfo"] = opInfo
+			if limitGroups is not None:
+				tlgenArgs["limitGroups"] = limitGroups
+		elif "--summary" == o:
+			summaryFile = a
+		elif "--no-cache" == o:
+			useCache = False
+		elif "--clear-cache" == o:
+			clearCache = True
+		elif "--cache-dir" == o:
+			cacheDir = a
+		elif "--cache-size" == o:
+			cacheSize = int(a) * 1024 * 1024
+		elif "--profile" == o:
+			profiler = Profiler("pipelook")
+			atexit.register(profiler.write, a)
 		else:
 			printUsage()
 			exit(1)
 
-	rptFile = sys.argv[-2]
-	jsonFile = sys.argv[-1]
+	if len(args) not in (1, 2):
+		printUsage()
+		exit(1)
 
-	kernelInfoRgx = re.compile(r"== Vivado HLS Report for '([^']+)'.*")
-	pipeInfoRgx = re.compile(r" +{} +: +II += +(\d+),.*, States = {{ +(\d+).*".format(pipeID))
+	rptFile = args[0]
+	jsonFile = args[1] if len(args) > 1 else None
 
-	with open(rptFile, "r") as rptF, open(jsonFile, "r") as jsonF:
-		if startState is None:
-			for l in rptF.readlines():
-				kernelInfoMatch = kernelInfoRgx.match(l)
-				if kernelInfoMatch is not None:
-					kernelName = kernelInfoMatch.group(1)
-				else:
-					pipeInfoMatch = pipeInfoRgx.match(l)
-					if pipeInfoMatch is not None:
-						if ii is None:
-							ii = int(pipeInfoMatch.group(1))
-						startState = int(pipeInfoMatch.group(2))
-						break
+	if jsonFile is not None and len(activeFilters) > 0:
+		raise RuntimeError("\"--filter\" cannot be used together with JSONFILE")
+
+	if allPipelines and (startState is not None or ii is not None or any(o in ("-p", "--pipe") for o, a in opts)):
+		raise RuntimeError("\"--all\" cannot be used together with \"--state\", \"--ii\" or \"--pipe\"")
+	if allPipelines and reportFile is not None:
+		raise RuntimeError("\"--all\" cannot be used together with \"--report\", use \"--summary\" instead")
+
+	if clearCache:
+		ParseCache(cacheDir).clear()
+
+	# With JSONFILE, only the schedule summary of the report is needed, so its operations are neither parsed nor cached
+	with profiler.phase("parse"):
+		if jsonFile is not None:
+			parsed = loadSchedule(rptFile, profiler)
+		else:
+			parsed = loadReport(rptFile, ParseCache(cacheDir, cacheSize) if useCache else None, filters, profiler, noOfWorkers)
+	kernelName = parsed.kernelName
 
+	# Operations of the FSM are loaded once, either from the JSON file of fsmgen.py or directly from the report
+	with profiler.phase("operations"):
+		if jsonFile is not None:
+			nodeOperations = loadNodeOperations(jsonFile)
+		else:
+			nodeOperations = getNodeOperations(parsed, activeFilters if len(activeFilters) > 0 else list(filters), profiler)
+
+	if allPipelines:
+		startTime = time.perf_counter()
+
+		if 0 == len(parsed.pipelines):
+			raise RuntimeError("No pipelines found in RPT file")
+
+		# Each worker only receives the operations of its pipeline
+		results = {}
+		tasks = []
+		for pipeID in parsed.pipelines:
+			ii, startState = parsed.pipelines[pipeID]
+			try:
+				tasks.append((pipeID, "{} {} (II = {})".format(kernelName, pipeID, ii), ii, startState, getPipelineOperations(nodeOperations, startState), getPipelineOutFile(outFile, pipeID), tlgenArgs, profiler.enabled))
+			except RuntimeError as e:
+				results[pipeID] = {"pipeline": pipeID, "ii": ii, "startState": startState, "output": None, "error": "{}: {}".format(type(e).__name__, e), "time": 0.0}
+				sys.stderr.write("{}: {}\n".format(pipeID, results[pipeID]["error"]))
+
+		# Biggest pipelines are submitted first, so that they do not end up alone at the end of the run
+		tasks.sort(key=lambda t: sum(len(t[4][st]) for st in t[4]), reverse=True)
+
+		with profiler.phase("pipelines"), concurrent.futures.ProcessPoolExecutor(max_workers=max(min(noOfWorkers, len(tasks)), 1)) as executor:
+			futures = [executor.submit(processPipeline, *task) for task in tasks]
+
+			for future in concurrent.futures.as_completed(futures):
+				result = future.result()
+				results[result["pipeline"]] = result
+				if "profile" in result:
+					profiler.attach(result["pipeline"], result.pop("profile"))
+
+				if result["error"] is None:
+					print("{} ({:.2f}s): II = {}, {} states, {} violations".format(result["pipeline"], result["time"], result["ii"], result["states"], len(result["violations"])))
+					for violation in result["violations"]:
+						print("{}: Violation at cycle {}: {} simultaneously allocated for class \"{}\"".format(result["pipeline"], violation["cycle"], violation["amount"], violation["group"]))
+				else:
+					sys.stderr.write("{} ({:.2f}s): {}\n".format(result["pipeline"], result["time"], result["error"]))
+
+		results = [results[pipeID] for pipeID in parsed.pipelines]
+		noOfFailures = sum(1 for r in results if r["error"] is not None)
+		noOfViolations = sum(len(r["violations"]) for r in results if r["error"] is None)
+
+		if summaryFile is not None:
+			with open(summaryFile, "w") as summaryF:
+				summaryF.write(json.dumps({
+					"report": rptFile,
+					"kernel": kernelName,
+					"workers": noOfWorkers,
+					"time": time.perf_counter() - startTime,
+					"failures": noOfFailures,
+					"violations": noOfViolations,
+					"pipelines": results
+				}, indent=2))
+
+		# Without timelines, violations are treated as failures just like when a single pipeline is analysed
+		exit(1 if noOfFailures > 0 or (outFile is None and noOfViolations > 0) else 0)
+
+	if startState is None and pipeID in parsed.pipelines:
 		if ii is None:
-			raise RuntimeError("II could not be inferred from RPT file or \"-s\" option is used but no II supplied")
-		if startState is None:
-			raise RuntimeError("Start state of pipeline could not be inferred from RPT file. Please supply manually with \"-s\"")
+			ii = parsed.pipelines[pipeID][0]
+		startState = parsed.pipelines[pipeID][1]
 
-		fsmDict = json.load(jsonF)
+	if ii is None:
+		raise RuntimeError("II could not be inferred from RPT file or \"-s\" option is used but no II supplied")
+	if startState is None:
+		raise RuntimeError("Start state of pipeline could not be inferred from RPT file. Please supply manually with \"-s\"")
 
-		if str(startState + 1) not in fsmDict:
-			raise RuntimeError("Supplied body state {} is not first state of a FSM basic block".format(startState))
-		if str(startState) not in fsmDict:
-			fsmDict[str(startState)] = {str(startState): []}
+	tlgen, operations = getTimeline(
+		parsed, nodeOperations, ii=ii, startState=startState,
+		reportViolations=True, abortWhenViolate=(outFile is None and reportFile is None), printViolations=(reportFile != "-"), profiler=profiler, **tlgenArgs
+	)
 
-		mergedFsmDict = fsmDict[str(startState + 1)]
-		for i in fsmDict[str(startState)]:
-			mergedFsmDict[i] = fsmDict[str(startState)][i]
+	with profiler.phase("timeline"):
+		if outFile is None:
+			tlgen.analyse(operations)
+		elif outFile.lower().endswith(".svg"):
+			tlgen.generateSvg(operations, outFile)
+		else:
+			tlgen.generate(operations, outFile)
 
-		tlgen = TLGen(reportViolations=True, abortWhenViolate=(pngFile is None))
+	if reportFile is not None:
+		report = {"report": rptFile, "kernel": kernelName, "ii": ii, "startState": startState}
+		report.update(tlgen.getAnalysis())
 
-		tlgen.setTitle("{} (II = {})".format(kernelName, ii))
-		tlgen.setII(ii)
-		tlgen.generate(mergedFsmDict, pngFile)
+		if "-" == reportFile:
+			print(json.dumps(report, indent=2))
+		else:
+			with open(reportFile, "w") as reportF:
+				reportF.write(json.dumps(report, indent=2))
+
+		exit(1 if len(tlgen.getViolations()) > 0 else 0)
@@ -0,0 +1,67 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import os, sys, tempfile, unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from vivadofsm.artifacts import generateArtifacts
+from vivadofsm.rptparser import parseReport
+from vivadofsm.rptreader import RptReader
+
+
+# Generate the DOT file of an example report with its loops collapsed "depth" levels deep and return its contents
+def getCollapsedDot(rptFile, depth):
+	with RptReader(os.path.join(REPO_DIR, rptFile)) as reader:
+		parsed = parseReport(reader)
+
+	with tempfile.TemporaryDirectory() as tmpDir:
+		dotFile = os.path.join(tmpDir, "fsm.dot")
+		generateArtifacts(parsed, dotFile, ["ddr"], depth=depth)
+		with open(dotFile, "r") as dotF:
+			return dotF.read()
+
+
+class TestLoopCollapsing(unittest.TestCase):
+	# The trip count of the outer (flattened) loop of bicg is on state 5, which heads a nested loop
+	def test_outerLoopTripCount(self):
+		dot = getCollapsedDot("examples/fsmgen/bicg.verbose.sched.rpt", 0)
+		self.assertIn("loop 3-1842\\l1840 states, trip count 65536\\l", dot)
+
+
+	def test_innerLoopTripCount(self):
+		dot = getCollapsedDot("examples/fsmgen/bicg.verbose.sched.rpt", 1)
+		self.assertIn("loop 141-276\\l136 states, trip count 256\\l135 ddr operations\\l", dot)
+
+
+if "__main__" == __name__:
+	unittest.main()
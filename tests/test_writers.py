@@ -0,0 +1,68 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import gzip, os, sys, tempfile, unittest
+from unittest import mock
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from vivadofsm.writers import DotWriter
+
+
+# Write a small DOT file with onlyIfChanged, as if from the process "pid". Returns whether the file was (re)written
+def writeDot(dotFile, pid):
+	with mock.patch("os.getpid", return_value=pid):
+		writer = DotWriter(dotFile, onlyIfChanged=True)
+	with writer:
+		writer.writeNode("s1", "ST_1")
+		writer.writeNode("s2", "ST_2")
+		writer.writeEdge("s1", "s2", "true")
+	return writer.changed
+
+
+class TestOnlyIfChanged(unittest.TestCase):
+	# The name of the temporary file must not end up on the gzip header, or every process would write different bytes
+	def test_sameCompressedContentFromTwoProcesses(self):
+		with tempfile.TemporaryDirectory() as tmpDir:
+			dotFile = os.path.join(tmpDir, "fsm.dot.gz")
+			self.assertTrue(writeDot(dotFile, 1000))
+			os.utime(dotFile, ns=(0, 0))
+
+			self.assertFalse(writeDot(dotFile, 2000))
+			self.assertEqual(os.stat(dotFile).st_mtime_ns, 0)
+			self.assertEqual(os.listdir(tmpDir), ["fsm.dot.gz"])
+			with gzip.open(dotFile, "rt") as dotF:
+				self.assertIn("ST_2", dotF.read())
+
+
+if "__main__" == __name__:
+	unittest.main()
@@ -0,0 +1,203 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+from vivadofsm.fsmgraph import buildSimplifiedGraph, importNetworkx
+from vivadofsm.fsmrender import FsmRenderer
+from vivadofsm.loops import buildHierarchicalGraph
+from vivadofsm.opmerge import mergeOperations
+from vivadofsm.opstore import OpStoreWriter
+from vivadofsm.profiler import NULL_PROFILER
+from vivadofsm.writers import CsvWriter, DotWriter, JsonWriter, replaceIfChanged
+
+
+# Generate the DOT file of a parsed report (see rptparser.ParsedReport) and, optionally, the CSV and JSON files
+# with the operations of the active filters, a GraphML export (requires networkx) and an SVG or PNG image of the FSM
+# drawn by FsmRenderer (PNG requires Pillow). If onlyIfChanged is True, output files that already exist with the
+# same content are not rewritten. If depth is supplied, the DOT file, the GraphML export and the image show the loops
+# nested "depth" levels deep collapsed into a single node each (see loops.buildHierarchicalGraph()), annotated with
+# their states, trip count and number of filtered operations, while the CSV, JSON and columnar files still list every
+# operation. Each step is measured as a phase of the profiler (see profiler.py).
+# Returns a dict with some statistics of the generated FSM:
+#    "states": number of FSM states on the report
+#     "nodes": number of nodes after simplification (including the end node)
+#   "filtered": number of operation lines matched by each active filter
+#    "written": output files that were actually (re)written
+def generateArtifacts(parsed, dotFile, activeFilters = [], csvFile = None, jsonFile = None, compactJson = False, graphmlFile = None, imageFile = None, onlyIfChanged = False, opsFile = None, profiler = NULL_PROFILER, depth = None):
+	with profiler.phase("filter"):
+		filteredLines = parsed.getFilteredLines(activeFilters)
+	with profiler.phase("simplify"):
+		graph, origNodes = buildSimplifiedGraph(parsed, profiler)
+		view = graph if depth is None else buildHierarchicalGraph(graph, depth, profiler)
+
+	noOfDigitsInState = len(str(origNodes - 1))
+	formatStrSingle = "\\l{}(state {{:0{}}}) ".format(" " * (4 + noOfDigitsInState), noOfDigitsInState)
+	formatStrSuper = "\\l(states {{:0{}}} - {{:0{}}}) ".format(noOfDigitsInState, noOfDigitsInState)
+	renderStrSingle = "{}(state {{:0{}}}) ".format(" " * (4 + noOfDigitsInState), noOfDigitsInState)
+	renderStrSuper = "(states {{:0{}}} - {{:0{}}}) ".format(noOfDigitsInState, noOfDigitsInState)
+
+	# Active filters of the operation lines of each state, for the summary of loop nodes
+	filtersPerState = {}
+	if depth is not None:
+		for _, classified in parsed.operations:
+			for filterName, stateNo, _ in classified:
+				if filterName in activeFilters:
+					filtersPerState.setdefault(stateNo, []).append(filterName)
+
+	# Everything is written as it is produced
+	dotW = DotWriter(dotFile, onlyIfChanged)
+	csvW = None if csvFile is None else CsvWriter(csvFile, onlyIfChanged)
+	jsonW = None if jsonFile is None else JsonWriter(jsonFile, compactJson, onlyIfChanged)
+	opsW = None if opsFile is None else OpStoreWriter(opsFile, onlyIfChanged)
+	renderer = None if imageFile is None else FsmRenderer(imageFile)
+
+	try:
+		with profiler.phase("write"):
+			# Write a node of the simplified graph and its operations. The node is only written to the DOT file and to
+			# the image if toGraph is True (i.e. it is not part of a loop node)
+			def writeNode(n, toGraph):
+				states = graph.getStates(n)
+				if toGraph:
+					dotW.beginRecordNode(graph.getNodeName(n), graph.getNodeLabel(n))
+					if renderer is not None:
+						renderer.addNode(graph.getNodeName(n), graph.getNodeLabel(n), states[0])
+				if csvW is not None:
+					csvW.beginNode(graph.getNodeLabel(n))
+
+				# If there are filtered lines, we should print them as well. Repeated operations on consecutive states are merged
+				with profiler.phase("merge"):
+					mergedFilteredLines = mergeOperations(states, filteredLines)
+				if jsonW is not None and len(mergedFilteredLines) > 0:
+					jsonW.writeEntry(states[0], mergedFilteredLines)
+				if opsW is not None and len(mergedFilteredLines) > 0:
+					opsW.writeEntry(states[0], mergedFilteredLines)
+
+				for mergedIdx in mergedFilteredLines:
+					for mergedLine in mergedFilteredLines[mergedIdx]:
+						if csvW is not None:
+							csvW.writeOperation(mergedIdx, mergedLine[0], mergedLine[1])
+						if not toGraph:
+							continue
+
+						# Transaction not merged
+						if mergedIdx == mergedLine[0]:
+							# I apologise for this next line
+							dotW.addRecordLine(formatStrSingle.format(mergedIdx))
+						# Transaction merged
+						else:
+							dotW.addRecordLine(formatStrSuper.format(mergedIdx, mergedLine[0]))
+
+						dotW.addRecordLine(", ".join(mergedLine[1]))
+						if renderer is not None:
+							renderStr = renderStrSingle.format(mergedIdx) if mergedIdx == mergedLine[0] else renderStrSuper.format(mergedIdx, mergedLine[0])
+							renderer.addLine(graph.getNodeName(n), renderStr + ", ".join(mergedLine[1]))
+
+				if csvW is not None:
+					csvW.endNode()
+				if toGraph:
+					dotW.endRecordNode()
+
+			# Write nodes
+			for n in view.getNodes():
+				# Special treatment for end node and for the external states of a window, which are ranked by their ID
+				if view.isEndNode(n) or view.isExternalNode(n):
+					dotW.writeNode(view.getNodeName(n), view.getNodeLabel(n))
+					if renderer is not None:
+						renderer.addNode(view.getNodeName(n), view.getNodeLabel(n), n, True)
+					continue
+
+				if not view.isLoopNode(n):
+					writeNode(n, True)
+					continue
+
+				# Loops only show a summary of their states and operations
+				for m in view.getLoopMembers(n):
+					writeNode(m, False)
+
+				states = view.getStates(n)
+				summary = ["{} state{}".format(len(states), "" if 1 == len(states) else "s")]
+				tripCounts = [parsed.tripCounts[s] for s in view.getLoopTripCountStates(n) if s in parsed.tripCounts]
+				if len(tripCounts) > 0:
+					minTrips, maxTrips, _ = tripCounts[0]
+					summary[0] += ", trip count {}".format(minTrips if minTrips == maxTrips else "{}-{}".format(minTrips, maxTrips))
+				for activeFilter in activeFilters:
+					noOfOperations = sum(1 for s in states for f in filtersPerState.get(s, []) if f == activeFilter)
+					if noOfOperations > 0:
+						summary.append("{} {} operations".format(noOfOperations, activeFilter))
+
+				dotW.beginRecordNode(view.getNodeName(n), view.getNodeLabel(n))
+				if renderer is not None:
+					renderer.addNode(view.getNodeName(n), view.getNodeLabel(n), min(states))
+				for line in summary:
+					dotW.addRecordLine("\\l" + line)
+					if renderer is not None:
+						renderer.addLine(view.getNodeName(n), line)
+				dotW.endRecordNode()
+
+			# Write edges
+			for src, dst, condition in view.getEdges():
+				dotW.writeEdge(view.getNodeName(src), view.getNodeName(dst), condition)
+				if renderer is not None:
+					renderer.addEdge(view.getNodeName(src), view.getNodeName(dst), condition)
+	finally:
+		for writer in (dotW, csvW, jsonW, opsW):
+			if writer is not None:
+				writer.close()
+
+	written = [w.getFileName() for w in (dotW, csvW, jsonW, opsW) if w is not None and w.changed]
+
+	if renderer is not None:
+		with profiler.phase("render"):
+			if renderer.render(onlyIfChanged):
+				written.append(imageFile)
+		profiler.count("lanesAllocated", renderer.getNoOfLanes())
+
+	# Export to GraphML if applicable
+	if graphmlFile is not None:
+		with profiler.phase("graphml"):
+			nx = importNetworkx()
+
+			if onlyIfChanged:
+				tmpFile = "{}.{}.tmp".format(graphmlFile, os.getpid())
+				nx.write_graphml(view.toNetworkx(), tmpFile)
+				if replaceIfChanged(tmpFile, graphmlFile):
+					written.append(graphmlFile)
+			else:
+				nx.write_graphml(view.toNetworkx(), graphmlFile)
+				written.append(graphmlFile)
+
+	return {
+		"states": len(parsed.states),
+		"nodes": view.getNoOfNodes(),
+		"filtered": {activeFilter: parsed.countOperations(activeFilter) for activeFilter in activeFilters},
+		"filterStats": parsed.filterStats,
+		"written": written
+	}
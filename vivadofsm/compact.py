@@ -0,0 +1,95 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from array import array
+
+
+# Build CSR-style adjacency arrays for nodes 0 to noOfNodes - 1 from the parallel arrays of edge sources and destinations.
+# The outgoing edges of node v are succEdges[succStart[v]:succStart[v + 1]] and the incoming edges are
+# predEdges[predStart[v]:predStart[v + 1]], both holding edge indices in the same order as the edges were supplied
+def buildAdjacency(noOfNodes, sources, destinations):
+	succStart = array("q", bytes(8 * (noOfNodes + 1)))
+	predStart = array("q", bytes(8 * (noOfNodes + 1)))
+
+	# Count degrees, then turn them into offsets
+	for e in range(len(sources)):
+		succStart[sources[e] + 1] += 1
+		predStart[destinations[e] + 1] += 1
+	for v in range(noOfNodes):
+		succStart[v + 1] += succStart[v]
+		predStart[v + 1] += predStart[v]
+
+	succEdges = array("q", bytes(8 * succStart[noOfNodes]))
+	predEdges = array("q", bytes(8 * predStart[noOfNodes]))
+	succFill = array("q", succStart)
+	predFill = array("q", predStart)
+	for e in range(len(sources)):
+		succEdges[succFill[sources[e]]] = e
+		succFill[sources[e]] += 1
+		predEdges[predFill[destinations[e]]] = e
+		predFill[destinations[e]] += 1
+
+	return succStart, succEdges, predStart, predEdges
+
+
+# Find all maximal chains of nodes that have a single incoming and a single outgoing edge, i.e. sequences
+# of states that are always executed from start to end once entered. Nodes do not need to be numbered
+# sequentially along the chain. Adjacency is given as returned by buildAdjacency(). Runs in O(V + E).
+#
+# Returns a list of chains (each a list of nodes, in execution order) with at least minLength nodes,
+# sorted by their first node. Closed cycles formed only by such nodes have no entry and are ignored.
+# Nodes flagged on "fixed" (a bytearray indexed by node, if supplied) are never part of a chain
+def findChains(succStart, succEdges, predStart, predEdges, sources, destinations, minLength = 2, fixed = None):
+	noOfNodes = len(succStart) - 1
+	single = bytearray(noOfNodes)
+	chains = []
+
+	for v in range(noOfNodes):
+		if fixed is not None and fixed[v]:
+			continue
+		if 1 == succStart[v + 1] - succStart[v] and 1 == predStart[v + 1] - predStart[v]:
+			single[v] = 1
+
+	for v in range(noOfNodes):
+		# Only chain heads (i.e. whose predecessor is not part of the chain) start a walk, so every node is visited once
+		if not single[v] or single[sources[predEdges[predStart[v]]]]:
+			continue
+
+		chain = [v]
+		nextNode = destinations[succEdges[succStart[v]]]
+		while single[nextNode]:
+			chain.append(nextNode)
+			nextNode = destinations[succEdges[succStart[nextNode]]]
+
+		if len(chain) >= minLength:
+			chains.append(chain)
+
+	return chains
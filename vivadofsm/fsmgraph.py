@@ -0,0 +1,437 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+from array import array
+from vivadofsm.compact import buildAdjacency, findChains
+from vivadofsm.profiler import NULL_PROFILER
+
+
+# Kinds of nodes
+STATE = 0
+END = 1
+SUPER = 2
+REMOVED = 3
+# States outside of a window of the report (see rptparser.ParsedReport.getWindow()), which are never merged
+EXTERNAL = 4
+# Loops merged into a single node (see collapse())
+LOOP = 5
+
+# networkx is only needed for GraphML export, so it is imported on first use (see importNetworkx())
+nx = None
+
+
+# Import networkx on first use. Returns its module
+def importNetworkx():
+	global nx
+
+	if nx is None:
+		try:
+			import networkx as nx
+		except ImportError:
+			raise RuntimeError("GraphML export requires networkx")
+
+	return nx
+
+
+# Compact FSM graph. Nodes are integers (the state number for states) and edges are kept on parallel
+# arrays, with their conditions interned on a label table. Adjacency is built on demand in CSR form.
+# Nodes and edges are iterated in insertion order. Supernodes (see compact()) and loop nodes (see collapse()) receive
+# IDs above all other nodes
+class FsmGraph():
+	__slots__ = (
+		"_nodes", "_kinds", "_members", "_loops", "_edgeSrc", "_edgeDst", "_edgeLabel", "_edgeIndex",
+		"_labels", "_labelIDs", "_noOfIDs", "_adjacency"
+	)
+
+
+	def __init__(self):
+		# Node IDs in insertion order
+		self._nodes = array("q")
+		# Kind of each node, indexed by node ID
+		self._kinds = bytearray()
+		# States merged on each supernode or loop node
+		self._members = {}
+		# Header and nodes (of the graph it was collapsed from) of each loop node, plus its states in the order its trip
+		# count is searched
+		self._loops = {}
+		self._edgeSrc = array("q")
+		self._edgeDst = array("q")
+		self._edgeLabel = array("l")
+		# (source, destination) to edge index, so that repeated edges only update their condition
+		self._edgeIndex = {}
+		self._labels = []
+		self._labelIDs = {}
+		self._noOfIDs = 0
+		self._adjacency = None
+
+
+	def _internLabel(self, label):
+		labelID = self._labelIDs.get(label)
+		if labelID is None:
+			labelID = len(self._labels)
+			self._labels.append(sys.intern(label))
+			self._labelIDs[label] = labelID
+		return labelID
+
+
+	def addNode(self, v, kind = STATE):
+		if v >= self._noOfIDs:
+			self._kinds.extend(bytes([REMOVED]) * (v + 1 - self._noOfIDs))
+			self._noOfIDs = v + 1
+
+		if REMOVED == self._kinds[v]:
+			self._nodes.append(v)
+			self._adjacency = None
+		self._kinds[v] = kind
+
+
+	def addEdge(self, src, dst, label):
+		if not self.hasNode(src):
+			self.addNode(src)
+		if not self.hasNode(dst):
+			self.addNode(dst)
+
+		edgeID = self._edgeIndex.get((src, dst))
+		if edgeID is None:
+			self._edgeIndex[(src, dst)] = len(self._edgeSrc)
+			self._edgeSrc.append(src)
+			self._edgeDst.append(dst)
+			self._edgeLabel.append(self._internLabel(label))
+			self._adjacency = None
+		else:
+			self._edgeLabel[edgeID] = self._internLabel(label)
+
+
+	def addEndNode(self, src, label):
+		endNode = max(self.getNoOfNodes() + 1, self._noOfIDs)
+		self.addNode(endNode, END)
+		self.addEdge(src, endNode, label)
+		return endNode
+
+
+	def addSuperNode(self, states):
+		superNode = self._noOfIDs
+		self.addNode(superNode, SUPER)
+		self._members[superNode] = array("q", states)
+		return superNode
+
+
+	# Remove a node and all its edges
+	def removeNode(self, v):
+		if not self.hasNode(v):
+			return
+
+		self._kinds[v] = REMOVED
+		self._nodes = array("q", (n for n in self._nodes if n != v))
+		self._members.pop(v, None)
+
+		keep = [e for e in range(len(self._edgeSrc)) if self._edgeSrc[e] != v and self._edgeDst[e] != v]
+		self._edgeSrc = array("q", (self._edgeSrc[e] for e in keep))
+		self._edgeDst = array("q", (self._edgeDst[e] for e in keep))
+		self._edgeLabel = array("l", (self._edgeLabel[e] for e in keep))
+		self._edgeIndex = {(self._edgeSrc[e], self._edgeDst[e]): e for e in range(len(self._edgeSrc))}
+		self._adjacency = None
+
+
+	def hasNode(self, v):
+		return v < self._noOfIDs and self._kinds[v] != REMOVED
+
+
+	def getNoOfNodes(self):
+		return len(self._nodes)
+
+
+	def getNoOfEdges(self):
+		return len(self._edgeSrc)
+
+
+	# Node IDs in insertion order
+	def getNodes(self):
+		return iter(self._nodes)
+
+
+	def isEndNode(self, v):
+		return END == self._kinds[v]
+
+
+	def isSuperNode(self, v):
+		return SUPER == self._kinds[v]
+
+
+	def isExternalNode(self, v):
+		return EXTERNAL == self._kinds[v]
+
+
+	def isLoopNode(self, v):
+		return LOOP == self._kinds[v]
+
+
+	# Node of the graph that this loop node was collapsed from where the loop is entered
+	def getLoopHeader(self, v):
+		return self._loops[v][0]
+
+
+	# Nodes of the graph that this loop node was collapsed from, in the order of that graph
+	def getLoopMembers(self, v):
+		return self._loops[v][1]
+
+
+	# States of a loop node in the order its trip count is searched (see loops.getTripCountOrder())
+	def getLoopTripCountStates(self, v):
+		return self._loops[v][2]
+
+
+	# States represented by this node: itself for states, the merged states for supernodes and loop nodes and none for
+	# end and external nodes
+	def getStates(self, v):
+		if SUPER == self._kinds[v] or LOOP == self._kinds[v]:
+			return self._members[v]
+		elif END == self._kinds[v] or EXTERNAL == self._kinds[v]:
+			return []
+		return [v]
+
+
+	# Name used to identify this node on outputs (e.g. "12" for state 12 or "10to15" for a supernode)
+	def getNodeName(self, v):
+		if SUPER == self._kinds[v]:
+			return "{}to{}".format(self._members[v][0], self._members[v][-1])
+		elif LOOP == self._kinds[v]:
+			return "loop{}to{}".format(min(self._members[v]), max(self._members[v]))
+		return str(v)
+
+
+	def getNodeLabel(self, v):
+		if SUPER == self._kinds[v]:
+			return "{}-{}".format(self._members[v][0], self._members[v][-1])
+		elif END == self._kinds[v]:
+			return "end"
+		elif EXTERNAL == self._kinds[v]:
+			return "ext {}".format(v)
+		elif LOOP == self._kinds[v]:
+			return "loop {}-{}".format(min(self._members[v]), max(self._members[v]))
+		return str(v)
+
+
+	# CSR adjacency, see compact.buildAdjacency()
+	def getAdjacency(self):
+		if self._adjacency is None:
+			self._adjacency = buildAdjacency(self._noOfIDs, self._edgeSrc, self._edgeDst)
+		return self._adjacency
+
+
+	def getInDegree(self, v):
+		predStart = self.getAdjacency()[2]
+		return predStart[v + 1] - predStart[v]
+
+
+	def getOutDegree(self, v):
+		succStart = self.getAdjacency()[0]
+		return succStart[v + 1] - succStart[v]
+
+
+	# Outgoing edges of a node as (destination, condition), in insertion order
+	def getSuccessors(self, v):
+		succStart, succEdges, _, _ = self.getAdjacency()
+		return [(self._edgeDst[e], self._labels[self._edgeLabel[e]]) for e in succEdges[succStart[v]:succStart[v + 1]]]
+
+
+	# Incoming edges of a node as (source, condition), in insertion order
+	def getPredecessors(self, v):
+		_, _, predStart, predEdges = self.getAdjacency()
+		return [(self._edgeSrc[e], self._labels[self._edgeLabel[e]]) for e in predEdges[predStart[v]:predStart[v + 1]]]
+
+
+	# All edges as (source, destination, condition), grouped by source in node insertion order
+	def getEdges(self):
+		for v in self._nodes:
+			for dst, label in self.getSuccessors(v):
+				yield v, dst, label
+
+
+	# Return a new graph where every chain of states with a single incoming and a single outgoing transition is
+	# merged into a supernode. Nodes keep their relative order and supernodes are appended in the order of their
+	# first state. Transitions into a supernode are moved to the end of the transitions of their source node
+	def compact(self):
+		succStart, succEdges, predStart, predEdges = self.getAdjacency()
+		fixed = bytearray(EXTERNAL == kind for kind in self._kinds)
+		chains = findChains(succStart, succEdges, predStart, predEdges, self._edgeSrc, self._edgeDst, fixed=fixed)
+
+		graph = FsmGraph()
+		graph._labels = self._labels
+		graph._labelIDs = self._labelIDs
+
+		merged = set()
+		for chain in chains:
+			merged.update(chain)
+		for v in self._nodes:
+			if v not in merged:
+				graph.addNode(v, self._kinds[v])
+				if SUPER == self._kinds[v]:
+					graph._members[v] = self._members[v]
+
+		# Supernode that replaces each chain, indexed by the first state of the chain
+		superNodes = {}
+		for chain in chains:
+			superNode = graph.addSuperNode([s for c in chain for s in self.getStates(c)])
+			superNodes[chain[0]] = superNode
+
+		for v in self._nodes:
+			if v in merged:
+				continue
+
+			moved = []
+			for e in succEdges[succStart[v]:succStart[v + 1]]:
+				dst = self._edgeDst[e]
+				if dst in superNodes:
+					moved.append((superNodes[dst], e))
+				else:
+					graph._appendEdge(v, dst, self._edgeLabel[e])
+			for superNode, e in sorted(moved):
+				graph._appendEdge(v, superNode, self._edgeLabel[e])
+
+		for chain in chains:
+			e = succEdges[succStart[chain[-1]]]
+			dst = self._edgeDst[e]
+			graph._appendEdge(superNodes[chain[0]], superNodes.get(dst, dst), self._edgeLabel[e])
+
+		return graph
+
+
+	# Return a new graph where each group of nodes, given as (header, nodes, nodes in the order the trip count is searched),
+	# is merged into a loop node (see getLoopTripCountStates()). Other nodes keep their IDs and loop nodes take the place
+	# of the first node of their group. Transitions inside a group are dropped and transitions between the same pair of
+	# nodes are merged, with their conditions joined by " | "
+	def collapse(self, groups):
+		graph = FsmGraph()
+		graph._labels = self._labels
+		graph._labelIDs = self._labelIDs
+
+		loopNodes = {}
+		for groupIdx, (_, nodes, _) in enumerate(groups):
+			for v in nodes:
+				loopNodes[v] = self._noOfIDs + groupIdx
+
+		for v in self._nodes:
+			loopNode = loopNodes.get(v)
+			if loopNode is None:
+				graph.addNode(v, self._kinds[v])
+				if v in self._members:
+					graph._members[v] = self._members[v]
+			elif not graph.hasNode(loopNode):
+				header, nodes, tripCountNodes = groups[loopNode - self._noOfIDs]
+				graph.addNode(loopNode, LOOP)
+				graph._members[loopNode] = array("q", (s for n in nodes for s in self.getStates(n)))
+				graph._loops[loopNode] = (header, nodes, [s for n in tripCountNodes for s in self.getStates(n)])
+
+		for src, dst, label in self.getEdges():
+			src = loopNodes.get(src, src)
+			dst = loopNodes.get(dst, dst)
+			if src == dst:
+				continue
+
+			edgeID = graph._edgeIndex.get((src, dst))
+			if edgeID is None:
+				graph._appendEdge(src, dst, graph._internLabel(label))
+			elif label not in graph._labels[graph._edgeLabel[edgeID]].split(" | "):
+				graph._edgeLabel[edgeID] = graph._internLabel("{} | {}".format(graph._labels[graph._edgeLabel[edgeID]], label))
+
+		return graph
+
+
+	def _appendEdge(self, src, dst, labelID):
+		self._edgeIndex[(src, dst)] = len(self._edgeSrc)
+		self._edgeSrc.append(src)
+		self._edgeDst.append(dst)
+		self._edgeLabel.append(labelID)
+
+
+	# Export this graph to networkx. Nodes are named as in getNodeName() and carry a "label" attribute, as well
+	# as edges. Requires networkx (see importNetworkx())
+	def toNetworkx(self):
+		nx = importNetworkx()
+
+		G = nx.DiGraph()
+		for v in self._nodes:
+			G.add_node(self.getNodeName(v), label=self.getNodeLabel(v))
+		for src, dst, label in self.getEdges():
+			G.add_edge(self.getNodeName(src), self.getNodeName(dst), label=label)
+
+		return G
+
+
+# Create the graph of a parsed report (see rptparser.ParsedReport), including its end node(s). If only a window of
+# the report was kept, states outside of it are external nodes
+def buildGraph(parsed):
+	graph = FsmGraph()
+
+	# Create the FSM states and transitions
+	for state, edges in parsed.states:
+		if state != 0:
+			graph.addNode(state)
+		for nextState, condition in edges:
+			graph.addEdge(state, nextState, condition)
+
+	if parsed.window is not None:
+		for v in list(graph.getNodes()):
+			if v not in parsed.window:
+				graph.addNode(v, EXTERNAL)
+
+	# Add the end node and its incoming edge
+	for state, predicate in parsed.endEdges:
+		graph.addEndNode(state, predicate)
+
+	return graph
+
+
+# Create the simplified graph of a parsed report, where chains of states with a single incoming and a single outgoing
+# transition (which are always executed from start to end once entered) are merged into supernodes.
+# Returns the simplified graph and its number of nodes before simplification (including a temporary root node)
+def buildSimplifiedGraph(parsed, profiler = NULL_PROFILER):
+	with profiler.phase("build"):
+		graph = buildGraph(parsed)
+
+		# Add root node just to simplify the logic for merging node 1 with others if needed
+		if parsed.window is None or 1 in parsed.window:
+			graph.addEdge(0, 1, "true")
+
+	origNodes = graph.getNoOfNodes()
+
+	with profiler.phase("compact"):
+		graph = graph.compact()
+
+	# Your work is done root node, farewell :')
+	graph.removeNode(0)
+
+	# Every node absorbed by a supernode, not counting the supernode itself
+	profiler.count("nodesMerged", origNodes - 1 - graph.getNoOfNodes())
+
+	return graph, origNodes
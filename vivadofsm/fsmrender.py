@@ -0,0 +1,340 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import gzip, os, shutil, subprocess
+from html import escape
+from vivadofsm.lanes import assignLanes
+from vivadofsm.timeline import importPil
+from vivadofsm.writers import openOutput, replaceIfChanged
+
+
+# Font used for PNG rendering (the same of pipelook.py). SVG files simply ask for a monospace font
+DEFAULT_FONT = "/usr/share/fonts/TTf/DejaVuSansMono.ttf"
+DEFAULT_FONT_SIZE = 14
+
+# Layout constants, in pixels
+MARGIN = 20
+NODE_PADDING = 6
+NODE_GAP = 36
+LANE_GAP = 10
+LABEL_PADDING = 4
+ARROW_SIZE = 7
+
+# Image formats supported by FsmRenderer
+FORMATS = ("svg", "png")
+
+
+# Get the image format from the file name (e.g. "png" for "fsm.png")
+def getFormat(imageFile):
+	imageFormat = os.path.splitext(imageFile)[1][1:].lower()
+	if imageFormat not in FORMATS:
+		raise RuntimeError("Unsupported image format: {}".format(imageFile))
+	return imageFormat
+
+
+# Render a DOT file with Graphviz instead of FsmRenderer. The DOT file may be gzip-compressed
+def renderWithDot(dotFile, imageFile):
+	if shutil.which("dot") is None:
+		raise RuntimeError("Graphviz \"dot\" was not found on PATH")
+
+	openFn = gzip.open if dotFile.endswith(".gz") else open
+	with openFn(dotFile, "rb") as dotF:
+		subprocess.run(["dot", "-T{}".format(os.path.splitext(imageFile)[1][1:]), "-o", imageFile], stdin=dotF, check=True)
+
+
+# Layout and rendering of a simplified FSM without Graphviz. Vivado numbers its states roughly in execution
+# order, so instead of a generic layered layout the nodes are simply stacked on a single column ordered by their
+# rank (usually the first state of the node). Transitions to the next node are drawn straight down, while
+# transitions that skip nodes are routed on vertical lanes to the right of the column and transitions that go
+# back (loops) on lanes to the left. Lanes are shared by transitions whose spans do not overlap (see lanes.assignLanes()).
+#
+# Usage: addNode() for each node (the end node should have the highest rank), addLine() for each extra line of
+# a node, addEdge() for each transition and finally render()
+class FsmRenderer():
+	def __init__(self, imageFile, fontFile = DEFAULT_FONT, fontSize = DEFAULT_FONT_SIZE):
+		self._imageFile = imageFile
+		self._format = getFormat(imageFile)
+		self._fontFile = fontFile
+		self._fontSize = fontSize
+
+		self._nodeIdx = {}
+		self._labels = []
+		self._lines = []
+		self._ranks = []
+		self._isEnd = []
+		self._edges = []
+
+		# Filled by layout()
+		self._boxes = None
+		self._routes = None
+		self._width = 0
+		self._height = 0
+		self._noOfLanes = 0
+
+
+	def addNode(self, name, label, rank, isEnd = False):
+		self._nodeIdx[name] = len(self._labels)
+		self._labels.append(label)
+		self._lines.append([])
+		self._ranks.append(rank)
+		self._isEnd.append(isEnd)
+
+
+	def addLine(self, name, line):
+		self._lines[self._nodeIdx[name]].append(line)
+
+
+	def addEdge(self, src, dst, condition):
+		self._edges.append((self._nodeIdx[src], self._nodeIdx[dst], "" if "true" == condition else condition))
+
+
+	# Number of lanes used by the transitions that skip nodes or go back, on both sides. Only valid after layout()
+	def getNoOfLanes(self):
+		return self._noOfLanes
+
+
+	# Compute the position of every node and the polyline of every edge, given the width of a character and the
+	# height of a line of text (the font is monospaced)
+	def layout(self, charWidth, lineHeight):
+		noOfNodes = len(self._labels)
+
+		# Column position of each node
+		order = sorted(range(noOfNodes), key=lambda n: self._ranks[n])
+		position = [0] * noOfNodes
+		for pos, n in enumerate(order):
+			position[n] = pos
+
+		# Split edges between straight (to the next node), right lanes (forward) and left lanes (backward)
+		sideEdges = {"right": [], "left": []}
+		for edgeIdx, (src, dst, _) in enumerate(self._edges):
+			if position[dst] == position[src] + 1:
+				continue
+			side = "right" if position[dst] > position[src] else "left"
+			sideEdges[side].append(edgeIdx)
+
+		# Ports: transitions leaving or entering a node through the same side are spread along its height
+		ports = {}
+		for side, edgeIdxs in sideEdges.items():
+			for e in edgeIdxs:
+				src, dst, _ = self._edges[e]
+				ports.setdefault((src, side), []).append((e, 0))
+				ports.setdefault((dst, side), []).append((e, 1))
+
+		# Node sizes. Record nodes have their label on the first line. End nodes are ellipses, which need some extra room.
+		# Nodes are also tall enough to keep the labels of their ports apart
+		sizes = []
+		for n in range(noOfNodes):
+			textWidth = max(len(line) for line in [self._labels[n]] + self._lines[n]) * charWidth
+			padding = 3 * NODE_PADDING if self._isEnd[n] else NODE_PADDING
+			noOfPorts = max(len(ports.get((n, "right"), [])), len(ports.get((n, "left"), [])))
+			height = max((1 + len(self._lines[n])) * lineHeight + 2 * NODE_PADDING, (noOfPorts + 1) * lineHeight)
+			sizes.append((textWidth + 2 * padding, height))
+		columnWidth = max((w for w, _ in sizes), default=0)
+
+		lanes = {}
+		noOfLanes = {}
+		labelWidth = {}
+		for side, edgeIdxs in sideEdges.items():
+			spans = [tuple(sorted((position[self._edges[e][0]], position[self._edges[e][1]]))) for e in edgeIdxs]
+			sideLanes, noOfLanes[side] = assignLanes(spans)
+			lanes.update(zip(edgeIdxs, sideLanes))
+			labelWidth[side] = max((len(self._edges[e][2]) * charWidth for e in edgeIdxs), default=0)
+
+		self._noOfLanes = noOfLanes["left"] + noOfLanes["right"]
+
+		# Horizontal distance from the column to the first lane of each side, leaving room for the labels
+		laneOffset = {side: labelWidth[side] + 2 * LABEL_PADDING + LANE_GAP for side in sideEdges}
+		leftWidth = laneOffset["left"] + noOfLanes["left"] * LANE_GAP if noOfLanes["left"] > 0 else 0
+		rightWidth = laneOffset["right"] + noOfLanes["right"] * LANE_GAP if noOfLanes["right"] > 0 else 0
+		straightLabelWidth = max((len(label) * charWidth for src, dst, label in self._edges if position[dst] == position[src] + 1), default=0)
+		rightWidth = max(rightWidth, straightLabelWidth + 2 * LABEL_PADDING - columnWidth // 2)
+
+		centre = MARGIN + leftWidth + columnWidth // 2
+		self._boxes = [None] * noOfNodes
+		y = MARGIN
+		for n in order:
+			width, height = sizes[n]
+			self._boxes[n] = (centre - width // 2, y, centre + width // 2, y + height)
+			y += height + NODE_GAP
+
+		self._width = centre + columnWidth // 2 + rightWidth + MARGIN
+		self._height = y - NODE_GAP + MARGIN
+
+		portY = {}
+		for (n, side), nodePorts in ports.items():
+			top, bottom = self._boxes[n][1], self._boxes[n][3]
+			for portIdx, port in enumerate(nodePorts):
+				portY[port] = top + (bottom - top) * (portIdx + 1) // (len(nodePorts) + 1)
+
+		# Polylines and label positions of the edges
+		self._routes = []
+		for edgeIdx, (src, dst, label) in enumerate(self._edges):
+			srcBox = self._boxes[src]
+			dstBox = self._boxes[dst]
+
+			if position[dst] == position[src] + 1:
+				points = [(centre, srcBox[3]), (centre, dstBox[1])]
+				labelPos = (centre + LABEL_PADDING, (srcBox[3] + dstBox[1]) // 2 - lineHeight // 2)
+			elif position[dst] > position[src]:
+				laneX = centre + columnWidth // 2 + laneOffset["right"] + lanes[edgeIdx] * LANE_GAP
+				srcY = portY[(edgeIdx, 0)]
+				dstY = portY[(edgeIdx, 1)]
+				points = [(srcBox[2], srcY), (laneX, srcY), (laneX, dstY), (dstBox[2], dstY)]
+				labelPos = (srcBox[2] + LABEL_PADDING, srcY - lineHeight)
+			else:
+				laneX = centre - columnWidth // 2 - laneOffset["left"] - lanes[edgeIdx] * LANE_GAP
+				srcY = portY[(edgeIdx, 0)]
+				dstY = portY[(edgeIdx, 1)]
+				points = [(srcBox[0], srcY), (laneX, srcY), (laneX, dstY), (dstBox[0], dstY)]
+				labelPos = (srcBox[0] - LABEL_PADDING - len(label) * charWidth, srcY - lineHeight)
+
+			self._routes.append((points, label, labelPos))
+
+
+	# Lay out and write the image. If onlyIfChanged is True, an existing image with the same content is not rewritten
+	def render(self, onlyIfChanged = False):
+		outFile = "{}.{}.tmp.{}".format(self._imageFile, os.getpid(), self._format) if onlyIfChanged else self._imageFile
+
+		if "svg" == self._format:
+			self._renderSvg(outFile)
+		else:
+			self._renderPng(outFile)
+
+		if onlyIfChanged:
+			return replaceIfChanged(outFile, self._imageFile)
+		return True
+
+
+	def _renderSvg(self, outFile):
+		# Usual advance of monospace fonts
+		charWidth = self._fontSize * 3 // 5
+		lineHeight = self._fontSize * 4 // 3
+		self.layout(charWidth, lineHeight)
+
+		with openOutput(outFile) as outF:
+			outF.write(
+				"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+				"<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"{0}\" height=\"{1}\" viewBox=\"0 0 {0} {1}\" "
+				"font-family=\"monospace\" font-size=\"{2}\">\n"
+				"<defs><marker id=\"arrow\" viewBox=\"0 0 10 10\" refX=\"10\" refY=\"5\" markerWidth=\"{3}\" markerHeight=\"{3}\" "
+				"markerUnits=\"userSpaceOnUse\" orient=\"auto\"><path d=\"M0,0L10,5L0,10z\"/></marker></defs>\n"
+				"<rect width=\"100%\" height=\"100%\" fill=\"white\"/>\n".format(self._width, self._height, self._fontSize, ARROW_SIZE)
+			)
+
+			for n, (left, top, right, bottom) in enumerate(self._boxes):
+				if self._isEnd[n]:
+					outF.write("<ellipse cx=\"{}\" cy=\"{}\" rx=\"{}\" ry=\"{}\" fill=\"none\" stroke=\"black\"/>\n".format(
+						(left + right) // 2, (top + bottom) // 2, (right - left) // 2, (bottom - top) // 2
+					))
+				else:
+					outF.write("<rect x=\"{}\" y=\"{}\" width=\"{}\" height=\"{}\" fill=\"none\" stroke=\"black\"/>\n".format(left, top, right - left, bottom - top))
+					if len(self._lines[n]) > 0:
+						separatorY = top + NODE_PADDING + lineHeight
+						outF.write("<line x1=\"{}\" y1=\"{}\" x2=\"{}\" y2=\"{}\" stroke=\"black\"/>\n".format(left, separatorY, right, separatorY))
+
+				outF.write("<text xml:space=\"preserve\">")
+				for lineIdx, line in enumerate([self._labels[n]] + self._lines[n]):
+					textX = left + (3 * NODE_PADDING if self._isEnd[n] else NODE_PADDING)
+					textY = top + NODE_PADDING + lineIdx * lineHeight + self._fontSize
+					outF.write("<tspan x=\"{}\" y=\"{}\">{}</tspan>".format(textX, textY, escape(line, quote=False)))
+				outF.write("</text>\n")
+
+			for points, label, (labelX, labelY) in self._routes:
+				outF.write("<polyline points=\"{}\" fill=\"none\" stroke=\"black\" marker-end=\"url(#arrow)\"/>\n".format(
+					" ".join("{},{}".format(x, y) for x, y in points)
+				))
+				if "" != label:
+					outF.write("<text x=\"{}\" y=\"{}\">{}</text>\n".format(labelX, labelY + self._fontSize, escape(label, quote=False)))
+
+			outF.write("</svg>\n")
+
+
+	def _renderPng(self, outFile):
+		Image, ImageDraw, ImageFont = importPil()
+
+		try:
+			font = ImageFont.truetype(self._fontFile, self._fontSize)
+		except OSError:
+			font = ImageFont.load_default(self._fontSize)
+		charWidth = int(round(font.getlength("0")))
+		lineHeight = self._fontSize * 4 // 3
+		self.layout(charWidth, lineHeight)
+
+		# Everything is black on white, so a grayscale image is enough
+		img = Image.new("L", (self._width, self._height), 255)
+		draw = ImageDraw.Draw(img)
+
+		# Drawing text with FreeType is by far the slowest part, so each character is rendered only once to a sprite
+		# that is then pasted wherever needed (the font is monospaced, so there is no kerning to care about)
+		ascent, descent = font.getmetrics()
+		glyphHeight = ascent + descent
+		glyphs = {}
+
+		def drawText(x, y, text):
+			for char in text:
+				if " " != char:
+					glyph = glyphs.get(char)
+					if glyph is None:
+						glyph = Image.new("L", (charWidth, glyphHeight), 0)
+						ImageDraw.Draw(glyph).text((0, 0), char, font=font, fill=255)
+						glyphs[char] = glyph
+					draw.bitmap((x, y), glyph, fill=0)
+				x += charWidth
+
+		for n, (left, top, right, bottom) in enumerate(self._boxes):
+			if self._isEnd[n]:
+				draw.ellipse((left, top, right, bottom), outline=0)
+			else:
+				draw.rectangle((left, top, right, bottom), outline=0)
+				if len(self._lines[n]) > 0:
+					separatorY = top + NODE_PADDING + lineHeight
+					draw.line((left, separatorY, right, separatorY), fill=0)
+
+			for lineIdx, line in enumerate([self._labels[n]] + self._lines[n]):
+				drawText(left + (3 * NODE_PADDING if self._isEnd[n] else NODE_PADDING), top + NODE_PADDING + lineIdx * lineHeight, line)
+
+		for points, label, (labelX, labelY) in self._routes:
+			draw.line(points, fill=0)
+
+			# Arrow head, pointing on the direction of the last segment
+			(fromX, fromY), (toX, toY) = points[-2], points[-1]
+			dirX = (toX > fromX) - (toX < fromX)
+			dirY = (toY > fromY) - (toY < fromY)
+			draw.polygon([
+				(toX, toY),
+				(toX - dirX * ARROW_SIZE - dirY * ARROW_SIZE // 2, toY - dirY * ARROW_SIZE - dirX * ARROW_SIZE // 2),
+				(toX - dirX * ARROW_SIZE + dirY * ARROW_SIZE // 2, toY - dirY * ARROW_SIZE + dirX * ARROW_SIZE // 2)
+			], fill=0)
+
+			drawText(labelX, labelY, label)
+
+		# Tall FSMs generate big images, where the default compression level is noticeably slower for little gain
+		img.save(outFile, "PNG", compress_level=1)
@@ -0,0 +1,60 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import heapq
+
+
+# Assign lanes to closed intervals (start, end) so that intervals on the same lane never overlap. Intervals are
+# processed by start (intervals with the same start keep their order) and each one takes the lowest lane that is
+# free at its start, which gives the same result as scanning all lanes first-fit, with the minimum number of lanes,
+# in O(n log n). Returns the lane of each interval (in the order they were supplied) and the number of lanes
+def assignLanes(intervals):
+	lanes = [0] * len(intervals)
+	# Lanes that are free and (end, lane) of lanes that are busy
+	freeLanes = []
+	busyLanes = []
+	noOfLanes = 0
+
+	for intervalIdx in sorted(range(len(intervals)), key=lambda i: intervals[i][0]):
+		start, end = intervals[intervalIdx]
+		while len(busyLanes) > 0 and busyLanes[0][0] < start:
+			heapq.heappush(freeLanes, heapq.heappop(busyLanes)[1])
+
+		if len(freeLanes) > 0:
+			lane = heapq.heappop(freeLanes)
+		else:
+			lane = noOfLanes
+			noOfLanes += 1
+
+		lanes[intervalIdx] = lane
+		heapq.heappush(busyLanes, (end, lane))
+
+	return lanes, noOfLanes
@@ -0,0 +1,191 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import deque
+from vivadofsm.profiler import NULL_PROFILER
+
+
+# Loop of the FSM, found by findLoops():
+#     header: node where the loop is entered
+#    members: nodes of the loop, in the order of the graph
+#      level: nesting level, 0 for outermost loops
+#   children: loops nested on this one, only found up to the level requested
+class Loop():
+	def __init__(self, header, members, level):
+		self.header = header
+		self.members = members
+		self.level = level
+		self.children = []
+
+
+# Strongly connected components of a graph given as a dict of node to its successors, visiting nodes in the order of
+# "nodes". Iterative version of Tarjan's algorithm, O(V + E). Returns a list of components, each a list of nodes
+def findSccs(nodes, successors):
+	index = {}
+	lowLink = {}
+	onStack = set()
+	stack = []
+	sccs = []
+
+	for root in nodes:
+		if root in index:
+			continue
+
+		index[root] = lowLink[root] = len(index)
+		stack.append(root)
+		onStack.add(root)
+		work = [(root, iter(successors[root]))]
+
+		while len(work) > 0:
+			v, succIter = work[-1]
+			descended = False
+			for w in succIter:
+				if w not in index:
+					index[w] = lowLink[w] = len(index)
+					stack.append(w)
+					onStack.add(w)
+					work.append((w, iter(successors[w])))
+					descended = True
+					break
+				elif w in onStack:
+					lowLink[v] = min(lowLink[v], index[w])
+			if descended:
+				continue
+
+			work.pop()
+			if len(work) > 0:
+				parent = work[-1][0]
+				lowLink[parent] = min(lowLink[parent], lowLink[v])
+
+			# v is the root of a component, which is on the top of the stack
+			if lowLink[v] == index[v]:
+				scc = []
+				while True:
+					w = stack.pop()
+					onStack.discard(w)
+					scc.append(w)
+					if w == v:
+						break
+				sccs.append(scc)
+
+	return sccs
+
+
+# Find the loops of a graph (see fsmgraph.FsmGraph) and, up to maxLevel, the loops nested on them. Loops are the
+# strongly connected components with more than one node (or a node that transitions to itself). Their header is the
+# node where the loop is entered from outside (the first one on the graph if there are several, as with irreducible
+# loops). Nested loops are the components that remain inside a loop once the transitions back to its header are
+# removed. Each level takes O(V + E), so the whole search takes O((maxLevel + 1) * (V + E)).
+# End and external nodes are never part of a loop. Returns the outermost loops, in the order of the graph
+def findLoops(graph, maxLevel):
+	order = {}
+	successors = {}
+	predecessors = {}
+	for v in graph.getNodes():
+		if not graph.isEndNode(v) and not graph.isExternalNode(v):
+			order[v] = len(order)
+	for v in order:
+		successors[v] = [dst for dst, _ in graph.getSuccessors(v) if dst in order]
+		predecessors[v] = [src for src, _ in graph.getPredecessors(v) if src in order]
+
+	loops = []
+	# Nodes to search for loops, the header whose back transitions are removed, the level and the enclosing loop
+	pending = [(list(order), None, 0, None)]
+	while len(pending) > 0:
+		nodes, header, level, parent = pending.pop()
+		nodeSet = set(nodes)
+		innerSuccessors = {v: [w for w in successors[v] if w in nodeSet and w != header] for v in nodes}
+
+		for scc in findSccs(nodes, innerSuccessors):
+			if 1 == len(scc) and scc[0] not in innerSuccessors[scc[0]]:
+				continue
+
+			scc.sort(key=order.get)
+			sccSet = set(scc)
+			entries = [v for v in scc if any(u not in sccSet for u in predecessors[v])]
+			loop = Loop(entries[0] if len(entries) > 0 else scc[0], scc, level)
+			(loops if parent is None else parent.children).append(loop)
+
+			if level < maxLevel:
+				pending.append((scc, loop.header, level + 1, loop))
+
+	# Components are found in reverse topological order
+	pending = [loops]
+	while len(pending) > 0:
+		siblings = pending.pop()
+		siblings.sort(key=lambda l: order[l.members[0]])
+		pending += [l.children for l in siblings]
+
+	return loops
+
+
+# Nodes of a loop in the order its trip count is searched: breadth-first from the header, first the nodes that are not
+# part of a nested loop and then the others. Vivado places the trip count of a loop on its header or on one of the
+# states right after it, which may also head a nested loop (e.g. when loops are flattened)
+def getTripCountOrder(graph, loop):
+	nodes = set(loop.members)
+	nestedNodes = set(v for child in loop.children for v in child.members)
+
+	order = []
+	visited = {loop.header}
+	queue = deque([loop.header])
+	while len(queue) > 0:
+		v = queue.popleft()
+		order.append(v)
+		for dst, _ in graph.getSuccessors(v):
+			if dst in nodes and dst not in visited:
+				visited.add(dst)
+				queue.append(dst)
+
+	return [v for v in order if v not in nestedNodes] + [v for v in order if v in nestedNodes]
+
+
+# Create a hierarchical view of a simplified graph (see fsmgraph.buildSimplifiedGraph()), where the loops nested
+# "depth" levels deep are collapsed into loop nodes (see FsmGraph.collapse()): with a depth of 0 every outermost loop
+# is collapsed, with 1 their inner loops are collapsed instead and so on. Loops one level deeper are also searched, so
+# that each loop node knows which of its nodes belong to nested loops. Loops are searched as a phase of the profiler
+# (see profiler.py). Returns the new graph
+def buildHierarchicalGraph(graph, depth, profiler = NULL_PROFILER):
+	with profiler.phase("loops"):
+		loops = findLoops(graph, depth + 1)
+
+	groups = []
+	pending = list(loops)
+	while len(pending) > 0:
+		loop = pending.pop()
+		if loop.level == depth:
+			groups.append((loop.header, loop.members, getTripCountOrder(graph, loop)))
+		else:
+			pending += loop.children
+	profiler.count("loopsCollapsed", len(groups))
+
+	with profiler.phase("collapse"):
+		return graph.collapse(groups)
@@ -0,0 +1,135 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# NumPy is optional, it only makes the folding faster on long pipelines. Importing it takes longer than folding short
+# pipelines in pure Python, so it is only imported (see getNumpy()) for tables with at least NUMPY_MIN_CYCLES cycles
+NUMPY_MIN_CYCLES = 4096
+numpy = None
+numpyImported = False
+
+
+# NumPy module, or None if it is not installed
+def getNumpy():
+	global numpy, numpyImported
+
+	if not numpyImported:
+		numpyImported = True
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+
+	return numpy
+
+
+# Modulo reservation table of a pipeline with a given II. Operations are registered by type and by the cycle
+# (relative to the first state of the pipeline) they are issued. Since a new instance of the pipeline starts
+# every II cycles, the operations in flight at cycle c of the timeline are the ones issued at c, c - II, c - 2 * II
+# and so on. These amounts are obtained by building a per-type histogram of issue cycles and folding it modulo II,
+# so that the whole table costs time linear in the number of operations and cycles
+class ModuloReservationTable():
+	def __init__(self, noOfCycles, II):
+		self._noOfCycles = max(noOfCycles, 0)
+		self._II = II
+		# Operation type to its histogram of issue cycles
+		self._histograms = {}
+		self._folded = {}
+		self._numpy = getNumpy() if self._noOfCycles >= NUMPY_MIN_CYCLES else None
+
+
+	def getNoOfCycles(self):
+		return self._noOfCycles
+
+
+	def getII(self):
+		return self._II
+
+
+	# Register an operation issued at a cycle. Operations outside the timeline are ignored
+	def addOperation(self, opType, cycle):
+		if cycle < 0 or cycle >= self._noOfCycles:
+			return
+
+		if opType not in self._histograms:
+			self._histograms[opType] = [0] * self._noOfCycles
+		self._histograms[opType][cycle] += 1
+		self._folded.pop(opType, None)
+
+
+	def getOpTypes(self):
+		return list(self._histograms)
+
+
+	# Number of operations of a type in flight at each cycle (list indexed by cycle)
+	def getFolded(self, opType):
+		if opType in self._folded:
+			return self._folded[opType]
+
+		histogram = self._histograms.get(opType)
+		if histogram is None:
+			folded = [0] * self._noOfCycles
+		elif self._numpy is not None:
+			numpy = self._numpy
+			# Pad to a multiple of II, so that each row holds one pipeline instance and the fold is a cumulative sum
+			# along the columns
+			noOfRows = -(-self._noOfCycles // self._II)
+			table = numpy.zeros(noOfRows * self._II, dtype=numpy.int64)
+			table[:self._noOfCycles] = histogram
+			folded = numpy.cumsum(table.reshape(noOfRows, self._II), axis=0).reshape(-1)[:self._noOfCycles].tolist()
+		else:
+			folded = list(histogram)
+			for cycle in range(self._II, self._noOfCycles):
+				folded[cycle] += folded[cycle - self._II]
+
+		self._folded[opType] = folded
+		return folded
+
+
+	# Cycles where the amount of operations of a type in flight exceeds every previous cycle (and also "floor"),
+	# as a list of (cycle, amount). The last element is the first cycle where the maximum is reached
+	def getRecords(self, opType, floor = -1):
+		folded = self.getFolded(opType)
+		records = []
+
+		if self._numpy is not None and len(folded) > 0:
+			numpy = self._numpy
+			foldedArr = numpy.asarray(folded, dtype=numpy.int64)
+			previousMax = numpy.maximum.accumulate(numpy.concatenate(([floor], foldedArr[:-1])))
+			for cycle in numpy.flatnonzero(foldedArr > previousMax).tolist():
+				records.append((cycle, folded[cycle]))
+		else:
+			currentMax = floor
+			for cycle, amt in enumerate(folded):
+				if amt > currentMax:
+					records.append((cycle, amt))
+					currentMax = amt
+
+		return records
@@ -0,0 +1,251 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import hashlib, json, re
+
+
+# Every operation line starts with the same prefix, which is parsed only once per line:
+#   ST_<state> : Operation <id> [<cycle>/<latency>]
+PREFIX_REGEX = re.compile(r"ST_(\d+) : Operation \d+ \[\d+/(\d+)\]")
+
+# Filters. Interesting information should be saved using groups (with parentheses)
+#
+# Each filter is composed of one or more tuples. Each tuple is composed of:
+# - a list of opcode tokens: literal strings that are necessarily present on any line matched by
+#   the regex. Lines are only routed to the regexes whose tokens are present on the line;
+# - one compiled regex, matched against the remainder of the line after the operation prefix
+#   (see PREFIX_REGEX). The state number and latency are taken from the prefix;
+# - one array for group reordering.
+#
+# The first element of the resulting tuple is always the latency of the operation (i.e. the
+# number after the slash in [X/Y]). The groups of the regex can be reordered to make the
+# information readable. Separators can be created with None
+# If no reordering is required, simply pass None
+#
+# Example:
+# Let's say that the prefix and regex matched to the following groups: [8, 164, %foo, 5]
+# Using a reordering vector of [1, None, None, 0], the final vector will be [164, 5, ---, ---, %foo]
+# Note that the index elements from the reorder vector consider position 0 as the first group of the regex
+#
+# NOTE: To avoid confusing grouping of operations, you must create enough groups to
+#       ensure that each operation is uniquely identifiable
+# Gerar dois projectos de banking diferentes, baseados no rw-add2-np: um usando arrays completamente ortogonais para leitura, e outro usando indices diferentes do que >> 1 (eu acho que pode ta rolando um burst nao intencional ali)
+FILTERS = {
+	"ddr": [
+		(["@_ssdm_op_ReadReq"], re.compile(r".*--->.*=.*@_ssdm_op_(ReadReq).m_axi.i(\d+)P\(i\d+ addrspace\(1\)\* ([^ ]+), i\d+ ([^ ]+)\).*"), [0, 1, None, 2, 3]),
+		(["@_ssdm_op_Read"], re.compile(r".*--->.*\"([^ ]+).*=.*@_ssdm_op_(Read).m_axi.i(\d+)P\(i\d+ addrspace\(1\)\* ([^\)]+)\).*"), [1, 2, 0, 3, None]),
+		(["@_ssdm_op_WriteReq"], re.compile(r".*--->.*=.*@_ssdm_op_(WriteReq).m_axi.i(\d+)P\(i\d+ addrspace\(1\)\* ([^ ]+), i\d+ ([^ ]+)\).*"), [0, 1, None, 2, 3]),
+		(["@_ssdm_op_Write"], re.compile(r".*--->.*@_ssdm_op_(Write).m_axi.i(\d+)P\(i\d+ addrspace\(1\)\* ([^ ]+), i\d+ ([^ ]+), i\d+ ([^ ]+)\).*"), None),
+		(["@_ssdm_op_WriteResp"], re.compile(r".*--->.*\"([^ ]+).*=.*@_ssdm_op_(WriteResp).m_axi.i(\d+)P\(i\d+ addrspace\(1\)\* ([^\)]+)\).*"), [1, 2, 0, 3, None])
+	],
+	"float": [
+		(["= fadd ", "= fsub ", "= fmul ", "= fdiv "], re.compile(r".*--->.*\"([^ ]+).*= (fadd|fsub|fmul|fdiv) [^ ]+ ([^ ]+), ([^ ,\"]+).*"), [1, None, 0, 2, 3])
+	],
+	"bram": [
+		([" load "], re.compile(r".*--->.*\"([^ ]+) += +(load) +([^ ]+) +([^ ]+),.*"), [1, 2, 0, 3, None]),
+		(["\"store "], re.compile(r".*--->.*\"(store) +([^ ]+) +([^ ]+), +[^ ]+ +([^ ]+),.*"), [0, 1, 3, 2, None]),
+	]
+}
+
+
+# Load filters from a JSON spec file, instead of using FILTERS. The spec file is an object with:
+#   "filters": filter name to a list of patterns, each one an object with:
+#                  "regex": regex matched against the line after the operation prefix (see FILTERS)
+#                 "tokens": opcode tokens of the regex (see FILTERS). Optional, but without tokens the regex is tried
+#                           on every operation line
+#                "reorder": reordering vector (see FILTERS). Optional
+#                  "kinds": kinds of operations (i.e. the second element of the resulting tuple, such as "fadd")
+#                           that the regex produces. Optional, only needed by pipelook.py
+#                 "colour": RGBA colour of those kinds of operations on pipelook.py timelines. Optional
+#             "limitgroup": limit group of those kinds of operations on pipelook.py (see TLGen). Optional
+#   "limitGroups": limit group name to its budget (see TLGen). Optional
+# Returns the filters (in the same format of FILTERS), and the operation info and limit groups for TLGen
+# (None if the spec file has no kinds or no limit groups). See examples/filters/filters.json
+def loadFilterSpec(specFile):
+	try:
+		with open(specFile, "r") as specF:
+			spec = json.load(specF)
+	except ValueError as e:
+		raise RuntimeError("Invalid filter spec file {}: {}".format(specFile, e))
+
+	if not isinstance(spec, dict) or not isinstance(spec.get("filters"), dict):
+		raise RuntimeError("Filter spec file {} has no \"filters\" object".format(specFile))
+
+	limitGroups = spec.get("limitGroups")
+	filters = {}
+	opInfo = {}
+
+	for filterName, patterns in spec["filters"].items():
+		filters[filterName] = []
+
+		for pattern in patterns:
+			try:
+				regex = re.compile(pattern["regex"])
+			except KeyError:
+				raise RuntimeError("Pattern without \"regex\" on filter {}".format(filterName))
+			except re.error as e:
+				raise RuntimeError("Invalid regex on filter {}: {}".format(filterName, e))
+
+			reorder = pattern.get("reorder")
+			if reorder is not None:
+				for relem in reorder:
+					if relem is not None and (relem < 0 or relem >= regex.groups):
+						raise RuntimeError("Reordering vector of filter {} refers to group {}, but its regex has {} groups".format(filterName, relem, regex.groups))
+
+			limitGroup = pattern.get("limitgroup")
+			if limitGroup is not None and (limitGroups is None or limitGroup not in limitGroups):
+				raise RuntimeError("Filter {} uses the undefined limit group {}".format(filterName, limitGroup))
+
+			for kind in pattern.get("kinds", []):
+				opInfo[kind] = {"colour": tuple(pattern.get("colour", (200, 200, 200, 255))), "limitgroup": limitGroup}
+
+			filters[filterName].append((list(pattern.get("tokens", [])), regex, reorder))
+
+	return filters, opInfo if len(opInfo) > 0 else None, limitGroups
+
+
+# Digest of a set of filters, so that parses done with different filters are told apart
+def getFiltersDigest(filters):
+	return hashlib.sha1(repr([
+		(filterName, [(tokens, regex.pattern, regex.flags, reorder) for tokens, regex, reorder in filters[filterName]])
+		for filterName in filters
+	]).encode()).hexdigest()
+
+
+# Classify operation lines of the "FSM state operations" section according to a set of filters.
+# The common prefix of the line is parsed once and the line is routed by its opcode tokens only to the
+# regexes that may match it, instead of trying every regex of every filter. The tokens of all filters are
+# compiled together, so each distinct token is looked for at most once per line no matter how many filters use it.
+# The number of regexes tried and matched by each filter is kept (see getStats())
+class OpClassifier():
+	def __init__(self, activeFilters, filters = FILTERS):
+		self._activeFilters = list(activeFilters)
+		self._routes = {}
+		# Routes of the regexes without tokens, which are tried on every line
+		self._alwaysRoutes = []
+		self._attempts = {activeFilter: 0 for activeFilter in self._activeFilters}
+		self._matches = {activeFilter: 0 for activeFilter in self._activeFilters}
+
+		# Sanity check
+		for activeFilter in self._activeFilters:
+			if activeFilter not in filters:
+				raise RuntimeError("Unknown filter requested: {}".format(activeFilter))
+
+		# Each route keeps the position of the filter on the list of active filters and of the regex inside the filter,
+		# so that results are produced in the same order as if all regexes were tried in sequence
+		for filterIdx, activeFilter in enumerate(self._activeFilters):
+			for regexIdx, (tokens, regex, reorder) in enumerate(filters[activeFilter]):
+				if 0 == len(tokens):
+					self._alwaysRoutes.append((filterIdx, regexIdx, activeFilter, regex, reorder))
+				for token in tokens:
+					if token not in self._routes:
+						self._routes[token] = []
+					self._routes[token].append((filterIdx, regexIdx, activeFilter, regex, reorder))
+
+		# Tokens of all filters are arranged on a tree where the parent of each token is the longest other token that it
+		# contains (e.g. "@_ssdm_op_Read" is the parent of "@_ssdm_op_ReadReq"). A token can only be on a line if its
+		# parent is, so tokens are only looked for on lines where their parent was found
+		roots = []
+		children = {token: [] for token in self._routes}
+		for token in self._routes:
+			parents = [other for other in self._routes if other != token and other in token]
+			if 0 == len(parents):
+				roots.append(token)
+			else:
+				children[max(parents, key=len)].append(token)
+
+		# Each node is (token, routes, child nodes or None)
+		def buildNode(token):
+			return (token, self._routes[token], [buildNode(child) for child in children[token]] if len(children[token]) > 0 else None)
+		self._tokenTree = [buildNode(token) for token in roots]
+
+
+	def getActiveFilters(self):
+		return self._activeFilters
+
+
+	# Number of regexes tried and matched by each active filter so far, as {filter: {"attempts": n, "matches": n}}
+	def getStats(self):
+		return {activeFilter: {"attempts": self._attempts[activeFilter], "matches": self._matches[activeFilter]} for activeFilter in self._activeFilters}
+
+
+	# Add the routes of the tokens of a subtree (see __init__()) that are present on a line to a list of candidates
+	def _routeChildren(self, line, children, candidates):
+		for token, routes, grandchildren in children:
+			if token in line:
+				candidates = candidates + routes
+				if grandchildren is not None:
+					candidates = self._routeChildren(line, grandchildren, candidates)
+
+		return candidates
+
+
+	# Return a list of (filter, state, reordered groups) for each filter regex that matches this line
+	def classify(self, line):
+		candidates = self._alwaysRoutes
+
+		for token, routes, children in self._tokenTree:
+			if token in line:
+				candidates = candidates + routes
+				if children is not None:
+					candidates = self._routeChildren(line, children, candidates)
+
+		if 0 == len(candidates):
+			return []
+
+		prefixMatch = PREFIX_REGEX.match(line)
+		if prefixMatch is None:
+			return []
+
+		# A line may be routed to the same regex by more than one token
+		if len(candidates) > 1:
+			candidates = [c for _, c in sorted({(c[0], c[1]): c for c in candidates}.items())]
+
+		stateNo = int(prefixMatch.group(1))
+		latency = prefixMatch.group(2)
+		classified = []
+
+		for _, _, activeFilter, regex, reorder in candidates:
+			self._attempts[activeFilter] += 1
+			filterMatch = regex.match(line, prefixMatch.end())
+			# Filter matched, we save the groups for later use
+			if filterMatch is not None:
+				self._matches[activeFilter] += 1
+				# If reordering vector is supplied, we reorder the group
+				if reorder is None:
+					classified.append((activeFilter, stateNo, (latency,) + filterMatch.groups()))
+				else:
+					reorderedMatch = [latency]
+					for relem in reorder:
+						reorderedMatch.append("---" if relem is None else filterMatch.group(relem + 1))
+					classified.append((activeFilter, stateNo, tuple(reorderedMatch)))
+
+		return classified
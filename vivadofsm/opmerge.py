@@ -0,0 +1,76 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import deque
+
+
+# Merge the filtered operations of a sequence of states (e.g. the states of a supernode, in execution order)
+# into runs. A run is the same operation (i.e. the same tuple of filtered groups) found on consecutively
+# numbered states, such as a DDR transaction that takes several cycles.
+#
+#          states: states to be considered, in order
+#   filteredLines: state to list of filtered operations (as returned by ParsedReport.getFilteredLines())
+#
+# Returns a dict indexed by the state where each run starts, whose values are lists of [last state of the
+# run, operation], in the order that runs were created.
+#
+# Runs that can still be extended are kept on a hash table indexed by their last state and operation, so
+# each operation is merged in constant time regardless of how many runs exist
+def mergeOperations(states, filteredLines):
+	mergedFilteredLines = {}
+	# (last state, operation) to the runs that end there, grouped by their starting state
+	openRuns = {}
+
+	for i in states:
+		if i not in filteredLines:
+			continue
+
+		for filteredLine in filteredLines[i]:
+			hasMerged = False
+
+			# We merge only if the operation is exactly the same and if there is continuity on the node count.
+			# The first matching run of each starting state is extended
+			prevRuns = openRuns.get((i - 1, filteredLine))
+			if prevRuns is not None:
+				for mergedIdx, runs in prevRuns.items():
+					if len(runs) > 0:
+						mergedLine = runs.popleft()
+						mergedLine[0] += 1
+						hasMerged = True
+						openRuns.setdefault((i, filteredLine), {}).setdefault(mergedIdx, deque()).append(mergedLine)
+
+			# If no merge happened, we create a new element for this [super-]node
+			if not hasMerged:
+				mergedLine = [i, filteredLine]
+				mergedFilteredLines.setdefault(i, []).append(mergedLine)
+				openRuns.setdefault((i, filteredLine), {}).setdefault(i, deque()).append(mergedLine)
+
+	return mergedFilteredLines
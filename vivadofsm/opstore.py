@@ -0,0 +1,318 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import bisect, mmap, os, struct, sys
+from array import array
+from vivadofsm.writers import replaceIfChanged
+
+
+# Columnar format of the filtered operations of an FSM, an alternative to the JSON file of fsmgen.py that can be
+# memory-mapped and read one node at a time. All values are little-endian 32-bit integers, stored in this order:
+#
+#   header: MAGIC, FORMAT_VERSION, number of nodes, number of operations, number of fields per operation,
+#           number of strings and size of the string data (see HEADER)
+#   nodeFirstState[nodes]: first state of each node, sorted
+#   nodeOffset[nodes + 1]: index of the first operation of each node (and the total number of operations)
+#   opStart[operations]: state where each operation (i.e. each run, see opmerge.mergeOperations()) starts
+#   opEnd[operations]: last state of each operation
+#   opKind[operations]: string index of the kind of each operation (its second field, e.g. "ReadReq" or "fadd")
+#   opFields[operations * fields]: string index of each field of each operation, -1 if the operation has less fields
+#   stringOffset[strings + 1]: offset of each string on the string data
+#   string data: all interned strings, UTF-8 encoded
+MAGIC = b"VFSMOPS\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8s6I")
+
+
+# Check if a file is on the columnar format, by its magic number
+def isOpStore(fileName):
+	with open(fileName, "rb") as inF:
+		return inF.read(len(MAGIC)) == MAGIC
+
+
+# Writer of the columnar format, with the same interface of the writers of writers.py. Nodes are given with
+# writeEntry() in any order, as the first state of the node and the dict returned by opmerge.mergeOperations(),
+# and the file is written when the writer is closed
+class OpStoreWriter():
+	def __init__(self, fileName, onlyIfChanged = False):
+		self._fileName = fileName
+		self._onlyIfChanged = onlyIfChanged
+		self._nodes = []
+		self._closed = False
+		self.changed = True
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *args):
+		self.close()
+
+
+	def getFileName(self):
+		return self._fileName
+
+
+	def writeEntry(self, key, value):
+		self._nodes.append((key, value))
+
+
+	def close(self):
+		if self._closed:
+			return
+		self._closed = True
+
+		self._nodes.sort(key=lambda node: node[0])
+		noOfFields = max((len(run[1]) for _, mergedLines in self._nodes for runs in mergedLines.values() for run in runs), default=0)
+
+		stringIDs = {}
+		def intern(string):
+			if string not in stringIDs:
+				stringIDs[string] = len(stringIDs)
+			return stringIDs[string]
+
+		nodeFirstState = array("i")
+		nodeOffset = array("i", [0])
+		opStart = array("i")
+		opEnd = array("i")
+		opKind = array("i")
+		opFields = array("i")
+
+		for firstState, mergedLines in self._nodes:
+			nodeFirstState.append(firstState)
+			for runStart in mergedLines:
+				for runEnd, operation in mergedLines[runStart]:
+					opStart.append(runStart)
+					opEnd.append(runEnd)
+					opKind.append(intern(operation[1]) if len(operation) > 1 else -1)
+					opFields.extend(intern(field) for field in operation)
+					opFields.extend([-1] * (noOfFields - len(operation)))
+			nodeOffset.append(len(opStart))
+
+		stringData = [string.encode("utf-8") for string in stringIDs]
+		stringOffset = array("i", [0])
+		for data in stringData:
+			stringOffset.append(stringOffset[-1] + len(data))
+		stringSize = stringOffset[-1]
+
+		columns = (nodeFirstState, nodeOffset, opStart, opEnd, opKind, opFields, stringOffset)
+		if "big" == sys.byteorder:
+			for column in columns:
+				column.byteswap()
+
+		outFile = self._fileName if not self._onlyIfChanged else "{}.{}.tmp".format(self._fileName, os.getpid())
+		with open(outFile, "wb") as outF:
+			outF.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(nodeFirstState), len(opStart), noOfFields, len(stringData), stringSize))
+			for column in columns:
+				column.tofile(outF)
+			for data in stringData:
+				outF.write(data)
+
+		if self._onlyIfChanged:
+			self.changed = replaceIfChanged(outFile, self._fileName)
+
+
+# Read-only, memory-mapped view of a file on the columnar format. It behaves as a read-only dict with the same
+# content of pipeline.getNodeOperations() (first state of each node to its operations), but nodes are only
+# decoded when accessed, so the rest of the file is never read
+class OpStore():
+	def __init__(self, fileName):
+		self._fileName = fileName
+		self._file = open(fileName, "rb")
+		self._view = None
+		self._columns = []
+
+		try:
+			self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		# Empty files cannot be mapped
+		except ValueError:
+			self._mm = b""
+
+		if len(self._mm) < HEADER.size:
+			self.close()
+			raise RuntimeError("File {} is not on the columnar operations format".format(fileName))
+
+		magic, version, noOfNodes, noOfOps, self._noOfFields, noOfStrings, stringSize = HEADER.unpack_from(self._mm, 0)
+		if magic != MAGIC:
+			self.close()
+			raise RuntimeError("File {} is not on the columnar operations format".format(fileName))
+		if version != FORMAT_VERSION:
+			self.close()
+			raise RuntimeError("File {} has an unsupported version of the columnar operations format: {}".format(fileName, version))
+
+		offset = HEADER.size
+		self._nodeFirstState, offset = self._getColumn(offset, noOfNodes)
+		self._nodeOffset, offset = self._getColumn(offset, noOfNodes + 1)
+		self._opStart, offset = self._getColumn(offset, noOfOps)
+		self._opEnd, offset = self._getColumn(offset, noOfOps)
+		self._opKind, offset = self._getColumn(offset, noOfOps)
+		self._opFields, offset = self._getColumn(offset, noOfOps * self._noOfFields)
+		self._stringOffset, offset = self._getColumn(offset, noOfStrings + 1)
+		self._stringBase = offset
+
+		if offset + stringSize != len(self._mm):
+			self.close()
+			raise RuntimeError("File {} is truncated or corrupted".format(fileName))
+
+		# Strings are decoded once, when first needed
+		self._strings = {}
+		# Bounds of the states where the operations of the nodes start (see _getOpRange()), built on first use
+		self._maxStarts = None
+		self._minStarts = None
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *args):
+		self.close()
+
+
+	def close(self):
+		# The file cannot be unmapped while there are views of it
+		for column in self._columns:
+			column.release()
+		self._columns = []
+		if self._view is not None:
+			self._view.release()
+			self._view = None
+
+		if isinstance(self._mm, mmap.mmap):
+			self._mm.close()
+		self._file.close()
+
+
+	# Integer column of "length" elements starting at byte "offset". Returns the column and the offset after it
+	def _getColumn(self, offset, length):
+		end = offset + 4 * length
+		if end > len(self._mm):
+			self.close()
+			raise RuntimeError("File {} is truncated or corrupted".format(self._fileName))
+
+		# Little-endian files are used in place, without copying
+		if "little" == sys.byteorder and isinstance(self._mm, mmap.mmap):
+			if self._view is None:
+				self._view = memoryview(self._mm)
+			column = self._view[offset:end].cast("i")
+			self._columns.append(column)
+		else:
+			column = array("i", self._mm[offset:end])
+			if "big" == sys.byteorder:
+				column.byteswap()
+
+		return column, end
+
+
+	def _getString(self, stringID):
+		if stringID not in self._strings:
+			self._strings[stringID] = bytes(self._mm[self._stringBase + self._stringOffset[stringID]:self._stringBase + self._stringOffset[stringID + 1]]).decode("utf-8")
+		return self._strings[stringID]
+
+
+	# Index of the node whose first state is firstState, or -1 if there is no such node
+	def _findNode(self, firstState):
+		nodeIdx = bisect.bisect_left(self._nodeFirstState, firstState)
+		if nodeIdx < len(self._nodeFirstState) and self._nodeFirstState[nodeIdx] == firstState:
+			return nodeIdx
+		return -1
+
+
+	def __len__(self):
+		return len(self._nodeFirstState)
+
+
+	def __iter__(self):
+		return iter(self._nodeFirstState)
+
+
+	def __contains__(self, firstState):
+		return self._findNode(firstState) >= 0
+
+
+	def __getitem__(self, firstState):
+		nodeIdx = self._findNode(firstState)
+		if nodeIdx < 0:
+			raise KeyError(firstState)
+
+		mergedLines = {}
+		for opIdx in range(self._nodeOffset[nodeIdx], self._nodeOffset[nodeIdx + 1]):
+			fields = self._opFields[opIdx * self._noOfFields:(opIdx + 1) * self._noOfFields]
+			operation = tuple(self._getString(stringID) for stringID in fields if stringID >= 0)
+			mergedLines.setdefault(self._opStart[opIdx], []).append([self._opEnd[opIdx], operation])
+
+		return mergedLines
+
+
+	def get(self, firstState, default = None):
+		return self[firstState] if firstState in self else default
+
+
+	def keys(self):
+		return list(self._nodeFirstState)
+
+
+	def items(self):
+		return [(firstState, self[firstState]) for firstState in self._nodeFirstState]
+
+
+	# Range of the operations of the nodes that may hold operations starting between two states (both included). The
+	# states of a node are not always contiguous (e.g. the chain 3->8->4 next to the node 5->6), so the nodes are bounded
+	# by the highest state where an operation starts up to each node and by the lowest one from each node on
+	def _getOpRange(self, startState, endState):
+		if self._maxStarts is None:
+			self._maxStarts = array("i")
+			self._minStarts = array("i")
+			maxStart = -1
+			for nodeIdx in range(len(self._nodeFirstState)):
+				maxStart = max(maxStart, max(self._opStart[self._nodeOffset[nodeIdx]:self._nodeOffset[nodeIdx + 1]], default=maxStart))
+				self._maxStarts.append(maxStart)
+			minStart = 2 ** 31 - 1
+			for nodeIdx in reversed(range(len(self._nodeFirstState))):
+				minStart = min(minStart, min(self._opStart[self._nodeOffset[nodeIdx]:self._nodeOffset[nodeIdx + 1]], default=minStart))
+				self._minStarts.append(minStart)
+			self._minStarts.reverse()
+
+		firstNode = bisect.bisect_left(self._maxStarts, startState)
+		lastNode = bisect.bisect_right(self._minStarts, endState)
+		if lastNode <= firstNode:
+			return range(0)
+		return range(self._nodeOffset[firstNode], self._nodeOffset[lastNode])
+
+
+	# Operations that start between two states (both included), on any node, as a list of (start state, last state,
+	# kind). Only the integer columns of the nodes that overlap the states are scanned, no operation is decoded
+	def getRuns(self, startState, endState):
+		return [
+			(self._opStart[opIdx], self._opEnd[opIdx], self._getString(self._opKind[opIdx]) if self._opKind[opIdx] >= 0 else None)
+			for opIdx in self._getOpRange(startState, endState) if startState <= self._opStart[opIdx] <= endState
+		]
@@ -0,0 +1,158 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import os, pickle, tempfile
+from vivadofsm.rptparser import PARSER_VERSION, ParsedReport
+
+
+# Default size cap of the cache, in bytes
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+
+# Default location of the cache. Can be overriden with the VIVADOFSM_CACHE_DIR environment variable
+def getDefaultCacheDir():
+	if "VIVADOFSM_CACHE_DIR" in os.environ:
+		return os.environ["VIVADOFSM_CACHE_DIR"]
+
+	return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "vivado-fsmgen")
+
+
+# Disk cache of parsed reports (see rptparser.ParsedReport). Entries are keyed by the contents hash, size
+# and modification time of the report plus the parser version. When the total size of the cache exceeds
+# maxSize, the least recently used entries are evicted
+class ParseCache():
+	def __init__(self, cacheDir = None, maxSize = DEFAULT_MAX_SIZE):
+		self._cacheDir = getDefaultCacheDir() if cacheDir is None else cacheDir
+		self._maxSize = maxSize
+
+
+	def getCacheDir(self):
+		return self._cacheDir
+
+
+	# Returns None if the report has no digest (see rptreader.RptStreamReader), in which case it cannot be cached
+	def getKey(self, reader, filtersDigest = ""):
+		digest = reader.getDigest()
+		if digest is None:
+			return None
+
+		return "{}-{}-{}-{}-v{}".format(digest, reader.getSize(), reader.getMTime(), filtersDigest[:12], PARSER_VERSION)
+
+
+	def getEntryPath(self, key):
+		return os.path.join(self._cacheDir, "{}.pickle".format(key))
+
+
+	# Return the cached parse for this key or None if there is none
+	def load(self, key):
+		entryPath = self.getEntryPath(key)
+
+		try:
+			with open(entryPath, "rb") as entryF:
+				parsed = pickle.load(entryF)
+		except FileNotFoundError:
+			return None
+		# Unpickling a truncated, corrupted or incompatible entry may raise almost anything. Such entries are treated
+		# as a miss and removed, so that they are not read again on every run until evicted
+		except Exception:
+			parsed = None
+
+		if not isinstance(parsed, ParsedReport):
+			try:
+				os.remove(entryPath)
+			except OSError:
+				pass
+			return None
+
+		# Access time is not reliable on every filesystem, so the modification time is used to keep the LRU order
+		try:
+			os.utime(entryPath)
+		except OSError:
+			pass
+
+		return parsed
+
+
+	# Save a parse on the cache and evict older entries if the size cap is exceeded
+	def store(self, key, parsed):
+		try:
+			os.makedirs(self._cacheDir, exist_ok=True)
+
+			# Write to a temporary file first, so that concurrent runs never see a partial entry
+			fd, tmpPath = tempfile.mkstemp(dir=self._cacheDir, suffix=".tmp")
+			with os.fdopen(fd, "wb") as entryF:
+				pickle.dump(parsed, entryF, pickle.HIGHEST_PROTOCOL)
+			os.replace(tmpPath, self.getEntryPath(key))
+		# A cache that cannot be written is not an error, it just won't speed anything up
+		except OSError:
+			return
+
+		self.evict()
+
+
+	# Remove least recently used entries until the cache fits on its size cap
+	def evict(self):
+		entries = []
+		totalSize = 0
+
+		try:
+			for entry in os.scandir(self._cacheDir):
+				if entry.name.endswith(".pickle"):
+					stat = entry.stat()
+					entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+					totalSize += stat.st_size
+		except OSError:
+			return
+
+		for _, size, path in sorted(entries):
+			if totalSize <= self._maxSize:
+				break
+
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			totalSize -= size
+
+
+	# Remove every entry of the cache. Other files that may live in the same folder are left untouched
+	def clear(self):
+		try:
+			entries = list(os.scandir(self._cacheDir))
+		except OSError:
+			return
+
+		for entry in entries:
+			if entry.name.endswith(".pickle") or entry.name.endswith(".tmp"):
+				try:
+					os.remove(entry.path)
+				except OSError:
+					pass
@@ -0,0 +1,140 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import json
+from vivadofsm.fsmgraph import buildSimplifiedGraph
+from vivadofsm.opfilter import FILTERS
+from vivadofsm.opmerge import mergeOperations
+from vivadofsm.opstore import OpStore, isOpStore
+from vivadofsm.profiler import NULL_PROFILER
+from vivadofsm.rptparser import parseReport, parseSchedule
+from vivadofsm.rptreader import decompressInput, openReport
+from vivadofsm.timeline import TLGen
+
+
+# In-process path from a report to a pipeline timeline, the same one that fsmgen.py and pipelook.py follow through
+# the JSON file of fsmgen.py, but keeping every state as an integer:
+#
+#   parsed = loadReport("kernel.verbose.sched.rpt")
+#   nodeOperations = getNodeOperations(parsed, ["ddr", "float"])
+#   tlgen, operations = getTimeline(parsed, nodeOperations)
+#   tlgen.analyse(operations)
+#   print(tlgen.getAnalysis())
+
+
+# Parse a report file, which may be compressed or "-" for the standard input (see rptreader.openReport()). See
+# rptparser.parseReport() for the arguments
+def loadReport(rptFile, cache = None, filters = FILTERS, profiler = NULL_PROFILER, workers = 1):
+	with openReport(rptFile) as reader:
+		return parseReport(reader, cache, filters, profiler=profiler, workers=workers)
+
+
+# Read only the kernel name and the pipelines of a report (see rptparser.parseSchedule()), for when the operations are
+# loaded with loadNodeOperations()
+def loadSchedule(rptFile, profiler = NULL_PROFILER):
+	with openReport(rptFile) as reader:
+		return parseSchedule(reader, profiler)
+
+
+# Operations of the active filters on each node of the simplified FSM (see fsmgraph.buildSimplifiedGraph()), with
+# repeated operations on consecutive states merged into runs (see opmerge.mergeOperations()). This is what fsmgen.py
+# writes with "--json": a dict indexed by the first state of each node that has operations, whose values are dicts
+# indexed by the state where each run starts, whose values are lists of [last state of the run, filtered groups].
+# Each step is measured as a phase of the profiler (see profiler.py)
+def getNodeOperations(parsed, activeFilters, profiler = NULL_PROFILER):
+	with profiler.phase("filter"):
+		filteredLines = parsed.getFilteredLines(activeFilters)
+	with profiler.phase("simplify"):
+		graph, _ = buildSimplifiedGraph(parsed, profiler)
+	nodeOperations = {}
+
+	with profiler.phase("merge"):
+		for n in graph.getNodes():
+			if graph.isEndNode(n) or graph.isExternalNode(n):
+				continue
+
+			states = graph.getStates(n)
+			mergedFilteredLines = mergeOperations(states, filteredLines)
+			if len(mergedFilteredLines) > 0:
+				nodeOperations[states[0]] = mergedFilteredLines
+
+	return nodeOperations
+
+
+# Load the operations written by fsmgen.py, either with "--json" or with "--binary", in the same format of
+# getNodeOperations(). Files on the columnar format are memory-mapped and each node is only read when accessed. JSON
+# files may be compressed (see rptreader.decompressInput())
+def loadNodeOperations(jsonFile):
+	if isOpStore(jsonFile):
+		return OpStore(jsonFile)
+
+	with open(jsonFile, "rb") as jsonF:
+		fsmDict = json.load(decompressInput(jsonF))
+
+	return {
+		int(firstState): {int(runStart): fsmDict[firstState][runStart] for runStart in fsmDict[firstState]}
+		for firstState in fsmDict
+	}
+
+
+# Merge the header state of a pipeline into its first body state, which gives the operations of a pipeline instance
+# (see TLGen). The runs are copied, since TLGen changes them. On a columnar file only these two nodes are decoded
+def getPipelineOperations(nodeOperations, startState):
+	if startState + 1 not in nodeOperations:
+		raise RuntimeError("Supplied body state {} is not first state of a FSM basic block".format(startState))
+
+	operations = {}
+	for firstState in (startState + 1, startState):
+		for runStart, runs in nodeOperations.get(firstState, {startState: []}).items():
+			operations[runStart] = [list(run) for run in runs]
+
+	return operations
+
+
+# Create the timeline of a pipeline of a report. II and start state are taken from the report, unless supplied.
+# Extra keyword arguments are passed to TLGen.
+# Returns the TLGen, with title and II already set, and the operations of the pipeline instance
+def getTimeline(parsed, nodeOperations, pipeID = "Pipeline-0", ii = None, startState = None, **kwargs):
+	if startState is None and pipeID in parsed.pipelines:
+		if ii is None:
+			ii = parsed.pipelines[pipeID][0]
+		startState = parsed.pipelines[pipeID][1]
+
+	if ii is None:
+		raise RuntimeError("II could not be inferred from RPT file or start state is supplied but no II supplied")
+	if startState is None:
+		raise RuntimeError("Start state of pipeline could not be inferred from RPT file. Please supply it manually")
+
+	tlgen = TLGen(**kwargs)
+	tlgen.setTitle("{} (II = {})".format(parsed.kernelName, ii))
+	tlgen.setII(ii)
+
+	return tlgen, getPipelineOperations(nodeOperations, startState)
@@ -0,0 +1,198 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import json, os, sys, time
+
+# Peak memory is only available where the resource module is (i.e. not on Windows)
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+# Peak resident set size of this process so far, in bytes (None if unknown)
+def getPeakRss():
+	if resource is None:
+		return None
+
+	maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Linux reports kilobytes, macOS reports bytes
+	return maxRss if "darwin" == sys.platform else maxRss * 1024
+
+
+# CPU time of the finished child processes (e.g. workers of a process pool), in seconds
+def getChildCpuTime():
+	times = os.times()
+	return times.children_user + times.children_system
+
+
+# A phase being measured by Profiler (see Profiler.phase())
+class ProfilerPhase():
+	def __init__(self, profiler, name):
+		self._profiler = profiler
+		self._name = name
+		self._path = None
+		self._start = None
+
+
+	def __enter__(self):
+		self._path = self._profiler.beginPhase(self._name)
+		self._start = (time.perf_counter(), time.process_time(), getChildCpuTime(), getPeakRss())
+		return self
+
+
+	def __exit__(self, *args):
+		self._profiler.endPhase(
+			self._path, time.perf_counter() - self._start[0], time.process_time() - self._start[1], getChildCpuTime() - self._start[2], self._start[3]
+		)
+		return False
+
+
+# Record wall time, CPU time and peak memory of the phases of a run, plus some counters. Phases may be nested and are
+# identified by their path (e.g. "parse/operations"); the times of a phase include the ones of its nested phases.
+# The operating system only keeps the peak resident set size of the whole process, so for each phase this records the
+# high-water mark of the process at its end ("highWaterRss", which includes every earlier phase) and how much the phase
+# raised it ("rssGrowth"). A phase that stays below the memory used by earlier ones grows it by 0, whatever it
+# allocates. Counters are either numbers or dicts of numbers (e.g. one per filter).
+# Hot loops are never instrumented: counters are added up once per phase from what the code already keeps
+class Profiler():
+	enabled = True
+
+	def __init__(self, tool):
+		self._tool = tool
+		self._phases = {}
+		self._stack = []
+		self._counters = {}
+		self._children = {}
+		self._start = (time.perf_counter(), time.process_time(), getChildCpuTime())
+
+
+	# Context manager that measures a phase. Entering the same phase again (e.g. once per node) accumulates its times
+	def phase(self, name):
+		return ProfilerPhase(self, name)
+
+
+	# Open a nested phase. Returns its path. Phases are listed in the order they were first entered
+	def beginPhase(self, name):
+		self._stack.append(name)
+		path = "/".join(self._stack)
+		if path not in self._phases:
+			self._phases[path] = {"calls": 0, "wall": 0.0, "cpu": 0.0, "childCpu": 0.0, "highWaterRss": None, "rssGrowth": None}
+
+		return path
+
+
+	# Close the innermost phase, adding the times measured by ProfilerPhase. startRss is the high-water mark of the
+	# process when the phase was entered
+	def endPhase(self, path, wall, cpu, childCpu, startRss):
+		self._stack.pop()
+
+		phase = self._phases[path]
+		phase["calls"] += 1
+		phase["wall"] += wall
+		phase["cpu"] += cpu
+		phase["childCpu"] += childCpu
+		phase["highWaterRss"] = getPeakRss()
+		if phase["highWaterRss"] is not None:
+			phase["rssGrowth"] = (phase["rssGrowth"] or 0) + phase["highWaterRss"] - startRss
+
+
+	# Add an amount to a counter. If key is not None, the counter is a dict and the amount is added to that key
+	def count(self, name, amount = 1, key = None):
+		if key is None:
+			self._counters[name] = self._counters.get(name, 0) + amount
+		else:
+			counter = self._counters.setdefault(name, {})
+			counter[key] = counter.get(key, 0) + amount
+
+
+	# Attach the results of a profiler that ran elsewhere (e.g. on a worker process) under a name
+	def attach(self, name, results):
+		self._children[name] = results
+
+
+	def getResults(self):
+		results = {
+			"tool": self._tool,
+			"wall": time.perf_counter() - self._start[0],
+			"cpu": time.process_time() - self._start[1],
+			"childCpu": getChildCpuTime() - self._start[2],
+			"peakRss": getPeakRss(),
+			"phases": self._phases,
+			"counters": self._counters
+		}
+		if len(self._children) > 0:
+			results["children"] = self._children
+
+		return results
+
+
+	# Write the results as JSON to a file ("-" for the standard error, so that it is never mixed with the output of the
+	# tools)
+	def write(self, fileName):
+		if "-" == fileName:
+			sys.stderr.write("{}\n".format(json.dumps(self.getResults(), indent=2)))
+		else:
+			with open(fileName, "w") as profileF:
+				profileF.write(json.dumps(self.getResults(), indent=2))
+
+
+# Phase of NullProfiler, which measures nothing
+class NullProfilerPhase():
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *args):
+		return False
+
+
+# Profiler used when profiling is disabled: every call does nothing, so instrumented code runs at full speed
+class NullProfiler():
+	enabled = False
+
+	def __init__(self):
+		self._phase = NullProfilerPhase()
+
+
+	def phase(self, name):
+		return self._phase
+
+
+	def count(self, name, amount = 1, key = None):
+		pass
+
+
+	def attach(self, name, results):
+		pass
+
+
+NULL_PROFILER = NullProfiler()
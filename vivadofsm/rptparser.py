@@ -0,0 +1,367 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import concurrent.futures, re
+from vivadofsm.opfilter import FILTERS, OpClassifier, getFiltersDigest
+from vivadofsm.profiler import NULL_PROFILER
+from vivadofsm.rptreader import RptReader
+
+
+# Bump this every time the parsing logic or the layout of ParsedReport changes, so that cached
+# parses generated by older versions are not reused
+PARSER_VERSION = 5
+
+nodeRegex = re.compile("(\\d+) --> \n")
+edgeRegex = re.compile("\t(\\d+)[ ]*/ (.*)")
+endNodeRegex = re.compile("ST_(\\d+) : .*\"ret void\".*<Predicate = (.*)> <Delay.*")
+tripCountRegex = re.compile("ST_(\\d+) : .*@_ssdm_op_SpecLoopTripCount\\(i64 (\\d+), i64 (\\d+), i64 (\\d+)\\)")
+stateRegex = re.compile("State (\\d+) <")
+pipeInfoRegex = re.compile(rb"^ +([^ ]+) +: +II += +(\d+),.*, States = { +(\d+)", re.M)
+
+# Operation sections smaller than this are always parsed serially, since starting the worker processes would take longer
+PARALLEL_MIN_SIZE = 16 * 1024 * 1024
+# Number of byte ranges of the operations section per worker process, so that ranges that take longer (e.g. with more
+# filtered operations) do not leave the other workers idle at the end
+RANGES_PER_WORKER = 4
+
+
+# Everything that fsmgen.py and pipelook.py need from a report, independent of the filters that are active:
+#    kernelName: name of the kernel/function of the report
+#     pipelines: pipeline ID (e.g. "Pipeline-0") to (II, start state)
+#        states: list of (state, [(destination state, condition), ...]) in the order they appear on the report
+#      endEdges: list of (state, predicate) of the states that return from the FSM
+#    tripCounts: state to the (minimum, maximum, average) trip count of the loop specified on that state
+#    operations: list of classified operation lines of all known filters, composed of (line number,
+#                [(filter, state, reordered groups), ...])
+#   filterNames: filters that were considered when classifying the operations
+# filtersDigest: digest of those filters (see opfilter.getFiltersDigest())
+#   filterStats: number of regexes tried and matched by each filter (see OpClassifier.getStats())
+#       digests: section name to the SHA-1 of that section when it was parsed (see RptReader.getSectionDigest())
+#        window: states kept from the report, or None if the whole report was kept (see getWindow())
+class ParsedReport():
+	def __init__(self):
+		self.kernelName = ""
+		self.pipelines = {}
+		self.states = []
+		self.endEdges = []
+		self.tripCounts = {}
+		self.operations = []
+		self.filterNames = []
+		self.filtersDigest = None
+		self.filterStats = {}
+		self.digests = {}
+		self.window = None
+
+
+	# Get the filtered operations per state, considering only the active filters. Operations of the same
+	# line are ordered according to the order of the active filters
+	def getFilteredLines(self, activeFilters):
+		filteredLines = {}
+
+		# Sanity check
+		for activeFilter in activeFilters:
+			if activeFilter not in self.filterNames:
+				raise RuntimeError("Unknown filter requested: {}".format(activeFilter))
+
+		if 0 == len(activeFilters):
+			return filteredLines
+
+		for _, classified in self.operations:
+			for activeFilter in activeFilters:
+				for filterName, stateNo, reorderedMatch in classified:
+					if filterName == activeFilter:
+						if stateNo not in filteredLines:
+							filteredLines[stateNo] = []
+						filteredLines[stateNo].append(reorderedMatch)
+
+		return filteredLines
+
+
+	# Return a new ParsedReport with only the states of windowStates, their transitions and operations and the pipelines
+	# that start on them. Transitions that leave the window are kept, as well as the transitions of external states
+	# that enter it, so that they are shown as stubs to the external states. Operation line numbers are kept
+	def getWindow(self, windowStates):
+		parsed = ParsedReport()
+		parsed.kernelName = self.kernelName
+		parsed.pipelines = {pipeID: self.pipelines[pipeID] for pipeID in self.pipelines if self.pipelines[pipeID][1] in windowStates}
+		parsed.endEdges = [(state, predicate) for state, predicate in self.endEdges if state in windowStates]
+		parsed.tripCounts = {state: self.tripCounts[state] for state in self.tripCounts if state in windowStates}
+		parsed.filterNames = self.filterNames
+		parsed.filtersDigest = self.filtersDigest
+		parsed.filterStats = self.filterStats
+		parsed.window = windowStates
+
+		for state, edges in self.states:
+			if state in windowStates:
+				parsed.states.append((state, edges))
+			else:
+				entering = [(nextState, condition) for nextState, condition in edges if nextState in windowStates]
+				if len(entering) > 0:
+					parsed.states.append((state, entering))
+
+		for lineNo, classified in self.operations:
+			classified = [c for c in classified if c[1] in windowStates]
+			if len(classified) > 0:
+				parsed.operations.append((lineNo, classified))
+
+		return parsed
+
+
+	# Number of operation lines matched by a filter
+	def countOperations(self, filterName):
+		return sum(1 for _, classified in self.operations for c in classified if c[0] == filterName)
+
+
+# Parse the pipeline information of the schedule summary
+def parsePipelines(reader, parsed):
+	for pipeInfoMatch in reader.finditer(pipeInfoRegex, "Schedule"):
+		parsed.pipelines[pipeInfoMatch.group(1).decode()] = (int(pipeInfoMatch.group(2)), int(pipeInfoMatch.group(3)))
+
+
+# Parse only the kernel name and the pipelines of a report, which is all that is needed when the operations come from
+# elsewhere (e.g. the JSON file of fsmgen.py). The other members of the returned ParsedReport are left empty
+def parseSchedule(reader, profiler = NULL_PROFILER):
+	parsed = ParsedReport()
+	parsed.kernelName = reader.getKernelName()
+	with profiler.phase("pipelines"):
+		parsePipelines(reader, parsed)
+
+	return parsed
+
+
+# Parse the FSM states and transitions. Returns the number of lines scanned
+def parseTransitions(reader, parsed):
+	edges = None
+	noOfLines = 0
+	for noOfLines, line in enumerate(reader.iterLines("FSM state transitions"), 1):
+		nodeMatch = nodeRegex.match(line)
+		# A node description was detected, create this node
+		if nodeMatch is not None:
+			edges = []
+			parsed.states.append((int(nodeMatch.group(1)), edges))
+		else:
+			edgeMatch = edgeRegex.match(line)
+			# A edge description was detected, add this edge
+			if edgeMatch is not None:
+				if edges is None:
+					edges = []
+					parsed.states.append((0, edges))
+				edges.append((int(edgeMatch.group(1)), edgeMatch.group(2)))
+
+	return noOfLines
+
+
+# End of FSM, searching for end node and also operations of interest. If start and end are supplied, only the lines of
+# that byte range of the section are parsed, numbered from 0. Returns the number of lines scanned
+def parseOperations(reader, parsed, filters, start = None, end = None):
+	classifier = OpClassifier(parsed.filterNames, filters)
+	lineNo = -1
+	lines = reader.iterLines("FSM state operations") if start is None else reader.iterLines(None, start, end)
+	for lineNo, line in enumerate(lines):
+		# First, we search for end node
+		if "\"ret void\"" in line:
+			endNodeMatch = endNodeRegex.match(line)
+			if endNodeMatch is not None:
+				parsed.endEdges.append((int(endNodeMatch.group(1)), endNodeMatch.group(2)))
+		if "SpecLoopTripCount" in line:
+			tripCountMatch = tripCountRegex.match(line)
+			if tripCountMatch is not None:
+				parsed.tripCounts[int(tripCountMatch.group(1))] = tuple(int(g) for g in tripCountMatch.groups()[1:])
+
+		classified = classifier.classify(line)
+		if len(classified) > 0:
+			parsed.operations.append((lineNo, classified))
+
+	parsed.filterStats = classifier.getStats()
+	return lineNo + 1
+
+
+# Parse only the operations of the states of windowStates. States are listed in order on the operations section, so
+# parsing stops at the first state after the window and, if the report is memory-mapped, starts straight at the
+# first state of the window. Returns the number of lines scanned
+def parseWindowOperations(reader, parsed, filters, windowStates):
+	classifier = OpClassifier(parsed.filterNames, filters)
+	firstState = min(windowStates)
+	lastState = max(windowStates)
+
+	lines = reader.iterLines("FSM state operations")
+	sectionRange = reader.getSectionRange("FSM state operations")
+	if sectionRange is not None:
+		start = reader.findLine("State {} <".format(firstState).encode(), sectionRange[0], sectionRange[1])
+		if start >= 0:
+			lines = reader.iterLines(None, start, sectionRange[1])
+
+	state = None
+	lineNo = -1
+	for lineNo, line in enumerate(lines):
+		if line.startswith("State "):
+			stateMatch = stateRegex.match(line)
+			if stateMatch is not None:
+				state = int(stateMatch.group(1))
+				# Past the window, nothing else to parse
+				if state > lastState:
+					break
+		if state not in windowStates:
+			continue
+
+		if "\"ret void\"" in line:
+			endNodeMatch = endNodeRegex.match(line)
+			if endNodeMatch is not None:
+				parsed.endEdges.append((int(endNodeMatch.group(1)), endNodeMatch.group(2)))
+		if "SpecLoopTripCount" in line:
+			tripCountMatch = tripCountRegex.match(line)
+			if tripCountMatch is not None:
+				parsed.tripCounts[int(tripCountMatch.group(1))] = tuple(int(g) for g in tripCountMatch.groups()[1:])
+
+		classified = classifier.classify(line)
+		if len(classified) > 0:
+			parsed.operations.append((lineNo, classified))
+
+	parsed.filterStats = classifier.getStats()
+	return lineNo + 1
+
+
+# Parse a byte range of the operations section of a report. Runs on a worker process, which opens the report by itself.
+# Returns the number of lines scanned, the end edges, the trip counts, the classified operations (line numbers start
+# from 0 on the range) and the filter statistics
+def parseOperationsRange(rptFile, start, end, filterNames, filters):
+	parsed = ParsedReport()
+	parsed.filterNames = filterNames
+
+	with RptReader(rptFile, False) as reader:
+		noOfLines = parseOperations(reader, parsed, filters, start, end)
+
+	return noOfLines, parsed.endEdges, parsed.tripCounts, parsed.operations, parsed.filterStats
+
+
+# Parse the operations section on several worker processes, each one taking byte ranges of the section (see
+# parseOperationsRange()). Results are merged in the order of the ranges, so they are exactly the same as the ones of
+# parseOperations(). Returns the number of lines scanned
+def parseOperationsParallel(reader, parsed, filters, noOfWorkers):
+	ranges = reader.splitSection("FSM state operations", noOfWorkers * RANGES_PER_WORKER)
+	noOfLines = 0
+	parsed.filterStats = {filterName: {"attempts": 0, "matches": 0} for filterName in parsed.filterNames}
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=min(noOfWorkers, len(ranges))) as executor:
+		futures = [
+			executor.submit(parseOperationsRange, reader.getFileName(), start, end, parsed.filterNames, filters)
+			for start, end in ranges
+		]
+
+		for future in futures:
+			rangeLines, endEdges, tripCounts, operations, filterStats = future.result()
+
+			parsed.endEdges += endEdges
+			parsed.tripCounts.update(tripCounts)
+			parsed.operations += [(lineNo + noOfLines, classified) for lineNo, classified in operations]
+			for filterName in filterStats:
+				parsed.filterStats[filterName]["attempts"] += filterStats[filterName]["attempts"]
+				parsed.filterStats[filterName]["matches"] += filterStats[filterName]["matches"]
+			noOfLines += rangeLines
+
+	return noOfLines
+
+
+# Parse a report opened with RptReader or RptStreamReader (see rptreader.openReport()). If a ParseCache is supplied, a previous parse of the same
+# report is reused if available, and a new parse is saved otherwise.
+# If "previous" is a ParsedReport of an older version of the same report (e.g. before the design was
+# synthesised again), the parts of it whose sections did not change are reused instead of parsed again.
+# Each section parsed is measured as a phase of the profiler (see profiler.py).
+# With more than one worker, big operation sections are parsed on a process pool (see parseOperationsParallel()).
+# If a StateWindow is supplied (see window.py), only the states of the window are kept (see ParsedReport.getWindow()).
+# A cached parse of the whole report is used if available, otherwise only the operations of the window are parsed
+# (see parseWindowOperations()) and the parse is not saved on the cache
+def parseReport(reader, cache = None, filters = FILTERS, previous = None, profiler = NULL_PROFILER, workers = 1, window = None):
+	key = None
+	if cache is not None:
+		with profiler.phase("cacheLoad"):
+			key = cache.getKey(reader, getFiltersDigest(filters))
+			parsed = None if key is None else cache.load(key)
+		if parsed is not None:
+			profiler.count("cacheHits")
+			return parsed if window is None else parsed.getWindow(window.getStates(parsed.states))
+		if window is not None:
+			key = None
+
+	parsed = ParsedReport()
+	parsed.kernelName = reader.getKernelName()
+	parsed.filterNames = list(filters)
+	parsed.filtersDigest = getFiltersDigest(filters)
+	parsed.digests = {name: reader.getSectionDigest(name) for name in ("Schedule", "FSM state transitions", "FSM state operations")}
+
+	# Operations are only reusable if they were classified with the same filters
+	if previous is not None and previous.filtersDigest != parsed.filtersDigest:
+		previous = None
+
+	# Reuse a previous parse of a section only if that section is exactly the same
+	def isUnchanged(name):
+		return previous is not None and parsed.digests[name] is not None and previous.digests.get(name) == parsed.digests[name]
+
+	if isUnchanged("Schedule"):
+		parsed.pipelines = previous.pipelines
+	else:
+		with profiler.phase("pipelines"):
+			parsePipelines(reader, parsed)
+
+	if isUnchanged("FSM state transitions"):
+		parsed.states = previous.states
+	else:
+		with profiler.phase("transitions"):
+			profiler.count("linesScanned", parseTransitions(reader, parsed))
+
+	windowStates = None if window is None else window.getStates(parsed.states)
+
+	if windowStates is not None:
+		with profiler.phase("operations"):
+			if len(windowStates) > 0:
+				profiler.count("linesScanned", parseWindowOperations(reader, parsed, filters, windowStates))
+		parsed = parsed.getWindow(windowStates)
+	elif isUnchanged("FSM state operations"):
+		parsed.endEdges = previous.endEdges
+		parsed.tripCounts = previous.tripCounts
+		parsed.operations = previous.operations
+		parsed.filterStats = previous.filterStats
+	else:
+		sectionRange = reader.getSectionRange("FSM state operations")
+		with profiler.phase("operations"):
+			if workers > 1 and sectionRange is not None and sectionRange[1] - sectionRange[0] >= PARALLEL_MIN_SIZE:
+				profiler.count("linesScanned", parseOperationsParallel(reader, parsed, filters, workers))
+			else:
+				profiler.count("linesScanned", parseOperations(reader, parsed, filters))
+		for filterName in parsed.filterStats:
+			profiler.count("regexAttempts", parsed.filterStats[filterName]["attempts"], filterName)
+			profiler.count("regexMatches", parsed.filterStats[filterName]["matches"], filterName)
+
+	if key is not None:
+		with profiler.phase("cacheStore"):
+			cache.store(key, parsed)
+
+	return parsed
@@ -0,0 +1,448 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import bz2, gzip, hashlib, lzma, mmap, os, re, sys
+
+
+# Separator line that closes most report sections
+SEPARATOR = b"=" * 60 + b"\n"
+
+# Sections indexed by RptReader, in the order they appear on the report. Each section is
+# composed of the line that opens it (not included in the section) and the line that closes
+# it (also not included). If the closing line is None, the section runs until the next
+# SEPARATOR line
+SECTIONS = [
+	("Performance Estimates", b"== Performance Estimates\n", None),
+	("Schedule", b"+ Verbose Summary: Schedule\n", b"* FSM state transitions: \n"),
+	("FSM state transitions", b"* FSM state transitions: \n", b"* FSM state operations: \n"),
+	("FSM state operations", b"* FSM state operations: \n", None),
+	("FSMD analyzer results", b"* FSMD analyzer results:\n", None)
+]
+
+# Amount of bytes decoded at once when iterating over the lines of a section
+CHUNK_SIZE = 1 << 20
+
+# Magic numbers of the compressed formats accepted as input
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+BZ2_MAGIC = b"BZh"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+# Decompress a zstd stream. Python 3.14 ships zstd support, older versions need the "zstandard" module
+def openZstd(fileObj):
+	try:
+		from compression import zstd
+		return zstd.ZstdFile(fileObj)
+	except ImportError:
+		pass
+
+	try:
+		import zstandard
+	except ImportError:
+		raise RuntimeError("The zstandard module is required to read zstd-compressed files. Decompress the file or install zstandard")
+
+	return zstandard.ZstdDecompressor().stream_reader(fileObj, read_across_frames=True)
+
+
+# Return the compression of a file ("gzip", "xz", "bz2" or "zstd") from its first bytes, or None if it is not compressed
+def getCompression(head):
+	for compression, magic in (("gzip", GZIP_MAGIC), ("xz", XZ_MAGIC), ("bz2", BZ2_MAGIC), ("zstd", ZSTD_MAGIC)):
+		if head.startswith(magic):
+			return compression
+	return None
+
+
+# Wrap a buffered binary input file so that, if it is compressed with gzip, xz, bzip2 or zstd (detected from its contents,
+# not from its name), it is decompressed as it is read. Uncompressed files are returned as they are. Closing the
+# returned file does not close inF
+def decompressInput(inF):
+	compression = getCompression(inF.peek(len(XZ_MAGIC))[:len(XZ_MAGIC)])
+
+	if "gzip" == compression:
+		return gzip.GzipFile(fileobj=inF)
+	elif "xz" == compression:
+		return lzma.LZMAFile(inF)
+	elif "bz2" == compression:
+		return bz2.BZ2File(inF)
+	elif "zstd" == compression:
+		return openZstd(inF)
+	return inF
+
+
+# Whether a report has to be read with RptStreamReader, i.e. it is the standard input or a compressed file
+def isStream(rptFile):
+	if "-" == rptFile:
+		return True
+
+	with open(rptFile, "rb") as rptF:
+		return getCompression(rptF.read(len(XZ_MAGIC))) is not None
+
+
+# Open a report with RptReader or, if it cannot be memory-mapped, with RptStreamReader
+def openReport(rptFile):
+	return RptStreamReader(rptFile) if isStream(rptFile) else RptReader(rptFile)
+
+
+# Read-only view of a Vivado report file. The file is memory-mapped once and a byte-offset index of
+# its sections is built, so that callers can jump straight to the part of the report they need
+# without reading (or keeping in memory) the rest of it. If indexSections is False, the index is not built (e.g.
+# when only a known byte range of the report is read, see iterLines())
+class RptReader():
+	def __init__(self, rptFile, indexSections = True):
+		self._rptFile = rptFile
+		self._file = open(rptFile, "rb")
+
+		try:
+			self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		# Empty files cannot be mapped
+		except ValueError:
+			self._mm = b""
+
+		self._sections = {}
+		if indexSections:
+			self.buildIndex()
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *args):
+		self.close()
+
+
+	def close(self):
+		if isinstance(self._mm, mmap.mmap):
+			self._mm.close()
+		self._file.close()
+
+
+	def getFileName(self):
+		return self._rptFile
+
+
+	def getSize(self):
+		return len(self._mm)
+
+
+	# Find the offset of the first line equal to "line" starting at offset "start" (which must be the beginning of a line)
+	def findLine(self, line, start=0, end=None):
+		end = len(self._mm) if end is None else end
+
+		if 0 == start and self._mm[:len(line)] == line:
+			return 0
+
+		pos = self._mm.find(b"\n" + line, max(start - 1, 0), end)
+		return -1 if pos < 0 else pos + 1
+
+
+	# Build the byte-offset index of the sections
+	def buildIndex(self):
+		self._sections = {}
+		searchFrom = 0
+
+		for name, opening, closing in SECTIONS:
+			pos = self.findLine(opening, searchFrom)
+			if pos < 0:
+				continue
+
+			start = pos + len(opening)
+			end = self.findLine(SEPARATOR if closing is None else closing, start)
+			if end < 0:
+				end = len(self._mm)
+
+			self._sections[name] = (start, end)
+			searchFrom = start
+
+		# FSM states were already found, if the header is found again, this is unexpected
+		if "FSM state transitions" in self._sections:
+			start, end = self._sections["FSM state transitions"]
+			if self.findLine(SECTIONS[2][1], start, end) >= 0:
+				raise RuntimeError("Input file is corrupt")
+
+
+	def hasSection(self, name):
+		return name in self._sections
+
+
+	# Return the (start, end) byte offsets of a section, or None if the section is not present
+	def getSectionRange(self, name):
+		return self._sections.get(name)
+
+
+	# Split a section into up to noOfRanges byte ranges of about the same size, each one starting at the beginning of a
+	# line and ending right after a line break (or at the end of the section). Returns a list of (start, end), in order
+	def splitSection(self, name, noOfRanges):
+		if name not in self._sections:
+			return []
+
+		start, end = self._sections[name]
+		bounds = [start]
+		for rangeIdx in range(1, noOfRanges):
+			lineEnd = self._mm.find(b"\n", start + (end - start) * rangeIdx // noOfRanges, end)
+			if lineEnd < 0:
+				break
+			if bounds[-1] < lineEnd + 1 < end:
+				bounds.append(lineEnd + 1)
+		bounds.append(end)
+
+		return list(zip(bounds[:-1], bounds[1:]))
+
+
+	# Iterate over the lines of a section (or of the whole file if name is None). Lines keep their line break.
+	# The section is decoded in chunks, so memory usage does not depend on the size of the report
+	def iterLines(self, name=None, start=None, end=None):
+		if name is not None:
+			if name not in self._sections:
+				return
+			start, end = self._sections[name]
+		start = 0 if start is None else start
+		end = len(self._mm) if end is None else end
+
+		while start < end:
+			chunkEnd = min(start + CHUNK_SIZE, end)
+			if chunkEnd < end:
+				nl = self._mm.rfind(b"\n", start, chunkEnd)
+				chunkEnd = self._mm.find(b"\n", chunkEnd, end) + 1 if nl < 0 else nl + 1
+				if 0 == chunkEnd:
+					chunkEnd = end
+
+			lines = self._mm[start:chunkEnd].decode("utf-8", "replace").split("\n")
+			for line in lines[:-1]:
+				yield line + "\n"
+			if "" != lines[-1]:
+				yield lines[-1]
+			start = chunkEnd
+
+
+	# Search for a compiled bytes regex inside a section (or the whole file if name is None). Return the match object or None
+	def search(self, regex, name=None):
+		if name is None:
+			return regex.search(self._mm)
+		elif name not in self._sections:
+			return None
+
+		start, end = self._sections[name]
+		return regex.search(self._mm, start, end)
+
+
+	# Iterate over all matches of a compiled bytes regex inside a section (or the whole file if name is None)
+	def finditer(self, regex, name=None):
+		if name is None:
+			return regex.finditer(self._mm)
+		elif name not in self._sections:
+			return iter([])
+
+		start, end = self._sections[name]
+		return regex.finditer(self._mm, start, end)
+
+
+	# SHA-1 of the whole report, in hexadecimal
+	def getDigest(self):
+		return hashlib.sha1(self._mm).hexdigest()
+
+
+	# SHA-1 of a single section, in hexadecimal, or None if the section is not present
+	def getSectionDigest(self, name):
+		if name not in self._sections:
+			return None
+
+		start, end = self._sections[name]
+		return hashlib.sha1(self._mm[start:end]).hexdigest()
+
+
+	# Modification time of the report, in nanoseconds
+	def getMTime(self):
+		return os.fstat(self._file.fileno()).st_mtime_ns
+
+
+	# Name of the kernel/function that this report refers to
+	def getKernelName(self):
+		kernelInfoMatch = self.search(re.compile(rb"^== Vivado HLS Report for '([^']+)'", re.M))
+		return "" if kernelInfoMatch is None else kernelInfoMatch.group(1).decode("utf-8", "replace")
+
+
+# Sequential view of a report that cannot be memory-mapped: the standard input ("-") or a compressed report, which is
+# decompressed as it is read, without any temporary file. It has the same interface of RptReader, but sections can
+# only be read once and in the order they appear on the report (which is what rptparser.parseReport() does), and
+# there are no byte offsets, so getSectionRange() returns None and operations are always parsed on a single process.
+# Section digests are not known before the section is read, so previous parses are never reused. The parse cache
+# works with compressed files, keyed by the digest of the compressed file, but not with the standard input
+class RptStreamReader():
+	def __init__(self, rptFile):
+		self._rptFile = rptFile
+		self._rawF = sys.stdin.buffer if "-" == rptFile else open(rptFile, "rb")
+		self._inF = decompressInput(self._rawF)
+		self._buf = b""
+		self._eof = False
+		self._noOfSections = 0
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *args):
+		self.close()
+
+
+	def close(self):
+		if self._inF is not self._rawF:
+			self._inF.close()
+		if self._rawF is not sys.stdin.buffer:
+			self._rawF.close()
+
+
+	def getFileName(self):
+		return self._rptFile
+
+
+	# Offset of the first line of the buffer equal to any of "lines" and that line, or None if there is none
+	def _findLine(self, lines):
+		found = None
+		for line in lines:
+			pos = 0 if self._buf.startswith(line) else self._buf.find(b"\n" + line) + 1
+			if (pos > 0 or self._buf.startswith(line)) and (found is None or pos < found[0]):
+				found = (pos, line)
+		return found
+
+
+	# Iterate over the stream in chunks of whole lines until a line equal to any of "lines", which is left at the
+	# beginning of the buffer. Chunks are read CHUNK_SIZE bytes at a time, so memory usage does not depend on the size
+	# of the report. Returns the line found, or None if the end of the stream was reached
+	def _iterChunks(self, lines):
+		while True:
+			found = self._findLine(lines)
+			if found is not None:
+				cut = found[0]
+			elif self._eof:
+				cut = len(self._buf)
+			else:
+				cut = self._buf.rfind(b"\n") + 1
+
+			if cut > 0:
+				yield self._buf[:cut]
+				self._buf = self._buf[cut:]
+
+			if found is not None:
+				return found[1]
+			elif self._eof:
+				return None
+
+			chunk = self._inF.read(CHUNK_SIZE)
+			self._eof = 0 == len(chunk)
+			self._buf += chunk
+
+
+	# Skip everything up to the beginning of a section. Returns its closing line, or None if the section is not present
+	# (i.e. the end of the stream or the opening line of a later section was found first)
+	def _enterSection(self, name):
+		sectionIdx = [sectionName for sectionName, _, _ in SECTIONS].index(name)
+		if sectionIdx < self._noOfSections:
+			raise RuntimeError("Section \"{}\" was already read, sections of {} can only be read in order".format(name, self._rptFile))
+
+		openings = [opening for _, opening, _ in SECTIONS[sectionIdx:]]
+		skipper = self._iterChunks(openings)
+		try:
+			while True:
+				next(skipper)
+		except StopIteration as e:
+			if e.value != openings[0]:
+				return None
+
+		self._buf = self._buf[len(openings[0]):]
+		self._noOfSections = sectionIdx + 1
+		return SEPARATOR if SECTIONS[sectionIdx][2] is None else SECTIONS[sectionIdx][2]
+
+
+	def getSize(self):
+		return None if "-" == self._rptFile else os.path.getsize(self._rptFile)
+
+
+	# Sections are not indexed
+	def getSectionRange(self, name):
+		return None
+
+
+	# Iterate over the lines of a section. Lines keep their line break
+	def iterLines(self, name):
+		closing = self._enterSection(name)
+		if closing is None:
+			return
+
+		for chunk in self._iterChunks([closing]):
+			lines = chunk.decode("utf-8", "replace").split("\n")
+			for line in lines[:-1]:
+				yield line + "\n"
+			if "" != lines[-1]:
+				yield lines[-1]
+
+
+	# Iterate over all matches of a compiled bytes regex inside a section, which is read into memory (only meant for
+	# small sections, such as the schedule summary)
+	def finditer(self, regex, name):
+		closing = self._enterSection(name)
+		if closing is None:
+			return iter([])
+
+		return regex.finditer(b"".join(self._iterChunks([closing])))
+
+
+	# SHA-1 of the compressed report, in hexadecimal, or None for the standard input
+	def getDigest(self):
+		if "-" == self._rptFile:
+			return None
+
+		digest = hashlib.sha1()
+		with open(self._rptFile, "rb") as rptF:
+			for chunk in iter(lambda: rptF.read(CHUNK_SIZE), b""):
+				digest.update(chunk)
+		return digest.hexdigest()
+
+
+	# Sections are only known once read
+	def getSectionDigest(self, name):
+		return None
+
+
+	def getMTime(self):
+		return None if "-" == self._rptFile else os.stat(self._rptFile).st_mtime_ns
+
+
+	# Name of the kernel/function that this report refers to. It is searched before the first section
+	def getKernelName(self):
+		if self._noOfSections > 0:
+			return ""
+
+		header = b"".join(self._iterChunks([opening for _, opening, _ in SECTIONS]))
+		kernelInfoMatch = re.search(rb"^== Vivado HLS Report for '([^']+)'", header, re.M)
+		return "" if kernelInfoMatch is None else kernelInfoMatch.group(1).decode("utf-8", "replace")
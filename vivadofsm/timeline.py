@@ -0,0 +1,708 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import datetime, math
+from html import escape
+from vivadofsm.lanes import assignLanes
+from vivadofsm.mrt import ModuloReservationTable
+from vivadofsm.profiler import NULL_PROFILER
+
+
+# Pillow is only needed to draw PNG timelines, so it is imported on first use (see importPil()) and the analysis and
+# SVG output also work without it
+Image = None
+ImageDraw = None
+ImageFont = None
+
+
+# Fonts used on SVG timelines, and the height of their ascent relative to the font size
+SVG_FONT_FAMILY = "DejaVu Sans Mono, monospace"
+SVG_ASCENT = 0.93
+
+
+# Import Pillow on first use. Returns its Image, ImageDraw and ImageFont modules
+def importPil():
+	global Image, ImageDraw, ImageFont
+
+	if Image is None:
+		try:
+			from PIL import Image, ImageDraw, ImageFont
+		except ImportError:
+			raise RuntimeError("Pillow is required to draw PNG images. Use an SVG output file or install Pillow")
+
+	return Image, ImageDraw, ImageFont
+
+
+def drawRoundedRectangle(draw, start, size, bcolor, fcolor, borderSize = 5, roundedEdge = 20):
+	draw.pieslice(
+		[
+			(start[0], start[1]),
+			(start[0] + 2 * (borderSize + roundedEdge), start[1] + 2 * (borderSize + roundedEdge))
+		], 180, 270, fill=bcolor
+	)
+	draw.pieslice(
+		[
+			(start[0] + borderSize, start[1] + borderSize),
+			(start[0] + borderSize + 2 * roundedEdge, start[1] + borderSize + 2 * roundedEdge)
+		], 180, 270, fill=fcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0], start[1] + borderSize + roundedEdge),
+			(start[0] + borderSize, start[1] + size[1] - (borderSize + roundedEdge))
+		], fill=bcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0] + borderSize, start[1] + borderSize + roundedEdge),
+			(start[0] + borderSize + roundedEdge, start[1] + size[1] - (borderSize + roundedEdge))
+		], fill=fcolor
+	)
+
+	draw.pieslice(
+		[
+			(start[0], start[1] + size[1] - 2 * (borderSize + roundedEdge)),
+			(start[0] + 2 * (borderSize + roundedEdge), start[1] + size[1])
+		], 90, 180, fill=bcolor
+	)
+
+	draw.pieslice(
+		[
+			(start[0] + borderSize, start[1] + size[1] - (2 * roundedEdge + borderSize)),
+			(start[0] + borderSize + 2 * roundedEdge, start[1] + size[1] - borderSize)
+		], 90, 180, fill=fcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0] + borderSize + roundedEdge, start[1]),
+			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + borderSize)
+		], fill=bcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0] + borderSize + roundedEdge, start[1] + borderSize),
+			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + size[1] - borderSize)
+		], fill=fcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0] + borderSize + roundedEdge, start[1] + size[1] - borderSize),
+			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + size[1])
+		], fill=bcolor
+	)
+
+	draw.pieslice(
+		[
+			(start[0] + size[0] - 2 * (borderSize + roundedEdge), start[1]),
+			(start[0] + size[0], start[1] + 2 * (borderSize + roundedEdge))
+		], 270, 0, fill=bcolor
+	)
+
+	draw.pieslice(
+		[
+			(start[0] + size[0] - (2 * roundedEdge + borderSize), start[1] + borderSize),
+			(start[0] + size[0] - borderSize, start[1] + borderSize + 2 * roundedEdge)
+		], 270, 0, fill=fcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0] + size[0] - borderSize, start[1] + borderSize + roundedEdge),
+			(start[0] + size[0], start[1] + size[1] - (borderSize + roundedEdge))
+		], fill=bcolor
+	)
+
+	draw.rectangle(
+		[
+			(start[0] + size[0] - (borderSize + roundedEdge), start[1] + borderSize + roundedEdge),
+			(start[0] + size[0] - borderSize, start[1] + size[1] - (borderSize + roundedEdge))
+		], fill=fcolor
+	)
+
+	draw.pieslice(
+		[
+			(start[0] + size[0] - 2 * (roundedEdge + borderSize), start[1] + size[1] - 2 * (roundedEdge + borderSize)),
+			(start[0] + size[0], start[1] + size[1])
+		], 0, 90, fill=bcolor
+	)
+
+	draw.pieslice(
+		[
+			(start[0] + size[0] - (2 * roundedEdge + borderSize), start[1] + size[1] - (2 * roundedEdge + borderSize)),
+			(start[0] + size[0] - borderSize, start[1] + size[1] - borderSize)
+		], 0, 90, fill=fcolor
+	)
+
+
+# SVG attribute(s) for an RGBA colour
+def svgColour(attribute, colour):
+	r, g, b, a = colour
+	if 255 == a:
+		return " {}=\"rgb({},{},{})\"".format(attribute, r, g, b)
+	return " {0}=\"rgb({1},{2},{3})\" {0}-opacity=\"{4:.3f}\"".format(attribute, r, g, b, a / 255)
+
+
+# SVG text placed like Pillow does, i.e. by its top left corner instead of its baseline
+def svgText(position, text, fontSize, colour):
+	return "<text x=\"{}\" y=\"{}\" font-size=\"{}\" xml:space=\"preserve\"{}>{}</text>\n".format(
+		position[0], position[1] + round(SVG_ASCENT * fontSize), fontSize, svgColour("fill", colour), escape(text, quote=False)
+	)
+
+
+class TLGen():
+	#    reportViolations: if True, interface violations are reported to the user
+	#    abortWhenViolate: if True, violations will cause this tool to abort
+	#     printViolations: if False, violations are only collected (see getViolations()) instead of printed
+	#          borderSize: size of borders/separators
+	#         roundedEdge: width/height of the rounded corner of rounded rectangles
+	#        sizePerCycle: width allocated for each clock cycle
+	#            laneStep: when two operations overlap, laneStep is the height difference between both operations (so that they are nicely placed)
+	#     operationHeight: height of a single operation
+	#     separatorHeight: height between two pipeline instances
+	#          clockEvery: show clock edge every X cycles
+	#            dashSize: size of the dashes used in clock edges
+	#              opInfo: operations info, composed by the following elements:
+	#                        key: operation name
+	#                        values:
+	#                          "colour": color used for this operation
+	#                          "limitgroup": define which group this operation makes part, used for violation analysis. See limitGroups for more info
+	#         limitGroups: groups used for violation analysis. Each group has a resource budget. If pipeline creates a hardware where more operations
+	#                      of a same group are allocated than the available budget, a violation occurs
+	#                        key: group name
+	#                        value: available budget
+	#      defaultOpColor: default color used for several default things
+	#      headerFontSize: ditto
+	#          headerFont: font used for header
+	#   operationFontSize: ditto
+	#       operationFont: font used for primary texts
+	# descriptionFontSize: ditto
+	#     descriptionFont: font used for secondary texts
+	#            profiler: profiler that measures the phases of the timeline (see profiler.py)
+	def __init__(
+		self,
+		reportViolations = False, abortWhenViolate = False, printViolations = True,
+		borderSize = 5, roundedEdge = 10, sizePerCycle = 50, laneStep = 50, operationHeight = 100, separatorHeight = 10,
+		clockEvery = 5, dashSize = 10,
+		opInfo = {
+			"ReadReq": {"colour": (0, 0, 255, 255), "limitgroup": "ddrread"},
+			"Read": {"colour": (0, 0, 255, 255), "limitgroup": "ddrread"},
+			"WriteReq": {"colour": (0, 255, 0, 255), "limitgroup": "ddrwrite"},
+			"Write": {"colour": (0, 255, 0, 255), "limitgroup": "ddrwrite"},
+			"WriteResp": {"colour": (0, 255, 0, 255), "limitgroup": "ddrwrite"},
+			"load": {"colour": (0, 0, 127, 255), "limitgroup": "brmread"},
+			"store": {"colour": (0, 127, 0, 255), "limitgroup": "brmwrite"},
+			"fadd": {"colour": (255, 0, 0, 255), "limitgroup": None},
+			"fsub": {"colour": (255, 0, 0, 255), "limitgroup": None},
+			"fmul": {"colour": (255, 0, 0, 255), "limitgroup": None},
+			"fdiv": {"colour": (255, 0, 0, 255), "limitgroup": None}
+		},
+		limitGroups = {
+			"ddrread": 1,
+			"ddrwrite": 1,
+			"brmread": 2,
+			"brmwrite": 1
+		},
+		defaultOpColor = (200, 200, 200, 255),
+		headerFontSize = 48,
+		headerFont = "/usr/share/fonts/TTf/DejaVuSansMono.ttf",
+		operationFontSize = 40,
+		operationFont = "/usr/share/fonts/TTf/DejaVuSansMono.ttf",
+		descriptionFontSize = 28,
+		descriptionFont = "/usr/share/fonts/TTf/DejaVuSansMono.ttf",
+		profiler = NULL_PROFILER
+	):
+		self._reportViolations = reportViolations
+		self._abortWhenViolate = abortWhenViolate
+		self._printViolations = printViolations
+		self._borderSize = borderSize
+		self._roundedEdge = roundedEdge
+		self._sizePerCycle = sizePerCycle
+		self._laneStep = laneStep
+		self._operationHeight = operationHeight
+		self._separatorHeight = separatorHeight
+		self._clockEvery = clockEvery
+		self._dashSize = dashSize
+		self._opInfo = opInfo
+		self._limitGroups = limitGroups
+		self._defaultOpColor = defaultOpColor
+		self._headerFontSize = headerFontSize
+		self._headerFontFile = headerFont
+		self._operationFontSize = operationFontSize
+		self._operationFontFile = operationFont
+		self._descriptionFontSize = descriptionFontSize
+		self._descriptionFontFile = descriptionFont
+		self._profiler = profiler
+
+		# Fonts are only loaded when a PNG timeline is drawn (see loadFonts())
+		self._headerFont = None
+		self._operationFont = None
+		self._descriptionFont = None
+
+		# Pipelines repeat the same few operations a lot, so rounded rectangles and texts are drawn only once and then
+		# pasted wherever needed. These only depend on the parameters above, so they survive reset()
+		self._rectSprites = {}
+		self._textSprites = {}
+		self._clockSprite = None
+
+		self.reset()
+
+
+	# Load the fonts used on PNG timelines
+	def loadFonts(self):
+		if self._headerFont is None:
+			importPil()
+			self._headerFont = ImageFont.truetype(self._headerFontFile, self._headerFontSize)
+			self._operationFont = ImageFont.truetype(self._operationFontFile, self._operationFontSize)
+			self._descriptionFont = ImageFont.truetype(self._descriptionFontFile, self._descriptionFontSize)
+
+
+	def reset(self):
+		self._title = "Untitled"
+		self._ops = set()
+		self._maxOps = {}
+		self._opLanes = [[]]
+		self._noOfCycles = -1
+		self._II = -1
+		self._pipeOps = None
+		self._pipelineImg = None
+		self._pipelineStRg = [9999999999999, 0]
+		self._pipelineWidth = None
+		self._pipelineHeight = None
+		self._imageHeight = None
+		self._headerHeight = None
+		self._noOfPipeLanes = None
+		self._maxOps = {}
+		self._mrt = None
+		self._violations = []
+		# Pixels covered by everything pasted on the images, kept for the profiler
+		self._pixelsDrawn = 0
+
+
+	def setTitle(self, title):
+		self._title = title
+
+
+	def setII(self, II):
+		self._II = II
+
+
+	# Maximum amount of parallel operations of each type, as {operation: (amount, cycle)}. Only valid after the
+	# operations were analysed
+	def getMaxOps(self):
+		return {op: (self._maxOps[op][0], self._maxOps[op][2]) for op in self._maxOps}
+
+
+	# Violations of the limit groups, as a list of (cycle, amount, group). Only valid after the operations were analysed
+	def getViolations(self):
+		return self._violations
+
+
+	# Resource usage and violation report of the analysed operations: number of states, first state, amount of
+	# operations of each type in flight at each cycle of the timeline, maximum amount of parallel operations of each
+	# type and violations of the limit groups
+	def getAnalysis(self):
+		maxOps = self.getMaxOps()
+
+		return {
+			"states": self.getNoOfStates(),
+			"firstState": self._pipelineStRg[0],
+			"concurrency": {op: self._mrt.getFolded(op) for op in sorted(self._ops)},
+			"maxOps": {op: {"amount": maxOps[op][0], "cycle": maxOps[op][1]} for op in sorted(maxOps)},
+			"limitGroups": self._limitGroups,
+			"violations": [{"cycle": st, "amount": amt, "group": group} for st, amt, group in self._violations]
+		}
+
+
+	def getNoOfStates(self):
+		return self._pipelineStRg[1] - self._pipelineStRg[0] + 1
+
+
+	# Compute the layout of a pipeline instance: every operation, ordered by start state, as (operation, start, end,
+	# description, lane). Overlapping operations are placed on different lanes (see lanes.assignLanes()). Nothing is drawn
+	# here, so the same layout can be used by any output
+	def layoutPipeline(self, operations):
+		offset = self._pipelineStRg[0]
+		pipeOps = []
+
+		for st in range(self._pipelineStRg[0], self._pipelineStRg[1] + 1):
+			if st in operations:
+				for op in operations[st]:
+					self._ops.add(op[1][1])
+					pipeOps.append((op[1][1], st - offset, op[0] - offset, "{} cycles".format(op[0] - st + 1)))
+
+		opLanes, noOfLanes = assignLanes([(start, end) for _, start, end, _ in pipeOps])
+
+		self._opLanes = [[] for _ in range(max(noOfLanes, 1))]
+		for (operation, start, end, _), lane in zip(pipeOps, opLanes):
+			self._opLanes[lane].append((operation, start, end))
+
+		return [pipeOp + (lane,) for pipeOp, lane in zip(pipeOps, opLanes)]
+
+
+	# Insert an operation on the pipeline instance, on a given lane
+	def insertOperation(self, img, draw, operation, start, end, lane, *others):
+		drawStep = lane * self._laneStep
+
+		r, g, b, a = self._opInfo[operation]["colour"] if operation in self._opInfo else self._defaultOpColor
+		ncyc = (end - start) + 1
+
+		rectSprite, rectMask = self.getRectSprite((r, g, b, a), (int(0.8 * r), int(0.8 * g), int(0.8 * b), a), ncyc)
+		img.paste(rectSprite, (start * self._sizePerCycle, drawStep), rectMask)
+		self._pixelsDrawn += rectMask.size[0] * rectMask.size[1]
+
+		self.drawText(
+			draw,
+			(start * self._sizePerCycle + self._borderSize + self._roundedEdge, drawStep + self._borderSize), 
+			#"{} ({} cycle{})".format(operation, ncyc, "" if 1 == ncyc else "s"),
+			operation,
+			self._operationFont
+		)
+
+		self.drawText(
+			draw,
+			(start * self._sizePerCycle + self._borderSize + self._roundedEdge, drawStep + 2 * self._borderSize + self._operationFontSize), 
+			", ".join(others),
+			self._descriptionFont
+		)
+
+
+	# Rounded rectangle of an operation that lasts ncyc cycles, as an image and the mask of the pixels it covers
+	def getRectSprite(self, bcolor, fcolor, ncyc):
+		key = (bcolor, fcolor, ncyc)
+
+		if key not in self._rectSprites:
+			size = (ncyc * self._sizePerCycle, self._operationHeight)
+			sprite = Image.new("RGBA", (size[0] + 1, size[1] + 1), (0, 0, 0, 0))
+			mask = Image.new("L", sprite.size, 0)
+
+			drawRoundedRectangle(ImageDraw.Draw(sprite), [0, 0], size, bcolor, fcolor, borderSize = self._borderSize, roundedEdge = self._roundedEdge)
+			drawRoundedRectangle(ImageDraw.Draw(mask), [0, 0], size, 255, 255, borderSize = self._borderSize, roundedEdge = self._roundedEdge)
+			self._rectSprites[key] = (sprite, mask)
+
+		return self._rectSprites[key]
+
+
+	# Draw a text with the default colour. The glyph coverage of each text is rendered only once and then used as a mask,
+	# which gives exactly the same pixels as draw.text()
+	def drawText(self, draw, position, text, font):
+		key = (text, font)
+
+		if key not in self._textSprites:
+			left, top, right, bottom = font.getbbox(text)
+			xOffset = max(-left, 0)
+			yOffset = max(-top, 0)
+			mask = Image.new("L", (max(right + xOffset, 1), max(bottom + yOffset, 1)), 0)
+			ImageDraw.Draw(mask).text((xOffset, yOffset), text, font=font, fill=255)
+			self._textSprites[key] = (mask, xOffset, yOffset)
+
+		mask, xOffset, yOffset = self._textSprites[key]
+		draw.bitmap((position[0] - xOffset, position[1] - yOffset), mask)
+		self._pixelsDrawn += mask.size[0] * mask.size[1]
+
+
+	# Find the state range of a pipeline instance, merge the header operations and compute the layout of the instance
+	# (see layoutPipeline()). Returns the laid out operations
+	def preparePipeline(self, operations):
+		# Find the state range of the operations
+		for st in operations:
+			if st < self._pipelineStRg[0]:
+				self._pipelineStRg[0] = st
+			for st2 in operations[st]:
+				if st2[0] > self._pipelineStRg[1]:
+					self._pipelineStRg[1] = st2[0]
+
+		self._pipelineWidth = self.getNoOfStates() * self._sizePerCycle
+
+		# Special logic for header
+		for op in operations[self._pipelineStRg[0]]:
+			for op2 in operations[self._pipelineStRg[0] + 1]:
+				# Merge operations if they're mergeable
+				if op[1] == op2[1]:
+					op[0] = op2[0]
+					operations[self._pipelineStRg[0] + 1].remove(op2)
+
+		self._pipeOps = self.layoutPipeline(operations)
+		self._profiler.count("lanesAllocated", len(self._opLanes))
+		self._pipelineHeight = self._operationHeight + (len(self._opLanes) - 1) * self._laneStep
+
+		return self._pipeOps
+
+
+	# Generate a pipeline instance
+	def generatePipeline(self, operations):
+		if self._pipeOps is None:
+			with self._profiler.phase("preparePipeline"):
+				self.preparePipeline(operations)
+		self.loadFonts()
+
+		# The final size of the pipeline sub-image is known once the lanes are assigned, so it is allocated only once
+		self._pipelineImg = Image.new("RGBA", (self._pipelineWidth, self._pipelineHeight), (0, 0, 0, 255))
+		pipelineImgDraw = ImageDraw.Draw(self._pipelineImg)
+
+		# Insert all operations
+		for operation, start, end, description, lane in self._pipeOps:
+			self.insertOperation(self._pipelineImg, pipelineImgDraw, operation, start, end, lane, description)
+
+
+	# Draw a pipeline instance on a given offset position
+	def drawPipeline(self, img, offset, lane):
+		img.paste(self._pipelineImg, (self._sizePerCycle * offset, (self._pipelineHeight + self._separatorHeight) * lane + self._headerHeight))
+		self._pixelsDrawn += self._pipelineWidth * self._pipelineHeight
+
+
+	# Draw clock edges
+	def drawClockBorder(self, img, draw, offset, clock):
+		if 0 == offset % self._clockEvery:
+			draw.text(
+				(self._sizePerCycle * offset, self._headerHeight - self._descriptionFontSize - self._separatorHeight),
+				"{}".format(clock),
+				font=self._descriptionFont,
+				fill=self._defaultOpColor
+			)
+
+			# All clock edges are the same dashed line, which is drawn only once
+			if self._clockSprite is None:
+				self._clockSprite = Image.new("L", (self._borderSize + 1, self._imageHeight), 0)
+				clockDraw = ImageDraw.Draw(self._clockSprite)
+				for base in range(self._headerHeight, self._imageHeight, self._dashSize * 2):
+					clockDraw.rectangle([(0, base), (self._borderSize, base + self._dashSize)], fill = 255)
+
+			img.paste(self._defaultOpColor, (self._sizePerCycle * offset, 0, self._sizePerCycle * offset + self._borderSize + 1, self._imageHeight), self._clockSprite)
+			self._pixelsDrawn += (self._borderSize + 1) * self._imageHeight
+
+
+	# Find the maximum amount of parallel operations of each type (see _maxOps) and check for violations of the limit groups.
+	# Violations are printed or, if abortWhenViolate is set, raised
+	def analyseOperations(self, operations):
+		# Operations in flight at each cycle, considering that a new pipeline instance starts every II cycles
+		mrt = ModuloReservationTable(self.getNoOfStates(), self._II)
+		for st in operations:
+			for op in operations[st]:
+				mrt.addOperation(op[1][1], st - self._pipelineStRg[0])
+		self._mrt = mrt
+
+		# Amount of operations per limit group, only accounted on the cycles where an operation of the group reaches a new
+		# maximum, and the first (cycle, operation index) where each group is accounted (so that violations are reported in
+		# that order)
+		amtPerGroup = {}
+		firstPerGroup = {}
+
+		for opIdx, op in enumerate(self._ops):
+			records = mrt.getRecords(op, self._maxOps[op][0] if op in self._maxOps else -1)
+			if 0 == len(records):
+				continue
+
+			st, amt = records[-1]
+			self._maxOps[op] = (amt, "max # par. {}: {} at cycle {}".format(op, amt, st + self._pipelineStRg[0]), st + self._pipelineStRg[0])
+
+			if self._reportViolations:
+				limitGroup = self._opInfo[op]["limitgroup"] if op in self._opInfo else None
+				if limitGroup is not None:
+					if limitGroup not in amtPerGroup:
+						amtPerGroup[limitGroup] = {}
+						firstPerGroup[limitGroup] = (records[0][0], opIdx)
+					else:
+						firstPerGroup[limitGroup] = min(firstPerGroup[limitGroup], (records[0][0], opIdx))
+
+					for st, amt in records:
+						amtPerGroup[limitGroup][st] = amtPerGroup[limitGroup].get(st, 0) + amt
+
+		# Cycle where each group has most operations allocated (the first one, if tied)
+		maxAmtPerGroup = {}
+		for group in sorted(amtPerGroup, key=lambda g: firstPerGroup[g]):
+			maxAmtPerGroup[group] = min(amtPerGroup[group].items(), key=lambda stAmt: (-stAmt[1], stAmt[0]))
+			maxAmtPerGroup[group] = (maxAmtPerGroup[group][0] + self._pipelineStRg[0], maxAmtPerGroup[group][1])
+
+		self._violations = []
+		for group in maxAmtPerGroup:
+			if maxAmtPerGroup[group][1] > self._limitGroups[group]:
+				self._violations.append((maxAmtPerGroup[group][0], maxAmtPerGroup[group][1], group))
+				violation = "Violation at cycle {}: {} simultaneously allocated for class \"{}\"".format(maxAmtPerGroup[group][0], maxAmtPerGroup[group][1], group)
+				if self._abortWhenViolate:
+					raise RuntimeError(violation)
+				elif self._printViolations:
+					print(violation)
+
+
+	# Generate header with violation information
+	def generateHeader(self, img, operations):
+		self.loadFonts()
+		draw = ImageDraw.Draw(img)
+
+		draw.text((0, 0), self._title, font = self._headerFont, fill = self._defaultOpColor)
+		draw.text(
+			(0, self._headerFontSize + self._borderSize), "Generated at {}".format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+			font = self._descriptionFont,
+			fill = self._defaultOpColor
+		)
+
+		with self._profiler.phase("analyseOperations"):
+			self.analyseOperations(operations)
+
+		i = 0
+		for op in self._maxOps:
+			draw.text(
+				(0, self._headerFontSize + self._borderSize + (self._descriptionFontSize + self._borderSize) * (i + 1)),
+				self._maxOps[op][1],
+				font = self._descriptionFont,
+				fill = self._defaultOpColor
+			)
+			i += 1
+
+
+	# Compute the size of the timeline
+	def computeDimensions(self):
+		self._headerHeight = self._headerFontSize + (len(self._ops) + 1) * (self._operationFontSize + self._borderSize) + self._descriptionFontSize
+		# _=.=_
+		self._noOfPipeLanes = int((math.ceil((self.getNoOfStates() + 1) / self._II)))
+		self._imageHeight = self._noOfPipeLanes * (self._pipelineHeight + self._separatorHeight) + self._headerHeight
+
+
+	# Generate timeline with several pipeline instances according to II
+	def generate(self, operations, pngFile = None):
+		# Nothing to draw, so there is no need to build any image
+		if pngFile is None:
+			self.analyse(operations)
+			return
+
+		if self._pipelineImg is None:
+			with self._profiler.phase("generatePipeline"):
+				self.generatePipeline(operations)
+
+		self.computeDimensions()
+		img = Image.new("RGBA", (
+			self._pipelineWidth,
+			self._imageHeight,
+		), (0, 0, 0, 255))
+
+		with self._profiler.phase("generateHeader"):
+			self.generateHeader(img, operations)
+
+		with self._profiler.phase("drawPipelines"):
+			for i in range(self._noOfPipeLanes):
+				self.drawPipeline(img, i * self._II, i)
+
+			draw = ImageDraw.Draw(img)
+
+			self._clockSprite = None
+			for i in range(self.getNoOfStates()):
+				self.drawClockBorder(img, draw, i, i + self._pipelineStRg[0])
+
+		with self._profiler.phase("encode"):
+			img.save(pngFile)
+		self._profiler.count("pixelsDrawn", self._pixelsDrawn)
+
+
+	# Only find the maximum amount of parallel operations and the violations, without drawing anything
+	def analyse(self, operations):
+		if self._pipeOps is None:
+			with self._profiler.phase("preparePipeline"):
+				self.preparePipeline(operations)
+
+		with self._profiler.phase("analyseOperations"):
+			self.analyseOperations(operations)
+
+
+	# Generate the same timeline of generate() as an SVG file. The pipeline instance is defined only once and each of its
+	# copies is a reference to it, so the file grows with the number of operations and instances instead of pixels
+	def generateSvg(self, operations, svgFile):
+		if self._pipeOps is None:
+			with self._profiler.phase("preparePipeline"):
+				self.preparePipeline(operations)
+
+		self.computeDimensions()
+		with self._profiler.phase("analyseOperations"):
+			self.analyseOperations(operations)
+
+		with self._profiler.phase("writeSvg"), open(svgFile, "w") as svgF:
+			svgF.write(
+				"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+				"<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"{0}\" height=\"{1}\" viewBox=\"0 0 {0} {1}\" font-family=\"{2}\">\n"
+				"<rect width=\"100%\" height=\"100%\" fill=\"black\"/>\n".format(self._pipelineWidth, self._imageHeight, SVG_FONT_FAMILY)
+			)
+
+			# Header
+			svgF.write(svgText((0, 0), self._title, self._headerFontSize, self._defaultOpColor))
+			svgF.write(svgText(
+				(0, self._headerFontSize + self._borderSize), "Generated at {}".format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+				self._descriptionFontSize, self._defaultOpColor
+			))
+			for i, op in enumerate(self._maxOps):
+				svgF.write(svgText(
+					(0, self._headerFontSize + self._borderSize + (self._descriptionFontSize + self._borderSize) * (i + 1)),
+					self._maxOps[op][1], self._descriptionFontSize, self._defaultOpColor
+				))
+
+			# Pipeline instance
+			svgF.write("<defs>\n<symbol id=\"pipeline\" viewBox=\"0 0 {0} {1}\" width=\"{0}\" height=\"{1}\">\n".format(self._pipelineWidth, self._pipelineHeight))
+			for operation, start, end, description, lane in self._pipeOps:
+				r, g, b, a = self._opInfo[operation]["colour"] if operation in self._opInfo else self._defaultOpColor
+				x = start * self._sizePerCycle
+				y = lane * self._laneStep
+				width = (end - start + 1) * self._sizePerCycle
+
+				svgF.write("<rect x=\"{}\" y=\"{}\" width=\"{}\" height=\"{}\" rx=\"{}\"{}/>\n".format(
+					x, y, width, self._operationHeight, self._borderSize + self._roundedEdge, svgColour("fill", (r, g, b, a))
+				))
+				svgF.write("<rect x=\"{}\" y=\"{}\" width=\"{}\" height=\"{}\" rx=\"{}\"{}/>\n".format(
+					x + self._borderSize, y + self._borderSize, width - 2 * self._borderSize, self._operationHeight - 2 * self._borderSize,
+					self._roundedEdge, svgColour("fill", (int(0.8 * r), int(0.8 * g), int(0.8 * b), a))
+				))
+				svgF.write(svgText((x + self._borderSize + self._roundedEdge, y + self._borderSize), operation, self._operationFontSize, (255, 255, 255, 255)))
+				svgF.write(svgText(
+					(x + self._borderSize + self._roundedEdge, y + 2 * self._borderSize + self._operationFontSize), description,
+					self._descriptionFontSize, (255, 255, 255, 255)
+				))
+			svgF.write("</symbol>\n</defs>\n")
+
+			# One copy of the pipeline instance every II cycles
+			for i in range(self._noOfPipeLanes):
+				svgF.write("<use href=\"#pipeline\" x=\"{}\" y=\"{}\"/>\n".format(
+					self._sizePerCycle * i * self._II, (self._pipelineHeight + self._separatorHeight) * i + self._headerHeight
+				))
+
+			# Clock edges
+			for i in range(0, self.getNoOfStates(), self._clockEvery):
+				svgF.write(svgText(
+					(self._sizePerCycle * i, self._headerHeight - self._descriptionFontSize - self._separatorHeight), "{}".format(i + self._pipelineStRg[0]),
+					self._descriptionFontSize, self._defaultOpColor
+				))
+				svgF.write("<line x1=\"{0}\" y1=\"{1}\" x2=\"{0}\" y2=\"{2}\" stroke-width=\"{3}\" stroke-dasharray=\"{4} {5}\"{6}/>\n".format(
+					self._sizePerCycle * i + (self._borderSize + 1) / 2, self._headerHeight, self._imageHeight, self._borderSize + 1,
+					self._dashSize + 1, self._dashSize - 1, svgColour("stroke", self._defaultOpColor)
+				))
+
+			svgF.write("</svg>\n")
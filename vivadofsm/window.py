@@ -0,0 +1,110 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import deque
+
+
+# Window of FSM states to keep from a report, either a range of states (e.g. "--states 141-277" of fsmgen.py) or the
+# states up to "radius" transitions away from a given state, in any direction (e.g. "--around 200 --radius 3").
+# Transitions that cross the window are kept as stubs to the external states (see ParsedReport.getWindow())
+class StateWindow():
+	def __init__(self, first = None, last = None, around = None, radius = 0):
+		if around is None and (first is None or last is None):
+			raise RuntimeError("Either a range of states or a state to look around must be supplied")
+		if around is None and first > last:
+			raise RuntimeError("Invalid range of states: {}-{}".format(first, last))
+		if radius < 0:
+			raise RuntimeError("Invalid radius: {}".format(radius))
+
+		self._first = first
+		self._last = last
+		self._around = around
+		self._radius = radius
+
+
+	def __str__(self):
+		if self._around is not None:
+			return "around state {}, radius {}".format(self._around, self._radius)
+		return "states {}-{}".format(self._first, self._last)
+
+
+	# Return the set of states of the window, given the states and transitions of a report (see ParsedReport.states).
+	# Looking around a state is a breadth-first search that ignores the direction of the transitions, O(V + E)
+	def getWindowStates(self, states):
+		if self._around is None:
+			return set(state for state, _ in states if self._first <= state <= self._last)
+
+		neighbours = {}
+		for state, edges in states:
+			for nextState, _ in edges:
+				neighbours.setdefault(state, []).append(nextState)
+				neighbours.setdefault(nextState, []).append(state)
+
+		if not any(state == self._around for state, _ in states):
+			raise RuntimeError("State {} was not found on the report".format(self._around))
+
+		windowStates = {self._around}
+		queue = deque([(self._around, 0)])
+		while len(queue) > 0:
+			state, distance = queue.popleft()
+			if distance == self._radius:
+				continue
+			for neighbour in neighbours.get(state, []):
+				if neighbour not in windowStates:
+					windowStates.add(neighbour)
+					queue.append((neighbour, distance + 1))
+
+		# State 0 only holds transitions found before the first state (see rptparser.parseTransitions())
+		windowStates.discard(0)
+		return windowStates
+
+
+	# Same as getWindowStates(), but fails if the window has no states
+	def getStates(self, states):
+		windowStates = self.getWindowStates(states)
+		if 0 == len(windowStates):
+			raise RuntimeError("No FSM states found on {}".format(self))
+		return windowStates
+
+
+# Parse a range of states such as "141-277" (or a single state, such as "141")
+def parseStateRange(rangeStr):
+	bounds = rangeStr.split("-")
+
+	try:
+		if 1 == len(bounds):
+			return int(bounds[0]), int(bounds[0])
+		elif 2 == len(bounds):
+			return int(bounds[0]), int(bounds[1])
+	except ValueError:
+		pass
+
+	raise RuntimeError("Invalid range of states: {}".format(rangeStr))
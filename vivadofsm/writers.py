@@ -0,0 +1,202 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2019, Andre Perina
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import filecmp, gzip, io, json, os
+
+
+# gzip-compressed output file that, unlike GzipFile with a fileobj, also closes the file it writes to. Neither a
+# timestamp nor a file name is embedded, so the same content always produces the same file, whatever its name (e.g.
+# the temporary files of StreamWriter)
+class GzipOutputFile(gzip.GzipFile):
+	def __init__(self, fileName):
+		self._rawF = open(fileName, "wb")
+		super().__init__(filename="", mode="wb", fileobj=self._rawF, mtime=0)
+
+
+	def close(self):
+		try:
+			super().close()
+		finally:
+			self._rawF.close()
+
+
+# Open an output file for writing text. Files ending with ".gz" are transparently gzip-compressed (see
+# GzipOutputFile)
+def openOutput(fileName):
+	if fileName.endswith(".gz"):
+		return io.TextIOWrapper(GzipOutputFile(fileName), encoding="utf-8")
+	return open(fileName, "w")
+
+
+# Move a freshly written temporary file over fileName, unless fileName already has the same content. In that case
+# the temporary file is discarded and fileName is left untouched, so that its modification time does not change
+# and tools such as make are not triggered for nothing. Returns True if fileName was (re)written
+def replaceIfChanged(tmpFile, fileName):
+	if os.path.isfile(fileName) and filecmp.cmp(tmpFile, fileName, shallow=False):
+		os.remove(tmpFile)
+		return False
+
+	os.replace(tmpFile, fileName)
+	return True
+
+
+# Base class for the streaming writers below. Everything is written as soon as it is produced, so memory
+# usage does not depend on the size of the output. If onlyIfChanged is True, the output is written to a
+# temporary file and only replaces fileName if the content differs (see replaceIfChanged())
+class StreamWriter():
+	def __init__(self, fileName, onlyIfChanged = False):
+		self._fileName = fileName
+		self._tmpFile = None
+		self.changed = True
+
+		if onlyIfChanged:
+			# Keep the extension, so that compression is still detected
+			self._tmpFile = "{}.{}.tmp{}".format(fileName, os.getpid(), ".gz" if fileName.endswith(".gz") else "")
+		self._outF = openOutput(fileName if self._tmpFile is None else self._tmpFile)
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *args):
+		self.close()
+
+
+	def getFileName(self):
+		return self._fileName
+
+
+	def close(self):
+		if not self._outF.closed:
+			self.finish()
+			self._outF.close()
+
+			if self._tmpFile is not None:
+				self.changed = replaceIfChanged(self._tmpFile, self._fileName)
+
+
+	# Write whatever is needed to finish the file
+	def finish(self):
+		pass
+
+
+# DOT writer. Record nodes are written piece by piece: beginRecordNode(), then addRecordLine() for each extra
+# line and finally endRecordNode()
+class DotWriter(StreamWriter):
+	def __init__(self, fileName, onlyIfChanged = False):
+		super().__init__(fileName, onlyIfChanged)
+
+		# Write .dot header
+		self._outF.write("digraph \"FSM\" {\n\tgraph [fontname = \"monospace\"];\n\tnode [fontname = \"monospace\"];\n\tedge [fontname = \"monospace\"];\n\n")
+
+
+	def writeNode(self, name, label):
+		self._outF.write("\tn{} [label=\"{}\"];\n".format(name, label))
+
+
+	def beginRecordNode(self, name, label):
+		self._outF.write("\tn{} [shape=record,label=\"{}".format(name, label))
+
+
+	def addRecordLine(self, line):
+		self._outF.write(line)
+
+
+	def endRecordNode(self):
+		self._outF.write("\\l\"];\n")
+
+
+	def writeEdge(self, src, dst, condition):
+		if "true" == condition:
+			self._outF.write("\tn{} -> n{};\n".format(src, dst))
+		else:
+			self._outF.write("\tn{} -> n{} [label=\"{}\"];\n".format(src, dst, condition))
+
+
+	def finish(self):
+		# Finish .dot file
+		self._outF.write("}\n")
+
+
+# CSV writer of filtered operations. Each node is composed of a line with its label, one line per operation
+# and three empty lines
+class CsvWriter(StreamWriter):
+	def beginNode(self, label):
+		self._outF.write("{}\n".format(label))
+
+
+	def writeOperation(self, start, end, operation):
+		# Transaction not merged
+		if start == end:
+			self._outF.write("---,{},".format(start))
+		# Transaction merged
+		else:
+			self._outF.write("{},{},".format(start, end))
+
+		self._outF.write(",".join(operation))
+		self._outF.write("\n")
+
+
+	def endNode(self):
+		self._outF.write("\n\n\n")
+
+
+# JSON writer of a single object, written one entry at a time. The output is the same as json.dumps() with
+# indent=2 or, if compact is True, without any whitespace
+class JsonWriter(StreamWriter):
+	def __init__(self, fileName, compact = False, onlyIfChanged = False):
+		super().__init__(fileName, onlyIfChanged)
+		self._compact = compact
+		self._noOfEntries = 0
+
+
+	def writeEntry(self, key, value):
+		if self._compact:
+			self._outF.write("{" if 0 == self._noOfEntries else ",")
+			self._outF.write(json.dumps(str(key)))
+			self._outF.write(":")
+			self._outF.write(json.dumps(value, separators=(",", ":")))
+		else:
+			self._outF.write("{\n  " if 0 == self._noOfEntries else ",\n  ")
+			self._outF.write(json.dumps(str(key)))
+			self._outF.write(": ")
+			# Strings never contain raw line breaks on JSON, so nested levels can be simply shifted
+			self._outF.write(json.dumps(value, indent=2).replace("\n", "\n  "))
+
+		self._noOfEntries += 1
+
+
+	def finish(self):
+		if 0 == self._noOfEntries:
+			self._outF.write("{}")
+		else:
+			self._outF.write("}" if self._compact else "\n}")